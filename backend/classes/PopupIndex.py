@@ -0,0 +1,101 @@
+# PopupIndex.py
+
+import os
+from collections import OrderedDict
+
+import pyarrow as pa
+
+DEFAULT_POPUP_MAX_BYTES = int(os.environ.get("BYOD_POPUP_MAX_BYTES", 512 * 1024**2))
+
+
+class PopupIndex:
+    """
+    Keeps the popup content of the map points uploaded by the frontend, and looks
+    up the content of a single point by its id.
+
+    A dataset is an Arrow table with an "id" column and one column per popup
+    field. It is kept as uploaded, with a dictionary from id to row position, so
+    a lookup slices a single row. The least recently used datasets are dropped
+    when the datasets take more than max_bytes, and a dataset larger than
+    max_bytes on its own is refused.
+
+    Parameters:
+    max_bytes (int): The memory budget of the datasets.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_POPUP_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.datasets = OrderedDict()
+        self.current_bytes = 0
+
+    def put(self, dataset: str, data: bytes | bytearray) -> int:
+        """
+        Stores a dataset from the bytes of an Arrow IPC stream, replacing any
+        dataset of the same name. Raises ValueError when the bytes are not a
+        popup dataset or the dataset alone takes more than max_bytes.
+
+        Returns:
+        int: The number of rows of the dataset.
+        """
+        # The stream holds the columns, refuse a dataset too large before reading it
+        if len(data) > self.max_bytes:
+            raise ValueError(
+                f"the dataset takes {len(data)} bytes, more than the "
+                f"{self.max_bytes} bytes kept by the backend"
+            )
+        # The table references the uploaded bytes, nothing is copied
+        table = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+        if "id" not in table.column_names:
+            raise ValueError("the dataset has no id column")
+        if table.nbytes > self.max_bytes:
+            raise ValueError(
+                f"the dataset takes {table.nbytes} bytes, more than the "
+                f"{self.max_bytes} bytes kept by the backend"
+            )
+        ids = table.column("id").cast(pa.string()).to_pylist()
+        index = {item_id: row for row, item_id in enumerate(ids)}
+
+        self.remove(dataset)
+        self.datasets[dataset] = (table, index)
+        self.current_bytes += table.nbytes
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self.datasets))
+            self.remove(oldest)
+        return table.num_rows
+
+    def rows(self, dataset: str) -> int | None:
+        """
+        Returns the number of rows of a dataset, or None when it is not known.
+        Marks the dataset as recently used, as a lookup does.
+        """
+        entry = self.datasets.get(dataset)
+        if entry is None:
+            return None
+        self.datasets.move_to_end(dataset)
+        return entry[0].num_rows
+
+    def get(self, dataset: str, item_id: str) -> dict | None:
+        """Returns the popup fields of a point, or None when it is not known"""
+        entry = self.datasets.get(dataset)
+        if entry is None:
+            return None
+        self.datasets.move_to_end(dataset)
+        table, index = entry
+        row = index.get(item_id)
+        if row is None:
+            return None
+        record = table.slice(row, 1).to_pylist()[0]
+        record.pop("id", None)
+        return record
+
+    def remove(self, dataset: str) -> None:
+        entry = self.datasets.pop(dataset, None)
+        if entry is not None:
+            self.current_bytes -= entry[0].nbytes
+
+    def stats(self) -> dict:
+        return {
+            "datasets": len(self.datasets),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
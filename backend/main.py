@@ -1,9 +1,82 @@
 # fastapi_app/main.py
-from fastapi import FastAPI
+import os
+import secrets
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
 from classes.backend_class_example import HelloWorld
+from classes.PopupIndex import PopupIndex
+
 app = FastAPI()
 
+# The map page of the frontend fetches popups from another origin (port)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["GET"])
+
+popup_index = PopupIndex()
+
+# The token the frontend sends with popup uploads, uploads are refused without it
+POPUP_API_TOKEN = os.environ.get("BYOD_POPUP_API_TOKEN") or None
+# The largest popup upload accepted
+POPUP_MAX_UPLOAD_BYTES = int(os.environ.get("BYOD_POPUP_MAX_UPLOAD_BYTES", 64 * 1024**2))
+
+
 @app.get("/")
 def hello_world():
     exampleClass = HelloWorld()
-    return {"Message": exampleClass.get()}
\ No newline at end of file
+    return {"Message": exampleClass.get()}
+
+
+@app.put("/popups/{dataset}")
+async def put_popups(
+    dataset: str,
+    request: Request,
+    authorization: str = Header(default=""),
+    content_length: int = Header(default=0),
+):
+    """Stores the popup content of the map points, sent as an Arrow IPC stream"""
+    if POPUP_API_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Popup uploads are disabled")
+    if not secrets.compare_digest(
+        authorization.encode(), f"Bearer {POPUP_API_TOKEN}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid popup upload token")
+
+    # Bodies over the upload limit, or over what the index keeps, are refused
+    # before they are read in full
+    max_upload_bytes = min(POPUP_MAX_UPLOAD_BYTES, popup_index.max_bytes)
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Popup datasets are limited to {max_upload_bytes} bytes",
+    )
+    if content_length > max_upload_bytes:
+        raise too_large
+    # The declared length can be missing (chunked uploads), count what is read
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_upload_bytes:
+            raise too_large
+
+    try:
+        rows = popup_index.put(dataset, body)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid popup dataset: {e}")
+    return {"dataset": dataset, "rows": rows}
+
+
+@app.get("/popups/{dataset}")
+def get_popup_dataset(dataset: str):
+    """Tells whether a popup dataset is stored, so an identical one is not uploaded again"""
+    rows = popup_index.rows(dataset)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Unknown popup dataset")
+    return {"dataset": dataset, "rows": rows}
+
+
+@app.get("/popups/{dataset}/{item_id}")
+def get_popup(dataset: str, item_id: str):
+    """Returns the popup fields of a single map point"""
+    record = popup_index.get(dataset, item_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown map point")
+    return record
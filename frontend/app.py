@@ -181,6 +181,22 @@ if len(st.session_state.GDELT_FILES) > 0:
                 st.session_state.gdelt_processor._get_organizations_()
             )
 
+        theme_col, headline_col = st.columns(2)
+        with theme_col:
+            st.session_state.selected_gdelt_themes = st.multiselect(
+                label="Select Theme(s)", options=sorted(st.session_state.gdelt_themes)
+            )
+            gdelt_themes_match_all = st.checkbox(
+                "Match all selected Themes", value=False
+            )
+        with headline_col:
+            st.session_state.selected_gdelt_headline_query = st.text_input(
+                "Search Headlines (end a word with * to match its prefix)"
+            )
+            gdelt_headline_match_all = st.checkbox(
+                "Match all Headline words", value=True
+            )
+
         gdelt_start_date_col, gdelt_end_date_col = st.columns(2)
         with gdelt_start_date_col:
             st.session_state.selected_gdelt_start_date = st.date_input(
@@ -190,6 +206,10 @@ if len(st.session_state.GDELT_FILES) > 0:
             st.session_state.selected_gdelt_end_date = st.date_input(
                 "Enter GDELT End Date", value=None
             )
+        gdelt_collapse_duplicates = st.checkbox(
+            "Collapse near-duplicate articles (syndicated copies of a headline count once)",
+            value=False,
+        )
         update_gdelt_data(
             persons=st.session_state.selected_gdelt_persons,
             organizations=st.session_state.selected_gdelt_organizations,
@@ -198,6 +218,11 @@ if len(st.session_state.GDELT_FILES) > 0:
             other_mentions=st.session_state.selected_gdelt_other_mentions,
             start_date=pd.to_datetime(st.session_state.selected_gdelt_start_date),
             end_date=pd.to_datetime(st.session_state.selected_gdelt_end_date),
+            themes=st.session_state.selected_gdelt_themes,
+            themes_match_all=gdelt_themes_match_all,
+            headline_query=st.session_state.selected_gdelt_headline_query,
+            headline_match_all=gdelt_headline_match_all,
+            collapse_duplicates=gdelt_collapse_duplicates,
         )
 
 # Process CELLEX Data
@@ -223,8 +248,23 @@ if st.session_state.CELLEX_FILES:
             st.session_state.selected_cellex_actors = (
                 st.session_state.cellex_processor._get_actors_()
             )
-
-    update_cellex_data(actors=st.session_state.selected_cellex_actors)
+        else:
+            st.session_state.selected_cellex_actors = selected_cellex_actors
+
+        cellex_start_date_col, cellex_end_date_col = st.columns(2)
+        with cellex_start_date_col:
+            cellex_start_date = st.date_input("Enter CELLEX Start Date (UTC)", value=None)
+        with cellex_end_date_col:
+            cellex_end_date = st.date_input("Enter CELLEX End Date (UTC)", value=None)
+
+    update_cellex_data(
+        actors=st.session_state.selected_cellex_actors,
+        start_date=pd.to_datetime(cellex_start_date),
+        # Records of the whole end date are included
+        end_date=None
+        if cellex_end_date is None
+        else pd.to_datetime(cellex_end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns"),
+    )
 
 # BYOD - Build Your Own Dashboard
 if (
@@ -233,6 +273,14 @@ if (
     or "gdelt_data" in st.session_state
 ):
 
+    cluster_points = st.checkbox(
+        "Cluster nearby points (counts per event type, for large selections)",
+        value=False,
+    )
+    st.session_state.map_generator.render_mode = (
+        "clusters" if cluster_points else "geojson"
+    )
+
     if st.button("Build Your Own Dashboard!"):
 
         # Ensure that we pass None for missing data
@@ -242,6 +290,11 @@ if (
         gdelt_data = (
             st.session_state.gdelt_data if "gdelt_data" in st.session_state else None
         )
+        gdelt_points = (
+            st.session_state.gdelt_points
+            if "gdelt_points" in st.session_state
+            else None
+        )
         cellex_data = (
             st.session_state.cellex_data if "cellex_data" in st.session_state else None
         )
@@ -251,6 +304,7 @@ if (
             acled_data=acled_data,
             gdelt_data=gdelt_data,
             cellex_data=cellex_data,
+            gdelt_points=gdelt_points,
         )
 
         # Display the map
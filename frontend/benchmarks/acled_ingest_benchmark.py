@@ -0,0 +1,66 @@
+# acled_ingest_benchmark.py
+"""
+Compares the ACLED single-pass ingestion against the previous per-file concat loop.
+
+Usage (from the frontend directory):
+    python benchmarks/acled_ingest_benchmark.py --files 52 --rows 5000
+"""
+
+import argparse
+
+import pandas as pd
+
+from synthetic_data import make_acled_files
+from classes.ACLEDProcessor import ACLEDProcessor, safe_convert_to_datetime
+from classes.IngestCache import IngestCache
+from classes.IngestMetrics import IngestMetrics
+
+
+def legacy_store_data(files: list, columns: list) -> pd.DataFrame:
+    """The per-file concat loop ACLEDProcessor._store_data_ used before"""
+    all_acled_data = pd.DataFrame()
+    for file in files:
+        file.seek(0)
+        current_file_data = pd.read_csv(file)
+        if list(current_file_data) == columns:
+            all_acled_data = pd.concat([current_file_data, all_acled_data])
+    all_acled_data.sort_values(by="event_date", ascending=True, inplace=True)
+    return safe_convert_to_datetime(all_acled_data, "event_date")
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    """Returns the memory held by a dataframe, including the Python strings"""
+    return round(df.memory_usage(deep=True).sum() / 1024**2, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=52)
+    parser.add_argument("--rows", type=int, default=5000, help="rows per file")
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    files = make_acled_files(args.files, args.rows)
+
+    # A fresh processor without the on-disk cache, so every file is parsed
+    with IngestMetrics("single-pass", trace_memory=args.trace_memory) as current:
+        processor = ACLEDProcessor(files, ingest_cache=IngestCache(cache_dir=None))
+        data = processor.data
+        current.add_rows(len(data), files=len(files))
+    current.extra["data_mb"] = frame_mb(data)
+
+    with IngestMetrics("legacy", trace_memory=args.trace_memory) as legacy:
+        legacy_data = legacy_store_data(files, processor._get_columns_())
+        legacy.add_rows(len(legacy_data), files=len(files))
+    legacy.extra["data_mb"] = frame_mb(legacy_data)
+
+    # Both readers load every event, including notes that span lines
+    assert len(data) == len(legacy_data), (len(data), len(legacy_data))
+
+    print(legacy)
+    print(current)
+    print(f"speedup: {legacy.seconds / current.seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# cellex_reader_benchmark.py
+"""
+Compares the streaming, sheet-selective CELLEX workbook reader against the
+previous full `pd.read_excel(sheet_name=None)` parse, and prints the timing of
+every workbook and sheet recorded by the new reader.
+
+Usage (from the frontend directory):
+    python benchmarks/cellex_reader_benchmark.py --files 2 --rows 20000 --other-sheets 6
+"""
+
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from synthetic_data import make_cellex_files
+from classes.CELLEXProcessor import (
+    TIMESTAMP_COLUMN,
+    _filter_latlon_rows,
+    _is_lat_lon_column,
+    read_cellex_sheets,
+)
+
+
+def legacy_read_cellex_sheets(cellex_file, file_name: str) -> list:
+    """The full workbook parse read_cellex_sheets used before"""
+    excel_file = pd.read_excel(cellex_file, sheet_name=None, header=1)
+    sheets = []
+    for sheet, df in excel_file.items():
+        if any(_is_lat_lon_column(col) for col in df.columns):
+            filtered_df = _filter_latlon_rows(df)
+            if not filtered_df.empty:
+                filtered_df.loc[:, "CMD sheet name"] = sheet
+                filtered_df.loc[:, "CMD file name"] = file_name
+                sheets.append(filtered_df)
+    return sheets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per sheet")
+    parser.add_argument(
+        "--other-sheets", type=int, default=6, help="sheets without coordinates per workbook"
+    )
+    args = parser.parse_args()
+
+    for upload in make_cellex_files(args.files, args.rows, args.other_sheets):
+        start = time.perf_counter()
+        legacy = legacy_read_cellex_sheets(io.BytesIO(upload.getvalue()), upload.name)
+        legacy_seconds = time.perf_counter() - start
+
+        timings = {}
+        current = read_cellex_sheets(io.BytesIO(upload.getvalue()), upload.name, timings)
+        assert len(legacy) == len(current)
+        for old, new in zip(legacy, current):
+            # The parsed timestamp column was added after the previous reader
+            pd.testing.assert_frame_equal(
+                old, new.drop(columns=TIMESTAMP_COLUMN, errors="ignore")
+            )
+
+        print(
+            f"{upload.name}: read_excel {legacy_seconds:.2f}s, "
+            f"streaming {timings['seconds']:.2f}s, "
+            f"speedup {legacy_seconds / timings['seconds']:.1f}x"
+        )
+        for sheet, timing in timings["sheets"].items():
+            status = "parsed" if timing["parsed"] else "skipped"
+            print(
+                f"    {sheet}: {status}, {timing['rows_read']} rows read, "
+                f"{timing['rows_kept']} kept, {timing['seconds']:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# gdelt_filter_benchmark.py
+"""
+Compares the GDELT entity filters answered from case-folded posting lists
+against the previous per-row Series.apply path.
+
+Usage (from the frontend directory):
+    python benchmarks/gdelt_filter_benchmark.py --files 2 --rows 10000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from synthetic_data import make_gdelt_files
+from classes.GDELTProcessor import GDELTProcessor
+from classes.IngestCache import IngestCache
+
+
+def legacy_filter_events(processor: GDELTProcessor, **filters) -> pd.DataFrame:
+    """The Series.apply filters GDELTProcessor._filter_events_ used before"""
+    lo, hi = processor.time_index.bounds(
+        filters.get("start_date") or None, filters.get("end_date") or None
+    )
+    window = processor.data.iloc[max(lo, processor.time_index.missing) : hi]
+
+    persons = filters.get("persons") or processor._get_persons_()
+    sources = filters.get("sources") or processor._get_sources_()
+    organizations = filters.get("organizations") or processor._get_organizations_()
+    countries_states = filters.get("countries_states") or processor._get_countries_states_()
+    other_mentions = filters.get("other_mentions") or processor._get_other_mentions_()
+
+    mask = pd.Series(True, index=window.index)
+
+    def contains_any(value, filter_list):
+        if isinstance(value, str) and filter_list:
+            value_list = [v.strip() for v in value.split(",")]
+            return any(
+                term.lower() in [v.lower() for v in value_list] for term in filter_list
+            )
+        return False
+
+    columns = [
+        ("Mentioned Persons", persons),
+        ("Source", sources),
+        ("Mentioned Organizations", organizations),
+        ("Mentioned Countries/States", countries_states),
+        ("Other Mentions", other_mentions),
+    ]
+    for column, terms in columns:
+        if terms:
+            mask &= window[column].apply(lambda x: contains_any(x, terms))
+    return window[mask]
+
+
+def timed(function, **filters) -> tuple:
+    start = time.perf_counter()
+    result = function(**filters)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per file")
+    args = parser.parse_args()
+
+    processor = GDELTProcessor(
+        make_gdelt_files(args.files, args.rows), ingest_cache=IngestCache(cache_dir=None)
+    )
+    persons = processor._get_persons_()
+    organizations = processor._get_organizations_()
+    queries = {
+        "a few persons": {"persons": persons[:5]},
+        "mixed case terms": {
+            "persons": [p.upper() for p in persons[:20]],
+            "countries_states": [c.lower() for c in processor._get_countries_states_()[:10]],
+        },
+        "thousands of names": {"persons": persons[:2000], "organizations": organizations[:500]},
+        "one month": {
+            "organizations": organizations[:50],
+            "start_date": pd.Timestamp("2024-03-01"),
+            "end_date": pd.Timestamp("2024-03-31"),
+        },
+    }
+
+    print(f"{len(processor.data)} articles")
+    for label, filters in queries.items():
+        legacy, legacy_seconds = timed(
+            lambda **f: legacy_filter_events(processor, **f), **filters
+        )
+        current, current_seconds = timed(processor._filter_events_, **filters)
+        pd.testing.assert_frame_equal(legacy, current)
+        print(
+            f"{label}: {len(current)} rows, apply {legacy_seconds:.3f}s, "
+            f"posting lists {current_seconds:.4f}s, "
+            f"speedup {legacy_seconds / current_seconds:.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# map_render_benchmark.py
+"""
+Compares the build time and page size of the map in the GeoJSON render mode
+(one FeatureCollection per layer) and the clusters mode (the clusters of every
+zoom level) against the previous one folium.Marker per row, for ACLED events,
+GDELT article points and CELLEX records. For the clusters mode it also times
+updating the clusters after a filter change leaves out a tenth of the points.
+With --popup-api-url, the GeoJSON mode is also measured with the popups uploaded
+to the backend at that URL, the page then only carries the point ids.
+
+The page is rendered to HTML as streamlit_folium does, the build time covers
+creating the layers and rendering. The markers mode embeds the icon image and an
+iframe in every marker, it is skipped above --markers-limit points as the page
+then takes gigabytes.
+
+Usage (from the frontend directory):
+    python benchmarks/map_render_benchmark.py --points 1000 10000 100000
+    BYOD_POPUP_API_TOKEN=<token> python benchmarks/map_render_benchmark.py --popup-api-url http://localhost:8002
+"""
+
+import argparse
+import time
+
+from synthetic_data import make_acled_files, make_cellex_files, make_gdelt_files
+from classes.ACLEDProcessor import ACLEDProcessor
+from classes.CELLEXProcessor import CELLEXProcessor
+from classes.GDELTProcessor import GDELTProcessor
+from classes.IngestCache import IngestCache
+from classes.MapGenerator import MapGenerator
+from classes.PopupClient import PopupClient
+
+TILES = "https://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"
+
+
+def load_sources(points: int) -> dict:
+    """Returns the map arguments of every source, with at least `points` points"""
+    cache = IngestCache(cache_dir=None)
+    acled = ACLEDProcessor(
+        make_acled_files(1, points), ingest_cache=cache, ingest_workers=1
+    )
+    # GDELT articles have 1 or 2 points, 1.5 on average
+    gdelt = GDELTProcessor(
+        make_gdelt_files(1, points * 2 // 3 + 1), ingest_cache=cache, ingest_workers=1
+    )
+    cellex = CELLEXProcessor(
+        make_cellex_files(1, points), ingest_cache=cache, ingest_workers=1
+    )
+    # All articles, the default entity filters leave out articles without mentions
+    gdelt_data = gdelt.data
+    gdelt_points = gdelt._get_points_(gdelt_data).iloc[:points]
+    return {
+        "acled": {"acled_data": acled._get_events_().iloc[:points]},
+        "gdelt": {
+            "gdelt_data": gdelt_data.loc[gdelt_points["row_id"].unique()],
+            "gdelt_points": gdelt_points,
+        },
+        "cellex": {
+            "cellex_data": cellex._get_meta_data_(cellex._get_actors_()).iloc[:points]
+        },
+    }
+
+
+def render(
+    render_mode: str,
+    arguments: dict,
+    clusterers: dict = None,
+    popup_client: PopupClient = None,
+) -> tuple:
+    """Returns the seconds taken to build and render the map, and the page size"""
+    start = time.perf_counter()
+    generator = MapGenerator(
+        tiles=TILES,
+        attr="CartoDB",
+        render_mode=render_mode,
+        clusterers=clusterers,
+        popup_client=popup_client,
+    )
+    html = generator._reinitialize_map_(**arguments).get_root().render()
+    return time.perf_counter() - start, len(html.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--points", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        "--markers-limit",
+        type=int,
+        default=10000,
+        help="largest number of points rendered in the markers mode",
+    )
+    parser.add_argument(
+        "--popup-api-url",
+        default=None,
+        help="backend URL the popups are uploaded to, to measure lazy popups",
+    )
+    args = parser.parse_args()
+    popup_client = PopupClient(args.popup_api_url) if args.popup_api_url else None
+
+    for points in args.points:
+        for source, arguments in load_sources(points).items():
+            geojson_seconds, geojson_bytes = render("geojson", arguments)
+            clusterers = {}
+            clusters_seconds, clusters_bytes = render("clusters", arguments, clusterers)
+            # A filter change: the same points without their first tenth
+            filtered = {
+                name: value.iloc[len(value) // 10 :] if name != "gdelt_data" else value
+                for name, value in arguments.items()
+            }
+            render("clusters", filtered, clusterers)
+            update = next(iter(clusterers.values())).last_update
+            line = (
+                f"{source} {points} points: geojson {geojson_seconds:.2f}s "
+                f"{geojson_bytes / 1024**2:.1f}MB, clusters {clusters_seconds:.2f}s "
+                f"{clusters_bytes / 1024**2:.1f}MB (filter change: "
+                f"{update['removed']} points removed in {update['seconds'] * 1000:.0f}ms)"
+            )
+            if points <= args.markers_limit:
+                markers_seconds, markers_bytes = render("markers", arguments)
+                line += (
+                    f", markers {markers_seconds:.2f}s {markers_bytes / 1024**2:.1f}MB"
+                    f" ({markers_seconds / geojson_seconds:.0f}x time, "
+                    f"{markers_bytes / geojson_bytes:.0f}x size)"
+                )
+            else:
+                line += ", markers skipped"
+            if popup_client is not None:
+                lazy_seconds, lazy_bytes = render(
+                    "geojson", arguments, popup_client=popup_client
+                )
+                line += (
+                    f", lazy popups {lazy_seconds:.2f}s {lazy_bytes / 1024**2:.1f}MB"
+                    f" ({geojson_bytes / lazy_bytes:.0f}x smaller)"
+                )
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# parallel_ingest_benchmark.py
+"""
+Compares parsing uploads in the calling process against the worker processes of
+the shared ingest executor, for ACLED, GDELT and CELLEX files.
+
+The ingest cache is disabled so every file is parsed. The worker pool is started
+before timing, as it stays alive between uploads in the app.
+
+Usage (from the frontend directory):
+    python benchmarks/parallel_ingest_benchmark.py --files 12 --workers 8
+"""
+
+import argparse
+import os
+
+from synthetic_data import make_acled_files, make_cellex_files, make_gdelt_files
+from classes.ACLEDProcessor import ACLEDProcessor
+from classes.CELLEXProcessor import CELLEXProcessor
+from classes.GDELTProcessor import GDELTProcessor
+from classes.IngestCache import IngestCache
+from classes.IngestMetrics import IngestMetrics
+from classes.ParallelIngestExecutor import get_ingest_executor
+
+SOURCES = {
+    "acled": (ACLEDProcessor, make_acled_files, lambda p: len(p.data)),
+    "gdelt": (GDELTProcessor, make_gdelt_files, lambda p: len(p.data)),
+    "cellex": (
+        CELLEXProcessor,
+        make_cellex_files,
+        lambda p: sum(len(df) for df in p.data.values()),
+    ),
+}
+
+
+def run(source: str, files: list, workers: int) -> IngestMetrics:
+    """Loads the files with a processor using the given number of workers"""
+    processor_class, _, count_rows = SOURCES[source]
+    for file in files:
+        file.seek(0)
+    with IngestMetrics(f"{source} x{workers}") as metrics:
+        processor = processor_class(
+            files, ingest_cache=IngestCache(cache_dir=None), ingest_workers=workers
+        )
+        metrics.add_rows(count_rows(processor), files=len(files))
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=12, help="files per source (8-16)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--acled-rows", type=int, default=50000)
+    parser.add_argument("--gdelt-rows", type=int, default=20000)
+    parser.add_argument("--cellex-rows", type=int, default=5000)
+    parser.add_argument("--sources", nargs="+", default=list(SOURCES), choices=list(SOURCES))
+    args = parser.parse_args()
+
+    rows = {"acled": args.acled_rows, "gdelt": args.gdelt_rows, "cellex": args.cellex_rows}
+    print(f"{os.cpu_count()} CPU cores, {args.workers} workers")
+
+    for source in args.sources:
+        files = SOURCES[source][1](args.files, rows[source])
+        # Start the worker processes (and their imports) once, as the running app does
+        run(source, files, args.workers)
+
+        serial = run(source, files, 1)
+        parallel = run(source, files, args.workers)
+        print(serial)
+        print(parallel)
+        print(f"{source} speedup: {serial.seconds / parallel.seconds:.2f}x")
+
+    get_ingest_executor(args.workers).shutdown()
+
+
+if __name__ == "__main__":
+    main()
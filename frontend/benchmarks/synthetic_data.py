@@ -0,0 +1,213 @@
+# synthetic_data.py
+"""Synthetic ACLED/GDELT exports and CELLEX workbooks used by the benchmark scripts."""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the frontend modules importable when running `python benchmarks/<script>.py`
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if FRONTEND_DIR not in sys.path:
+    sys.path.insert(0, FRONTEND_DIR)
+
+EVENT_TYPES = {
+    "Battles": ["Armed clash", "Government regains territory"],
+    "Protests": ["Peaceful protest", "Protest with intervention"],
+    "Riots": ["Violent demonstration", "Mob violence"],
+    "Explosions/Remote violence": ["Shelling/artillery/missile attack", "Air/drone strike"],
+    "Violence against civilians": ["Attack", "Abduction/forced disappearance"],
+    "Strategic developments": ["Looting/property destruction", "Arrests"],
+}
+DISORDER_TYPES = ["Political violence", "Demonstrations", "Strategic developments"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+class _UploadedFile(io.BytesIO):
+    """Minimal stand-in for streamlit's UploadedFile (a named BytesIO)"""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"UploadedFile(name={self.name!r})"
+
+
+def make_acled_frame(rows: int, seed: int = 0, id_offset: int = 0) -> pd.DataFrame:
+    """Returns a dataframe following the ACLED export schema"""
+    rng = np.random.default_rng(seed)
+    actors = np.array([f"Military Forces of Country {i}" for i in range(2000)])
+    event_types = np.array(list(EVENT_TYPES.keys()))
+    event_type = event_types[rng.integers(0, len(event_types), rows)]
+    sub_event_type = np.array(
+        [EVENT_TYPES[e][i] for e, i in zip(event_type, rng.integers(0, 2, rows))]
+    )
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(
+        rng.integers(0, 5 * 365, rows), unit="D"
+    )
+    assoc = np.where(
+        rng.random(rows) < 0.3,
+        [f"{a}; {b}" for a, b in zip(actors[rng.integers(0, 2000, rows)], actors[rng.integers(0, 2000, rows)])],
+        "",
+    )
+    return pd.DataFrame(
+        {
+            "event_id_cnty": [f"EVT{i + id_offset}" for i in range(rows)],
+            "event_date": [f"{d.day}-{MONTHS[d.month - 1]}-{d.year % 100:02d}" for d in dates],
+            "year": dates.year,
+            "time_precision": rng.integers(1, 4, rows),
+            "disorder_type": np.array(DISORDER_TYPES)[rng.integers(0, 3, rows)],
+            "event_type": event_type,
+            "sub_event_type": sub_event_type,
+            "actor1": actors[rng.integers(0, 2000, rows)],
+            "assoc_actor_1": assoc,
+            "inter1": "State forces",
+            "actor2": actors[rng.integers(0, 2000, rows)],
+            "assoc_actor_2": "",
+            "inter2": "Civilians",
+            "interaction": "State forces-Civilians",
+            "civilian_targeting": "",
+            "iso": rng.integers(1, 900, rows),
+            "region": "Eastern Africa",
+            "country": np.array([f"Country {i}" for i in range(40)])[rng.integers(0, 40, rows)],
+            "admin1": np.array([f"Province {i}" for i in range(300)])[rng.integers(0, 300, rows)],
+            "admin2": np.array([f"District {i}" for i in range(1500)])[rng.integers(0, 1500, rows)],
+            "admin3": "",
+            "location": np.array([f"Town {i}" for i in range(5000)])[rng.integers(0, 5000, rows)],
+            "latitude": rng.uniform(-35, 35, rows).round(4),
+            "longitude": rng.uniform(-20, 50, rows).round(4),
+            "geo_precision": rng.integers(1, 4, rows),
+            "source": "Local Newspaper",
+            "source_scale": "National",
+            # Some notes span lines, as in real exports
+            "notes": [
+                f"On this date, an event numbered {i} took place."
+                + ("\nFatality counts are disputed." if i % 10 == 0 else "")
+                for i in range(rows)
+            ],
+            "fatalities": rng.integers(0, 20, rows),
+            "tags": "",
+            "timestamp": 1700000000 + rng.integers(0, 10**6, rows),
+        }
+    )
+
+
+def make_acled_files(files: int, rows_per_file: int) -> list:
+    """Returns ACLED exports as in-memory uploaded files"""
+    uploads = []
+    for i in range(files):
+        frame = make_acled_frame(rows_per_file, seed=i, id_offset=i * rows_per_file)
+        uploads.append(
+            _UploadedFile(frame.to_csv(index=False).encode(), f"acled_{i:03d}.csv")
+        )
+    return uploads
+
+
+def make_gdelt_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Returns a dataframe following the GDELT GKG export layout used by GDELTProcessor"""
+    rng = np.random.default_rng(seed)
+    persons = np.array([f"Person {i}" for i in range(3000)])
+    orgs = np.array([f"Organization {i}" for i in range(1000)])
+    places = np.array([f"Province {i}, Country {i % 40}" for i in range(500)])
+    themes = np.array(["ARMEDCONFLICT", "PROTEST", "ELECTION", "TAX_FNCACT_PRESIDENT", "KILL", "CRISISLEX_T03_DEAD"])
+    sources = np.array([f"news{i}.example.com" for i in range(200)])
+    words = np.array(["army", "protest", "election", "minister", "attack", "border", "talks", "city", "rebels", "aid"])
+
+    def joined(values, low, high, sep=","):
+        counts = rng.integers(low, high, rows)
+        picks = values[rng.integers(0, len(values), counts.sum())]
+        out, start = [], 0
+        for count in counts:
+            out.append(sep.join(picks[start : start + count]) if count else "-")
+            start += count
+        return out
+
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit="s")
+    lats = rng.uniform(-35, 35, (rows, 2)).round(4)
+    lons = rng.uniform(-20, 50, (rows, 2)).round(4)
+    n_points = rng.integers(1, 3, rows)
+    return pd.DataFrame(
+        {
+            "V2ExtrasXML.Title": [" ".join(words[rng.integers(0, len(words), 6)]).capitalize() for _ in range(rows)],
+            "V2ExtrasXML.Author": sources[rng.integers(0, len(sources), rows)],
+            "V2Persons.V1Person": joined(persons, 0, 4),
+            "V2Orgs.V1Org": joined(orgs, 0, 3),
+            "V2Locations.FullName": joined(places, 1, 3),
+            "V2Locations.LocationLatitude": [",".join(map(str, lat[:n])) for lat, n in zip(lats, n_points)],
+            "V2Locations.LocationLongitude": [",".join(map(str, lon[:n])) for lon, n in zip(lons, n_points)],
+            "location": [
+                ", ".join(f"POINT ({lon[i]} {lat[i]})" for i in range(n))
+                for lat, lon, n in zip(lats, lons, n_points)
+            ],
+            "V2ExtrasXML.PubTimestamp": dates.strftime("%b %d, %Y @ %H:%M:%S.000"),
+            "V2DocId": [f"https://news.example.com/article/{seed}/{i}" for i in range(rows)],
+            "V2EnhancedThemes.V2Theme": joined(themes, 1, 4),
+            "V21AllNames.Name": joined(persons, 0, 3),
+        }
+    )
+
+
+def make_gdelt_files(files: int, rows_per_file: int) -> list:
+    """Returns GDELT exports as in-memory uploaded files"""
+    return [
+        _UploadedFile(
+            make_gdelt_frame(rows_per_file, seed=i).to_csv(index=False).encode(),
+            f"gdelt_{i:03d}.csv",
+        )
+        for i in range(files)
+    ]
+
+
+def make_cellex_sheets(rows: int, seed: int = 0, other_sheets: int = 0) -> dict:
+    """
+    Returns the sheets of a CELLEX device extraction, two of them with lat-lon data,
+    plus other_sheets message sheets of rows rows without coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit="s")
+    latitudes = rng.uniform(-35, 35, rows).round(6)
+    # Some locations have no fix
+    latitudes[rng.random(rows) < 0.05] = np.nan
+    sheets = {
+        "Summary": pd.DataFrame({"Field": ["Device", "Extraction"], "Value": [f"Device {seed}", "Logical"]}),
+        "Locations": pd.DataFrame(
+            {
+                "Timestamp": times,
+                "Latitude": latitudes,
+                "Longitude": rng.uniform(-20, 50, rows).round(6),
+                "Source": rng.choice(["GPS", "Wi-Fi", "Cell"], rows),
+            }
+        ),
+        "Photos": pd.DataFrame(
+            {
+                "File": [f"IMG_{seed}_{i:05d}.jpg" for i in range(rows // 4)],
+                "Created": times[: rows // 4],
+                "Latitude": latitudes[: rows // 4],
+                "Longitude": rng.uniform(-20, 50, rows // 4).round(6),
+            }
+        ),
+    }
+    for k in range(other_sheets):
+        sheets[f"Messages {k}"] = pd.DataFrame(
+            {
+                "Timestamp": times,
+                "Sender": rng.choice(["+15550100", "+15550101", "+15550102"], rows),
+                "Body": [f"message {i}" for i in range(rows)],
+            }
+        )
+    return sheets
+
+
+def make_cellex_files(files: int, rows_per_file: int, other_sheets: int = 0) -> list:
+    """Returns CELLEX workbooks (a title row above the header of every sheet) as in-memory uploaded files"""
+    uploads = []
+    for i in range(files):
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            for sheet, df in make_cellex_sheets(rows_per_file, seed=i, other_sheets=other_sheets).items():
+                df.to_excel(writer, sheet_name=sheet, startrow=1, index=False)
+        uploads.append(_UploadedFile(buffer.getvalue(), f"cellex_{i:03d}.xlsx"))
+    return uploads
@@ -2,39 +2,263 @@
 
 import pandas as pd
 import streamlit as st
-import itertools
 import numpy as np
 import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
 
+from classes.CSVStreamReader import CSVStreamReader, DEFAULT_MEMORY_LIMIT
+from classes.HashIndex import HashIndex
+from classes.IngestCache import IngestCache
+from classes.IngestMetrics import IngestMetrics
+from classes.InvertedIndex import InvertedIndex
+from classes.ParallelIngestExecutor import (
+    DEFAULT_INGEST_WORKERS,
+    get_ingest_executor,
+    open_upload,
+    table_to_bytes,
+)
+from classes.QueryCache import QueryCache
+from classes.QueryPlanner import Predicate, QueryPlanner
+from classes.SchemaSniffer import SchemaSniffer
+from classes.SortedTimeIndex import SortedTimeIndex
 
-def safe_convert_to_datetime(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
+# Column types used when parsing ACLED exports. Text columns are kept as strings
+# (event_date is converted per file by safe_convert_to_datetime).
+ACLED_COLUMN_TYPES = {
+    "event_id_cnty": pa.string(),
+    "event_date": pa.string(),
+    "year": pa.int16(),
+    "time_precision": pa.int8(),
+    "disorder_type": pa.string(),
+    "event_type": pa.string(),
+    "sub_event_type": pa.string(),
+    "actor1": pa.string(),
+    "assoc_actor_1": pa.string(),
+    "inter1": pa.string(),
+    "actor2": pa.string(),
+    "assoc_actor_2": pa.string(),
+    "inter2": pa.string(),
+    "interaction": pa.string(),
+    "civilian_targeting": pa.string(),
+    "iso": pa.int16(),
+    "region": pa.string(),
+    "country": pa.string(),
+    "admin1": pa.string(),
+    "admin2": pa.string(),
+    "admin3": pa.string(),
+    "location": pa.string(),
+    "latitude": pa.float64(),
+    "longitude": pa.float64(),
+    "geo_precision": pa.int8(),
+    "source": pa.string(),
+    "source_scale": pa.string(),
+    "notes": pa.string(),
+    "fatalities": pa.int32(),
+    "tags": pa.string(),
+    "timestamp": pa.int64(),
+}
+
+# Names the ACLED parsing logic in the ingest cache, bump it when parsing changes
+ACLED_CACHE_NAMESPACE = "acled-v2"
+
+# Integer columns are converted to pandas nullable types so a blank cell does not
+# turn the whole column into floats.
+NULLABLE_INTEGER_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+# Columns stored as categoricals in compact storage mode. The actor columns share
+# a single dictionary so an actor name is stored once for all four columns.
+ACTOR_COLUMNS = ["actor1", "assoc_actor_1", "actor2", "assoc_actor_2"]
+CATEGORICAL_COLUMNS = [
+    "event_type",
+    "sub_event_type",
+    "disorder_type",
+    "country",
+    "admin1",
+    "admin2",
+    "admin3",
+    "source_scale",
+]
+
+# Columns filtered by _get_events_ besides the actors
+FILTERED_COLUMNS = ["event_type", "disorder_type", "sub_event_type"]
+
+
+# Month spellings found in ACLED exports besides the '%b' abbreviations, mapped
+# onto the abbreviation (e.g. '30-Sept-24' -> '30-Sep-24')
+MONTH_VARIANTS = {
+    "sept": "Sep",
+    "january": "Jan",
+    "february": "Feb",
+    "march": "Mar",
+    "april": "Apr",
+    "june": "Jun",
+    "july": "Jul",
+    "august": "Aug",
+    "september": "Sep",
+    "october": "Oct",
+    "november": "Nov",
+    "december": "Dec",
+}
+ACLED_DATE_PATTERN = r"^\s*(\d{1,2})[-\s]([A-Za-z]+)\.?[-\s](\d{2})\s*$"
+
+
+def _normalize_month_variants(dates: pd.Series) -> pd.Series:
+    """Rewrites dates like '30-Sept-24' or '7-February-25' into the '%d-%b-%y' form"""
+    parts = dates.str.extract(ACLED_DATE_PATTERN)
+    months = parts[1].str.lower().map(MONTH_VARIANTS)
+    variant = months.notna()
+    normalized = dates.copy()
+    normalized[variant] = (
+        parts[0][variant] + "-" + months[variant] + "-" + parts[2][variant]
+    )
+    return normalized
+
+
+def safe_convert_to_datetime(
+    df: pd.DataFrame, column_name: str, stats: dict = None
+) -> pd.DataFrame:
     """
     Converts a dataframe column containing dates in string format like '7-Feb-25'
     or '30-Sept-24' into datetime objects. Handles errors gracefully.
 
+    Each distinct date string is parsed once and the results are mapped back onto
+    the rows, so the cost depends on the number of distinct dates and not on the
+    number of rows. Distinct values are parsed with '%d-%b-%y' first, then after
+    normalizing month variants ('Sept', full month names), and only the remaining
+    values go through the slower per-value format inference. Unparseable values
+    become NaT.
+
     Parameters:
     df (pd.DataFrame): The input DataFrame.
     column_name (str): The name of the column containing date strings.
+    stats (dict): Optional, filled with the number of rows resolved by each path
+                  ("fast", "normalized", "fallback", "unparsed").
 
     Returns:
     pd.DataFrame: A DataFrame with the specified column converted to datetime objects.
     """
-    # Attempt to convert to datetime
-    try:
-        # First attempt using '%d-%b-%y' for typical format
-        df[column_name] = pd.to_datetime(
-            df[column_name], format="%d-%b-%y", errors="raise"
+    column = df[column_name]
+    if pd.api.types.is_datetime64_any_dtype(column):
+        if stats is not None:
+            stats.update(fast=0, normalized=0, fallback=0, unparsed=0)
+        return df
+
+    # Parse every distinct date string once, rows refer to them by code
+    codes, uniques = pd.factorize(column)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+
+    # Typical format first
+    parsed = pd.to_datetime(uniques, format="%d-%b-%y", errors="coerce")
+    fast = parsed.notna().to_numpy()
+
+    # Known month variants, e.g. '30-Sept-24'
+    pending = ~fast
+    if pending.any():
+        parsed[pending] = pd.to_datetime(
+            _normalize_month_variants(uniques[pending]),
+            format="%d-%b-%y",
+            errors="coerce",
+        )
+    normalized = pending & parsed.notna().to_numpy()
+
+    # Anything else is parsed value by value with format inference
+    pending = parsed.isna().to_numpy()
+    if pending.any():
+        parsed[pending] = pd.to_datetime(
+            uniques[pending], format="mixed", errors="coerce"
         )
-    except ValueError:
-        # Handle edge cases where month abbreviation might be longer, or the day format might be inconsistent
-        df[column_name] = pd.to_datetime(df[column_name], errors="coerce")
+    fallback = pending & parsed.notna().to_numpy()
+
+    # Missing values have code -1 and map to NaT
+    values = parsed.to_numpy(dtype="datetime64[ns]")
+    df[column_name] = pd.Series(
+        np.where(codes >= 0, values[codes], np.datetime64("NaT", "ns")),
+        index=df.index,
+    )
 
+    if stats is not None:
+        rows_per_unique = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        stats["fast"] = int(rows_per_unique[fast].sum())
+        stats["normalized"] = int(rows_per_unique[normalized].sum())
+        stats["fallback"] = int(rows_per_unique[fallback].sum())
+        stats["unparsed"] = len(codes) - (
+            stats["fast"] + stats["normalized"] + stats["fallback"]
+        )
     return df
 
 
+def _parse_event_dates(chunk: pa.Table, date_stats: dict = None) -> pa.Table:
+    """Converts the event_date column of a block of rows to timestamps"""
+    chunk_stats = {}
+    event_dates = safe_convert_to_datetime(
+        chunk.select(["event_date"]).to_pandas(), "event_date", stats=chunk_stats
+    )["event_date"]
+    if date_stats is not None:
+        for path, rows in chunk_stats.items():
+            date_stats[path] = date_stats.get(path, 0) + rows
+    return chunk.set_column(
+        chunk.schema.get_field_index("event_date"),
+        "event_date",
+        pa.array(event_dates.astype("datetime64[ns]"), type=pa.timestamp("ns")),
+    )
+
+
+def parse_acled_upload(
+    source, file_name: str, memory_limit: int = DEFAULT_MEMORY_LIMIT
+) -> tuple:
+    """
+    Streams a single ACLED export into an Arrow table, block by block, keeping
+    only the ACLED columns with their final types and converting event_date to
+    timestamps in every block. Runs in the ingest worker processes.
+
+    Parameters:
+    source: The bytes or path of the file (see ParallelIngestExecutor.read_upload).
+    file_name (str): The name of the uploaded file.
+    memory_limit (int): The admission limit of the parsed file (see CSVStreamReader).
+
+    Returns:
+    tuple: The table as Arrow IPC bytes and the number of rows resolved by each
+           date parsing path.
+    """
+    date_stats = {}
+    table = CSVStreamReader(memory_limit=memory_limit).read(
+        open_upload(source),
+        ACLED_COLUMN_TYPES,
+        transform=lambda chunk: _parse_event_dates(chunk, date_stats),
+    )
+    return table_to_bytes(table), date_stats
+
+
 class ACLEDProcessor:
-    def __init__(self, ACLED_FILES):
-        """Initilaizes the ACLEDProcessor class"""
+    def __init__(
+        self,
+        ACLED_FILES,
+        compact_storage: bool = True,
+        cache_max_bytes: int = 256 * 1024**2,
+        ingest_cache: IngestCache = None,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        ingest_workers: int = DEFAULT_INGEST_WORKERS,
+    ):
+        """
+        Initilaizes the ACLEDProcessor class
+
+        Parameters:
+        ACLED_FILES (list): The uploaded ACLED files.
+        compact_storage (bool): Store the actor and type columns as dictionary encoded
+                                categoricals instead of Python strings.
+        cache_max_bytes (int): The memory budget of the filter result cache.
+        ingest_cache (IngestCache): The on-disk cache of parsed files (defaults to
+                                    the shared cache directory).
+        memory_limit (int): The admission limit in bytes of the parsed files, files
+                            that would exceed it are skipped (see CSVStreamReader).
+        ingest_workers (int): The number of worker processes parsing the files.
+        """
 
         self.column_definition = {
             "event_id_cnty": "A unique alphanumeric event identifier by number and country acronym. This identifier remains constant even when the event details are updated.",
@@ -70,30 +294,418 @@ class ACLEDProcessor:
             "timestamp": "An automatically generated Unix timestamp that represents the exact date and time an event was uploaded to the ACLED API.",
         }
 
+        self.compact_storage = compact_storage
+        self.ingest_stats = {}
+        self.sniffer = SchemaSniffer()
+        self.query_cache = QueryCache(max_bytes=cache_max_bytes)
+        self.planner = QueryPlanner()
+        self.ingest_cache = ingest_cache if ingest_cache is not None else IngestCache()
+        self.stream_reader = CSVStreamReader(memory_limit=memory_limit)
+        self.executor = get_ingest_executor(ingest_workers)
         self.data = self._store_data_(ACLED_FILES)
+        self._build_indexes_()
+
+    def _validate_acled_file_(self, file) -> dict:
+        """Checks the header and a sample of a file against the ACLED layout before parsing it"""
+        return self.sniffer.sniff(
+            file,
+            required_columns=list(self.column_definition.keys()),
+            expected_source="ACLED",
+            numeric_columns=["latitude", "longitude", "fatalities"],
+            date_columns={
+                "event_date": lambda values: safe_convert_to_datetime(
+                    values.to_frame(), "event_date"
+                )["event_date"]
+            },
+        )
+
+    def _cache_key_(self, file) -> str | None:
+        """Returns the ingest cache key of a file, None when the cache is disabled"""
+        if not self.ingest_cache.enabled:
+            return None
+        return self.ingest_cache.key_for(file, ACLED_CACHE_NAMESPACE)
 
     def _store_data_(self, ACLED_FILES: list) -> pd.DataFrame:
-        # Initialize empty dataframe to store all data
-        all_acled_data = pd.DataFrame()
+        """
+        Reads every uploaded ACLED file once and concatenates them in a single pass.
+
+        Files already parsed in a previous session are loaded from the ingest cache.
+        Other files are first validated from their header row and a small sample,
+        files that do not follow the ACLED layout are skipped without being parsed.
+        Valid files are parsed in parallel by the worker processes of the shared
+        ingest executor, each streamed block by block into an Arrow table with the
+        ACLED column types, projected onto the ACLED columns, and counted against
+        the memory limit of the stream reader. The tables are then concatenated and converted to pandas
+        once, so loading many exports no longer copies the growing dataframe for
+        every file. Throughput and memory figures of the run are stored in
+        self.ingest_stats.
+        """
+        date_stats = {}
+        cache_hits = self.ingest_cache.hits
+        with IngestMetrics("acled") as metrics:
+            tables = self._load_tables_(ACLED_FILES, metrics, date_stats)
+            if tables:
+                all_acled_data = self._frame_from_tables_(tables, self.compact_storage)
+            else:
+                all_acled_data = pd.DataFrame(columns=list(self.column_definition.keys()))
+
+        metrics.extra["cache_hits"] = self.ingest_cache.hits - cache_hits
+        # Rows of the parsed (not cached) files per date parsing path
+        metrics.extra["date_paths"] = date_stats
+        self.ingest_stats = metrics.to_dict()
+        # return all data
+        return all_acled_data
+
+    def _load_tables_(self, ACLED_FILES: list, metrics: IngestMetrics, date_stats: dict) -> list:
+        """
+        Returns the parsed tables of the files that could be loaded, in upload order,
+        errors are shown per file.
+
+        Cached files are read from the ingest cache and the others are validated here,
+        then every remaining file is parsed in the worker processes of the shared
+        ingest executor.
+        """
+        loaded = []
         # Iterated through mutliples files from streamlit file uploader
         for file in ACLED_FILES:
             try:
-                # Read current file
-                current_file_data = pd.read_csv(file)
-                # Validate file
-                if list(current_file_data) == list(self.column_definition.keys()):
-                    # Concatenate data
-                    all_acled_data = pd.concat([current_file_data, all_acled_data])
-                else:
-                    st.info(
-                        f"Skipping {file} \nReason: does not conform to ACLED data format"
-                    )
+                key = self._cache_key_(file)
+                table = self.ingest_cache.get(key) if key else None
+                if table is not None:
+                    self.stream_reader.reserve(table.nbytes)
+                    loaded.append([file, key, table])
+                    continue
+                # Validate file from its header before the full parse
+                report = self._validate_acled_file_(file)
             except Exception as e:
                 st.error(f"Error reading {file}: {e}")
-        if not all_acled_data.empty:
-            all_acled_data.sort_values(by="event_date", ascending=True, inplace=True)
-        # return all data
-        return safe_convert_to_datetime(all_acled_data, "event_date")
+                continue
+            if not report["accepted"]:
+                st.info(
+                    f"Skipping {file} \nReason: does not conform to ACLED data format ({report['reason']})"
+                )
+                continue
+            loaded.append([file, key, None])
+
+        # Read the other files, projected onto the ACLED columns, across processes
+        pending = [entry for entry in loaded if entry[2] is None]
+        results = self.executor.map(
+            parse_acled_upload,
+            [entry[0] for entry in pending],
+            memory_limit=self.stream_reader.memory_limit - self.stream_reader.used_bytes,
+        )
+        for entry, result in zip(pending, results):
+            file, key, _ = entry
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                table, file_date_stats = result
+                self.stream_reader.reserve(table.nbytes)
+            except Exception as e:
+                st.error(f"Error reading {file}: {e}")
+                continue
+            for path, rows in file_date_stats.items():
+                date_stats[path] = date_stats.get(path, 0) + rows
+            if key:
+                self.ingest_cache.put(key, table)
+            entry[2] = table
+
+        tables = []
+        for entry in loaded:
+            if entry[2] is not None:
+                tables.append(entry[2])
+                metrics.add_rows(entry[2].num_rows)
+        loaded.clear()
+        return tables
+
+    def _frame_from_tables_(self, tables: list, encode: bool) -> pd.DataFrame:
+        """
+        Concatenates parsed ACLED tables into a dataframe sorted by event_date,
+        keeping only the latest revision of every event.
+
+        The list of tables is emptied, so the parsed buffers are released as soon
+        as the rows are sorted, and the conversion to pandas frees each Arrow column
+        once it is converted, instead of holding the parsed, converted and sorted
+        copies at once.
+        """
+        all_acled_table = pa.concat_tables(tables)
+        tables.clear()
+        keep = self._latest_revisions_(all_acled_table)
+        # Encode before reordering so the row copy only moves integer codes
+        if encode:
+            all_acled_table = self._dictionary_encode_(all_acled_table)
+        # Keep the latest revisions, in date order (missing dates first)
+        event_dates = (
+            all_acled_table.column("event_date")
+            .to_numpy()
+            .astype("datetime64[ns]")
+            .view(np.int64)
+        )
+        order = keep[np.argsort(event_dates[keep], kind="stable")]
+        all_acled_table = all_acled_table.take(pa.array(order))
+        return all_acled_table.to_pandas(
+            types_mapper=NULLABLE_INTEGER_TYPES.get,
+            split_blocks=True,
+            self_destruct=True,
+        )
+
+    def _latest_revisions_(self, table: pa.Table) -> np.ndarray:
+        """
+        Returns the ascending positions of the rows to keep when events are listed
+        more than once: the row with the latest timestamp (the last one read on
+        ties). Rows without an event_id_cnty are always kept.
+        """
+        timestamps = (
+            table.column("timestamp").to_pandas().fillna(-1).to_numpy(dtype=np.int64)
+        )
+        order = np.argsort(timestamps, kind="stable")
+        ids = table.column("event_id_cnty").to_pandas().iloc[order]
+        older = ids.duplicated(keep="last").to_numpy() & ids.notna().to_numpy()
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[order[older]] = False
+        return np.flatnonzero(keep)
+
+    def _upsert_files_(self, ACLED_FILES: list) -> dict:
+        """
+        Merges newly uploaded ACLED files into the loaded data without rebuilding it.
+
+        Events are matched on event_id_cnty: a known event is replaced when the new
+        row has the same or a later timestamp (ACLED revisions), unknown events are
+        appended. The actor, time and event id indexes are updated for the changed
+        rows only, the query planner statistics are recomputed and the query cache
+        is cleared. Parsing, deduplication and index
+        maintenance depend on the size of the new files, only the final append
+        copies the existing columns.
+
+        Parameters:
+        ACLED_FILES (list): The newly uploaded ACLED files.
+
+        Returns:
+        dict: The ingestion figures of the run, with the number of inserted,
+              updated and skipped (older revision) rows.
+        """
+        date_stats = {}
+        with IngestMetrics("acled-upsert") as metrics:
+            tables = self._load_tables_(ACLED_FILES, metrics, date_stats)
+
+            counts = {"inserted": 0, "updated": 0, "skipped": 0}
+            if tables and self.data.empty:
+                # Nothing loaded yet, the new files are the whole data
+                self.data = self._frame_from_tables_(tables, self.compact_storage)
+                self._build_indexes_()
+                counts["inserted"] = len(self.data)
+            elif tables:
+                counts = self._merge_rows_(self._frame_from_tables_(tables, False))
+                self._build_statistics_()
+            self.query_cache.clear()
+
+        metrics.extra.update(counts)
+        metrics.extra["date_paths"] = date_stats
+        self.ingest_stats = metrics.to_dict()
+        return self.ingest_stats
+
+    def _merge_rows_(self, new_data: pd.DataFrame) -> dict:
+        """Upserts the rows of new_data into self.data by event_id_cnty and updates the indexes"""
+        ids = new_data["event_id_cnty"].to_numpy(dtype=object)
+        current = self.id_index.lookup(ids)
+        matched = current >= 0
+
+        # Keep the stored row when the new one is an older revision
+        new_timestamps = new_data["timestamp"].fillna(-1).to_numpy(dtype=np.int64)
+        stored_timestamps = np.full(len(ids), -1, dtype=np.int64)
+        stored_timestamps[matched] = (
+            self.data["timestamp"].iloc[current[matched]].fillna(-1).to_numpy(dtype=np.int64)
+        )
+        update = matched & (new_timestamps >= stored_timestamps)
+        insert = ~matched
+
+        updated_positions = current[update]
+        changed = self._conform_(new_data[update | insert])
+        updated = changed[update[update | insert]].reset_index(drop=True)
+        inserted = changed[insert[update | insert]].reset_index(drop=True)
+        inserted_positions = np.arange(
+            len(self.data), len(self.data) + len(inserted), dtype=np.int64
+        )
+
+        # Remove the postings of the revisions about to be replaced
+        if len(updated_positions):
+            name_codes, pair_rows, name_labels = self._actor_pairs_(
+                self.data.iloc[updated_positions], updated_positions
+            )
+            self.actor_index.remove(name_labels[name_codes], pair_rows)
+
+        # Replace the stored revisions and append the unknown events column by
+        # column (columns converted from Arrow without a copy are read-only)
+        if len(updated) or len(inserted):
+            self.data = pd.DataFrame(
+                {
+                    col: self._upsert_column_(
+                        self.data[col], updated_positions, updated[col], inserted[col]
+                    )
+                    for col in self.data.columns
+                },
+                copy=False,
+            )
+
+        if len(updated_positions):
+            name_codes, pair_rows, name_labels = self._actor_pairs_(
+                updated, updated_positions
+            )
+            self.actor_index.add(name_labels[name_codes], pair_rows)
+
+        if len(inserted):
+            self.id_index.add(inserted["event_id_cnty"], inserted_positions)
+            name_codes, pair_rows, name_labels = self._actor_pairs_(
+                inserted, inserted_positions
+            )
+            self.actor_index.add(name_labels[name_codes], pair_rows)
+
+        if len(updated) or len(inserted):
+            self.time_index.update(
+                np.concatenate((updated_positions, inserted_positions)),
+                np.concatenate(
+                    (
+                        updated["event_date"].to_numpy(dtype="datetime64[ns]"),
+                        inserted["event_date"].to_numpy(dtype="datetime64[ns]"),
+                    )
+                ),
+            )
+
+        return {
+            "inserted": int(insert.sum()),
+            "updated": int(update.sum()),
+            "skipped": int((matched & ~update).sum()),
+        }
+
+    def _upsert_column_(
+        self,
+        column: pd.Series,
+        positions: np.ndarray,
+        replacements: pd.Series,
+        new_values: pd.Series,
+    ) -> pd.Series:
+        """
+        Returns a copy of a column with the rows at positions replaced and new values
+        appended. Categoricals sharing categories are joined on their codes.
+        """
+        values = column.array
+        if len(positions):
+            values = values.copy()
+            values[positions] = replacements.array
+        if not len(new_values):
+            return pd.Series(values, copy=False)
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = np.concatenate((values.codes, new_values.cat.codes.to_numpy()))
+            return pd.Series(pd.Categorical.from_codes(codes, dtype=column.dtype))
+        # A frame concat would also scan object columns for missing values
+        return pd.concat(
+            [pd.Series(values, copy=False), new_values], ignore_index=True
+        )
+
+    def _conform_(self, new_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Casts new rows to the column types of self.data. Values missing from the
+        categorical columns are added to their categories first (the actor columns
+        keep sharing one set of categories).
+        """
+        new_data = new_data.reset_index(drop=True)
+        groups = [ACTOR_COLUMNS] + [[col] for col in CATEGORICAL_COLUMNS]
+        for columns in groups:
+            if not isinstance(self.data[columns[0]].dtype, pd.CategoricalDtype):
+                continue
+            categories = self.data[columns[0]].cat.categories
+            values = pd.unique(
+                pd.concat([new_data[col] for col in columns], ignore_index=True).dropna()
+            )
+            missing = sorted(set(values) - set(categories))
+            # New categories go last so the stored codes stay valid, and the
+            # columns of a group share one dtype instance
+            dtype = self.data[columns[0]].dtype
+            if missing:
+                dtype = pd.CategoricalDtype(categories.append(pd.Index(missing)))
+            for col in columns:
+                if missing:
+                    self.data[col] = pd.Categorical.from_codes(
+                        self.data[col].cat.codes.to_numpy(), dtype=dtype
+                    )
+                new_data[col] = pd.Categorical(new_data[col], dtype=dtype)
+        return new_data
+
+    def _dictionary_encode_(self, table: pa.Table) -> pa.Table:
+        """
+        Dictionary encodes the actor and type columns of an Arrow table.
+
+        The four actor columns are encoded against one shared, sorted dictionary so
+        they convert to pandas categoricals with identical categories (and codes).
+        """
+        # Encode the four actor columns in one pass over their concatenation
+        actor_columns = [table.column(col).combine_chunks() for col in ACTOR_COLUMNS]
+        encoded = pc.dictionary_encode(pa.concat_arrays(actor_columns))
+        # Sort the dictionary and remap the indices onto the sorted order
+        order = pc.sort_indices(encoded.dictionary).to_numpy()
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        actor_dictionary = encoded.dictionary.take(pa.array(order))
+        codes = encoded.indices.to_numpy(zero_copy_only=False)
+        nulls = encoded.indices.is_null().to_numpy(zero_copy_only=False)
+        codes = np.where(nulls, 0, codes).astype(np.int32)
+        codes = remap[codes] if len(remap) else codes
+
+        start = 0
+        for col, column in zip(ACTOR_COLUMNS, actor_columns):
+            stop = start + len(column)
+            indices = pa.array(codes[start:stop], mask=nulls[start:stop], type=pa.int32())
+            table = table.set_column(
+                table.schema.get_field_index(col),
+                col,
+                pa.DictionaryArray.from_arrays(indices, actor_dictionary),
+            )
+            start = stop
+
+        for col in CATEGORICAL_COLUMNS:
+            table = table.set_column(
+                table.schema.get_field_index(col),
+                col,
+                pc.dictionary_encode(table.column(col)),
+            )
+        return table
+
+    def _unique_values_(self, col: str) -> list:
+        """Returns the unique non-null values of a column, read from its dictionary when categorical"""
+        if self.data.empty:
+            return []
+        column = self.data[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Categories of replaced revisions may no longer be used by any row
+            codes = column.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+            return list(column.cat.categories[counts > 0])
+        return list(column.dropna().unique())
+
+    def _isin_(self, col: str, values: list, positions: np.ndarray = None) -> np.ndarray:
+        """
+        Returns a boolean array marking the rows of a column whose value is in values.
+
+        Categorical columns are matched on their integer codes through a lookup table
+        instead of comparing strings. When positions is given only those rows are tested.
+        """
+        column = self.data[col]
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            if positions is not None:
+                column = column.iloc[positions]
+            return column.isin(values).to_numpy()
+        codes = column.cat.codes.to_numpy()
+        if positions is not None:
+            codes = codes[positions]
+        wanted = column.cat.categories.get_indexer(list(values))
+        # The extra last slot is hit by code -1 (missing values) and stays False
+        lookup = np.zeros(len(column.cat.categories) + 1, dtype=bool)
+        lookup[wanted[wanted >= 0]] = True
+        return lookup[codes]
+
+    def _get_ingest_stats_(self) -> dict:
+        """Returns the rows/sec and memory figures of the last ingestion run"""
+        return self.ingest_stats
 
     def _get_columns_(self) -> list:
         """Returns a list of all column names"""
@@ -105,41 +717,130 @@ class ACLEDProcessor:
 
     def _get_disorder_types_(self) -> list:
         """Returns a list of all event types available"""
-        return list(self.data["disorder_type"].unique()) if not self.data.empty else []
+        return self._unique_values_("disorder_type")
 
     def _get_event_types_(self) -> list:
         """Returns a list of all event types available"""
-        return list(self.data["event_type"].unique()) if not self.data.empty else []
+        return self._unique_values_("event_type")
 
     def _get_sub_event_types_(self) -> list:
         """Returns a list of all event types available"""
-        return list(self.data["sub_event_type"].unique()) if not self.data.empty else []
+        return self._unique_values_("sub_event_type")
 
     def _get_description_(self, event_id_cnty: str) -> str:
         """Returns the event description note for a unique event"""
-        return (
-            self.data["note"][self.data["event_id_cnty"] == event_id_cnty]
-            if not self.data.empty
-            else ""
-        )
+        position = self.id_index.get(event_id_cnty) if not self.data.empty else -1
+        if position < 0:
+            return ""
+        notes = self.data["notes"].iat[position]
+        return "" if pd.isna(notes) else str(notes)
+
+    def _get_event_positions_(self, event_ids: list) -> np.ndarray:
+        """Returns the row position of every event id, -1 for unknown ids"""
+        return self.id_index.lookup(event_ids)
+
+    def _get_events_by_id_(self, event_ids: list, columns: list = None) -> pd.DataFrame:
+        """
+        Returns the rows of the given events in the order of event_ids, indexed by
+        event_id_cnty. Unknown ids are left out.
+
+        Parameters:
+        event_ids (list): The event_id_cnty values to look up.
+        columns (list): The columns to return (defaults to all columns).
+
+        Returns:
+        pd.DataFrame: The requested rows and columns.
+        """
+        columns = list(columns) if columns else self._get_columns_()
+        if self.data.empty:
+            return pd.DataFrame(columns=columns)
+        positions = self.id_index.lookup(event_ids)
+        rows = self.data.iloc[positions[positions >= 0]]
+        return rows[columns].set_index(rows["event_id_cnty"].rename(None))
 
     def _get_actors_(self) -> list:
         """Returns a list of all associated actors"""
-        cols = ["actor1", "assoc_actor_1", "actor2", "assoc_actor_2"]
-        actors = []
-
-        for col in cols:
-            temp = (
-                self.data[col].dropna().unique() if not self.data.empty else []
-            )  # Remove NaN values and get unique actors
-            actors.append(temp.tolist())
-
-        result = (
-            set(itertools.chain.from_iterable(actors)) if len(actors) > 0 else set()
-        )  # Flatten the list and remove duplicates
-        return list(
-            result
-        )  # Convert the set back to list if you need a list as a return type
+        # Individual actor names, including those listed in the assoc_actor columns
+        return self.actor_index.keys()
+
+    def _build_indexes_(self) -> None:
+        """Builds the actor, time and event id indexes of the data"""
+        self.actor_index = self._build_actor_index_()
+        self.time_index = SortedTimeIndex(self.data["event_date"])
+        self.id_index = HashIndex(self.data["event_id_cnty"])
+        self._build_statistics_()
+
+    def _build_statistics_(self) -> None:
+        """
+        Stores what the query planner needs per filter: the number of rows holding
+        each value, and the positions of the rows holding any value (None when
+        every row does).
+        """
+        self.cardinalities = {
+            "actors": {
+                actor: len(rows) for actor, rows in self.actor_index.postings.items()
+            }
+        }
+        self.present = {
+            "actors": self._present_(self.actor_index.lookup(self.actor_index.keys()))
+        }
+        for col in FILTERED_COLUMNS:
+            column = self.data[col]
+            counts = column.value_counts()
+            self.cardinalities[col] = {
+                value: int(count) for value, count in counts.items() if count > 0
+            }
+            self.present[col] = self._present_(np.flatnonzero(column.notna().to_numpy()))
+
+    def _present_(self, positions: np.ndarray) -> np.ndarray | None:
+        return None if len(positions) == len(self.data) else positions
+
+    def _build_actor_index_(self) -> InvertedIndex:
+        """Builds the actor -> row positions index used by the actor filter"""
+        if self.data.empty:
+            return InvertedIndex()
+        name_codes, pair_rows, name_labels = self._actor_pairs_(
+            self.data, np.arange(len(self.data), dtype=np.int64)
+        )
+        return InvertedIndex.from_codes(name_codes, pair_rows, name_labels)
+
+    def _actor_pairs_(self, data: pd.DataFrame, positions: np.ndarray) -> tuple:
+        """
+        Returns the (actor name code, row position, actor names) pairs of the rows
+        of data, whose row positions are given by positions.
+
+        The assoc_actor columns hold semicolon separated lists of actors, so every
+        distinct value of the four actor columns is split once into individual
+        actor names and the rows are expanded onto those names with numpy.
+        """
+        # Factorize the four actor columns against one shared set of values
+        values = pd.concat([data[col] for col in ACTOR_COLUMNS], ignore_index=True)
+        value_codes, uniques = pd.factorize(values)
+        rows = np.tile(np.asarray(positions, dtype=np.int64), len(ACTOR_COLUMNS))
+
+        # Split each distinct value into actor names
+        names = pd.Series(np.asarray(uniques, dtype=object)).str.split(";").explode()
+        names = names.str.strip()
+        names = names[names.notna() & (names != "")]
+        name_codes, name_labels = pd.factorize(names.to_numpy())
+
+        # Expand every row onto the actor names of its value
+        counts = np.bincount(names.index.to_numpy(), minlength=len(uniques))
+        starts = np.cumsum(counts) - counts
+        valid = value_codes >= 0
+        value_codes, rows = value_codes[valid], rows[valid]
+        repeats = counts[value_codes]
+        pair_rows = np.repeat(rows, repeats)
+        offsets = np.arange(len(pair_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        pair_names = name_codes[np.repeat(starts[value_codes], repeats) + offsets]
+
+        return pair_names, pair_rows, np.asarray(name_labels, dtype=object)
+
+    def _narrow_(self, positions: np.ndarray, col: str, values: list) -> np.ndarray:
+        """Keeps the row positions whose value in col is one of values (all rows when positions is None)"""
+        if positions is None:
+            return np.flatnonzero(self._isin_(col, values))
+        return positions[self._isin_(col, values, positions)]
 
     def _get_events_(
         self,
@@ -150,37 +851,118 @@ class ACLEDProcessor:
         start_date=None,
         end_date=None,
     ) -> pd.DataFrame:
-        """Return a subset of the original dataframe which matches all the filters"""
+        """
+        Return a subset of the original dataframe which matches all the filters
+
+        Results are memoized in the query cache, keyed by a normalized fingerprint
+        of the filters, so a Streamlit rerun with unchanged filters is a lookup.
+        """
+        key = self.query_cache.fingerprint(
+            actors=actors,
+            disorder_types=disorder_types,
+            event_types=event_types,
+            sub_event_types=sub_event_types,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        result = self.query_cache.get(key)
+        if result is None:
+            result = self._filter_events_(
+                actors=actors,
+                disorder_types=disorder_types,
+                event_types=event_types,
+                sub_event_types=sub_event_types,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            self.query_cache.put(key, result)
+        return result
+
+    def _get_cache_stats_(self) -> dict:
+        """Returns the hit/miss counters and memory use of the query cache"""
+        return self.query_cache.stats()
+
+    def _filter_events_(
+        self,
+        actors: list = None,
+        disorder_types: list = None,
+        event_types: list = None,
+        sub_event_types: list = None,
+        start_date=None,
+        end_date=None,
+    ) -> pd.DataFrame:
+        """
+        Evaluates the filters of _get_events_ without going through the query cache
+
+        The query planner drops the filters selecting every value, then runs the
+        others from the most selective one: date windows are resolved by binary
+        search on the time index, actor filters through the actor index, and the
+        type filters only test the rows kept so far.
+        """
 
         if self.data.empty:
             return pd.DataFrame()
 
-        # Create a boolean mask initialized to True for all rows
-        mask = pd.Series(True, index=self.data.index)
+        start_date = start_date if start_date else None
+        end_date = end_date if end_date else None
 
+        predicates = []
         # Apply filters only if the corresponding list is provided
         if actors:
-            mask &= (
-                self.data["actor1"].isin(actors)
-                | self.data["assoc_actor_1"].isin(actors)
-                | self.data["actor2"].isin(actors)
-                | self.data["assoc_actor_2"].isin(actors)
+            predicates.append(
+                self.planner.value_filter(
+                    "actors",
+                    actors,
+                    self.cardinalities["actors"],
+                    self._actor_rows_,
+                    self.present["actors"],
+                )
             )
+        for col, values in (
+            ("event_type", event_types),
+            ("disorder_type", disorder_types),
+            ("sub_event_type", sub_event_types),
+        ):
+            if values:
+                predicates.append(
+                    self.planner.value_filter(
+                        col,
+                        values,
+                        self.cardinalities[col],
+                        lambda selected, positions, col=col: self._narrow_(
+                            positions, col, selected
+                        ),
+                        self.present[col],
+                    )
+                )
+        predicates = [predicate for predicate in predicates if predicate is not None]
 
-        if event_types:
-            mask &= self.data["event_type"].isin(event_types)
-
-        if disorder_types:
-            mask &= self.data["disorder_type"].isin(disorder_types)
-
-        if sub_event_types:
-            mask &= self.data["sub_event_type"].isin(sub_event_types)
+        if start_date is not None or end_date is not None:
+            lo, hi = self.time_index.bounds(start_date, end_date)
+            # A date window alone is a contiguous slice of the time sorted data
+            if not predicates and self.time_index.is_contiguous:
+                self.planner.last_plan = [("event_date", hi - lo)]
+                return self.data.iloc[lo:hi]
+            predicates.append(
+                Predicate(
+                    "event_date",
+                    hi - lo,
+                    lambda positions: self.time_index.window(start_date, end_date)
+                    if positions is None
+                    else self.time_index.restrict(positions, start_date, end_date),
+                )
+            )
 
-        if start_date:
-            mask &= self.data["event_date"] >= start_date
+        # Row positions matching the filters, None means every row. Events
+        # upserted after loading are appended, so results are put in date order
+        positions = self.time_index.in_time_order(self.planner.execute(predicates))
+        if positions is None:
+            return self.data
+        return self.data.iloc[positions]
 
-        if end_date:
-            print("END", end_date)
-            mask &= self.data["event_date"] <= end_date
-        print(self.data[mask])
-        return self.data[mask]
+    def _actor_rows_(self, actors: list, positions: np.ndarray = None) -> np.ndarray:
+        """Keeps the row positions involving one of actors (all rows when positions is None)"""
+        rows = self.actor_index.lookup(actors)
+        if positions is None:
+            return rows
+        return np.intersect1d(positions, rows, assume_unique=True)
@@ -1,16 +1,381 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import io
+import itertools
+import json
+import logging
+import time
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+from classes.IngestCache import IngestCache
+from classes.IngestMetrics import IngestMetrics
+from classes.QueryCache import QueryCache
+from classes.SortedTimeIndex import SortedTimeIndex
+from classes.ParallelIngestExecutor import (
+    DEFAULT_INGEST_WORKERS,
+    get_ingest_executor,
+    table_to_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns naming the workbook and the sheet of every row
+SOURCE_COLUMNS = ["CMD file name", "CMD sheet name"]
+
+# Column holding the normalized (UTC, timezone-naive) time of every row
+TIMESTAMP_COLUMN = "CMD timestamp"
+
+# Names the CELLEX parsing logic in the ingest cache, bump it when parsing changes
+CELLEX_CACHE_NAMESPACE = "cellex-v3"
+
+LATLON_COLUMNS = ["Latitude", "Longitude"]
+
+# Text columns of the parsed tables stay in their Arrow buffers (memory-mapped for
+# cached workbooks), with NaN for missing values as in object columns
+ARROW_STRING_DTYPE = pd.StringDtype("pyarrow_numpy")
+
+# Text columns are only considered as times when their name hints at it
+TIME_NAME_HINTS = ("time", "date", "created", "modified", "start", "end")
+
+# UTC offset suffix of Cellebrite timestamps, e.g. "2024-01-05 13:22:10(UTC+3)"
+UTC_SUFFIX_PATTERN = r"\s*\(UTC(?:([+-])(\d{1,2})(?::?(\d{2}))?)?\)\s*$"
+
+
+def _is_lat_lon_column(col_name: str) -> bool:
+    """Check if a Cellex column holds latitudes or longitudes."""
+
+    return str(col_name).strip().capitalize() in LATLON_COLUMNS
+
+
+def _filter_latlon_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Filter DataFrame and return only rows that contain lat-lon data."""
+
+    filters = []
+    if all(col in df.columns for col in LATLON_COLUMNS):
+        filters.append("Latitude")
+        filters.append("Longitude")
+
+    try:
+        if filters:
+            filtered_df = df.copy()
+            filtered_df = filtered_df[filtered_df[filters].notna().all(axis=1)]
+        else:
+            filtered_df = pd.DataFrame([])
+    except Exception as e:
+        print(f"Something wrong with processing Cellex df: {e}")
+        filtered_df = pd.DataFrame([])  # Return empty DataFrame if there is error
+    return filtered_df
+
+
+def _utc_offset(match) -> str:
+    """Rewrite a "(UTC+3)" suffix as an ISO 8601 offset ("+03:00")."""
+
+    sign, hours, minutes = match.groups()
+    if sign is None:
+        return "+00:00"
+    return f"{sign}{int(hours):02d}:{minutes or '00'}"
+
+
+def _normalize_timestamps(values: pd.Series) -> pd.Series:
+    """
+    Convert a column of times into timezone-naive UTC datetimes.
+
+    Datetime columns are converted to UTC when they carry a timezone. Text is
+    parsed with the format of its first value, the values in other formats are
+    parsed one by one, and "(UTC+h)" suffixes are applied as offsets. Values
+    that are not times become NaT.
+    """
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if values.dt.tz is not None:
+            values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+        return values.astype("datetime64[ns]")
+
+    text = values.astype("string").str.strip()
+    text = text.str.replace(UTC_SUFFIX_PATTERN, _utc_offset, regex=True)
+    parsed = pd.to_datetime(text, utc=True, errors="coerce")
+    retry = parsed.isna() & text.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(
+            text[retry], utc=True, errors="coerce", format="mixed"
+        )
+    return parsed.dt.tz_localize(None).astype("datetime64[ns]")
+
+
+def _detect_time_column(df: pd.DataFrame):
+    """
+    Find the column holding the time of every row of a lat-lon sheet.
+
+    Datetime columns come first, those named like a time before the others. Text
+    columns named like a time are used when most of their first values parse.
+
+    Returns
+    -------
+    str or None
+        The column, None when the sheet has no time column.
+    """
+
+    columns = [
+        col for col in df.columns if col not in LATLON_COLUMNS + SOURCE_COLUMNS
+    ]
+    hinted = [col for col in columns if any(h in str(col).lower() for h in TIME_NAME_HINTS)]
+    typed = [col for col in columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    if typed:
+        return sorted(typed, key=lambda col: col not in hinted)[0]
+    for col in hinted:
+        if df[col].dtype != object:
+            continue
+        sample = df[col].dropna().head(100)
+        if len(sample) and _normalize_timestamps(sample).notna().mean() >= 0.9:
+            return col
+    return None
+
+
+def _convert_cell(cell):
+    """Convert an openpyxl cell value the way `pd.read_excel` does."""
+
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        # Whole numbers are read as integers
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _convert_row(row) -> list:
+    """Convert the cells of a row, without its trailing empty cells."""
+
+    converted = [_convert_cell(cell) for cell in row]
+    while converted and converted[-1] == "":
+        converted.pop()
+    return converted
+
+
+def _has_value(value) -> bool:
+    """Check that a converted cell is neither empty nor an error."""
+
+    return value != "" and value == value
+
+
+def _read_latlon_sheet(sheet, sheet_timing: dict) -> pd.DataFrame | None:
+    """
+    Stream a sheet and return its rows with lat-lon data.
+
+    The header (second row) is read first, and the rest of the sheet is only
+    streamed when it has both a Latitude and a Longitude column. Rows without
+    coordinates are dropped as they are read, the kept rows are then parsed by
+    the pandas `TextParser` exactly as `pd.read_excel(..., header=1)` would.
+
+    Parameters
+    ----------
+    sheet : openpyxl.worksheet.ReadOnlyWorksheet
+        The sheet of a workbook opened in read-only mode.
+    sheet_timing : dict
+        Filled with the seconds spent, the rows read and kept, and whether the
+        sheet was parsed.
+
+    Returns
+    -------
+    pd.DataFrame or None
+        The lat-lon rows, None when the sheet has no lat-lon columns.
+    """
+
+    start = time.perf_counter()
+    sheet.reset_dimensions()
+    rows = sheet.rows
+    # Title row and header row
+    leading = [_convert_row(row) for row in itertools.islice(rows, 2)]
+    header = leading[1] if len(leading) > 1 else []
+    sheet_timing.update(parsed=False, rows_read=0, rows_kept=0)
+    if not all(col in header for col in LATLON_COLUMNS):
+        sheet_timing["seconds"] = round(time.perf_counter() - start, 4)
+        return None
+
+    lat_pos, lon_pos = (header.index(col) for col in LATLON_COLUMNS)
+    needed = max(lat_pos, lon_pos) + 1
+    width = max(len(row) for row in leading)
+    kept, positions = [], []
+    for position, row in enumerate(rows):
+        converted = _convert_row(row)
+        sheet_timing["rows_read"] += 1
+        # Columns past the header still count, as read_excel pads every row
+        width = max(width, len(converted))
+        if (
+            len(converted) >= needed
+            and _has_value(converted[lat_pos])
+            and _has_value(converted[lon_pos])
+        ):
+            kept.append(converted)
+            positions.append(position)
+
+    sheet_timing["parsed"] = True
+    sheet_timing["rows_kept"] = len(kept)
+    data = None
+    if kept:
+        data = leading + kept
+        data = [row + [""] * (width - len(row)) for row in data]
+        data = TextParser(data, header=1, skip_blank_lines=False).read()
+        # Number the rows as in the whole sheet
+        data.index = pd.Index(positions)
+    sheet_timing["seconds"] = round(time.perf_counter() - start, 4)
+    return data
+
+
+def read_cellex_sheets(
+    cellex_file, file_name: str, timings: dict = None
+) -> list[pd.DataFrame]:
+    """
+    Read a workbook and return the rows with lat-lon data of every sheet.
+
+    The workbook is opened in read-only mode and streamed sheet by sheet: only
+    the sheets whose header has lat-lon columns are read past their header (see
+    `_read_latlon_sheet`), so sheets without coordinates cost a couple of rows.
+    The time of every row, taken from the time column found in its sheet, is
+    stored normalized in "CMD timestamp" (NaT when the sheet has none).
+
+    Parameters
+    ----------
+    cellex_file : file-like or str
+        The workbook.
+    file_name : str
+        The name of the uploaded workbook, stored in "CMD file name".
+    timings : dict, optional
+        Filled with the seconds spent on the workbook and, under "sheets", the
+        timing of every sheet.
+
+    Returns
+    -------
+    list[pd.DataFrame]
+        The lat-lon rows of every sheet that has any.
+    """
+
+    timings = {} if timings is None else timings
+    timings["sheets"] = {}
+    start = time.perf_counter()
+    workbook = load_workbook(cellex_file, read_only=True, data_only=True, keep_links=False)
+
+    sheets = []
+    try:
+        # Cellex data has one sheet per kind of record
+        for sheet in workbook.worksheets:
+            sheet_timing = timings["sheets"].setdefault(sheet.title, {})
+            df = _read_latlon_sheet(sheet, sheet_timing)
+            if df is None:
+                continue
+            # Filter only rows with lat-lon data
+            filtered_df = _filter_latlon_rows(df)
+            if not filtered_df.empty:
+                # Normalize the time of every row, for time windows
+                time_column = _detect_time_column(filtered_df)
+                sheet_timing["time_column"] = (
+                    None if time_column is None else str(time_column)
+                )
+                filtered_df.loc[:, TIMESTAMP_COLUMN] = (
+                    _normalize_timestamps(filtered_df[time_column])
+                    if time_column is not None
+                    else pd.Series(pd.NaT, index=filtered_df.index, dtype="datetime64[ns]")
+                )
+                # Provide a sheet source key (e.g., "Locations")
+                filtered_df.loc[:, "CMD sheet name"] = sheet.title
+                filtered_df.loc[:, "CMD file name"] = file_name
+                sheets.append(filtered_df)
+    finally:
+        workbook.close()
+    timings["seconds"] = round(time.perf_counter() - start, 4)
+    return sheets
+
+
+def sheets_to_table(sheets: list[pd.DataFrame]) -> pa.Table:
+    """
+    Combine the sheets of a workbook into one Arrow table. The name, columns
+    and row count of each sheet are kept in the schema metadata.
+    """
+
+    if not sheets:
+        return pa.table({}).replace_schema_metadata({"cellex_sheets": "[]"})
+    table = pa.Table.from_pandas(pd.concat(sheets), preserve_index=False)
+    layout = [
+        {
+            "sheet": str(df["CMD sheet name"].iloc[0]),
+            "columns": [str(col) for col in df.columns],
+            "rows": len(df),
+        }
+        for df in sheets
+    ]
+    return table.replace_schema_metadata({"cellex_sheets": json.dumps(layout)})
+
+
+def parse_cellex_upload(source, file_name: str) -> tuple:
+    """
+    Read the lat-lon rows of a workbook in an ingest worker process.
+
+    Parameters
+    ----------
+    source : bytes or str
+        The bytes or path of the workbook (see ParallelIngestExecutor.read_upload).
+    file_name : str
+        The name of the uploaded workbook.
+
+    Returns
+    -------
+    tuple
+        The sheets as Arrow IPC bytes (see sheets_to_table) and the timings of
+        the workbook and its sheets (see read_cellex_sheets).
+    """
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    timings = {}
+    sheets = read_cellex_sheets(source, file_name, timings)
+    return table_to_bytes(sheets_to_table(sheets)), timings
 
 
 class CELLEXProcessor:
 
-    def __init__(self, CELLEX_FILES):
-        """Initialize the CELLEXProcessor class."""
+    def __init__(
+        self,
+        CELLEX_FILES,
+        ingest_cache: IngestCache = None,
+        ingest_workers: int = DEFAULT_INGEST_WORKERS,
+        cache_max_bytes: int = 256 * 1024**2,
+    ):
+        """
+        Initialize the CELLEXProcessor class.
+
+        Parameters
+        ----------
+        CELLEX_FILES : list
+            The uploaded CELLEX workbooks.
+        ingest_cache : IngestCache
+            The on-disk cache of parsed files (defaults to the shared cache
+            directory).
+        ingest_workers : int
+            The number of worker processes reading the workbooks.
+        cache_max_bytes : int
+            The memory budget of the cached multi-device selections.
+        """
 
-        self.latlon_columns = ["Latitude", "Longitude"]
+        self.latlon_columns = LATLON_COLUMNS
+        self.query_cache = QueryCache(max_bytes=cache_max_bytes)
+        self.ingest_cache = ingest_cache if ingest_cache is not None else IngestCache()
+        self.executor = get_ingest_executor(ingest_workers)
         self.data = self._store_data_(CELLEX_FILES)
+        self._format_time_()
+        # Per device, so a time window of a device is a slice of its rows
+        self.time_indexes = {
+            cellex: SortedTimeIndex(df[TIMESTAMP_COLUMN])
+            for cellex, df in self.data.items()
+            if TIMESTAMP_COLUMN in df.columns
+        }
 
     def _is_lat_lon(self, col_name: str) -> bool:
         """
@@ -29,93 +394,302 @@ class CELLEXProcessor:
             visualization.
         """
 
-        return col_name.strip().capitalize() in self.latlon_columns
+        return _is_lat_lon_column(col_name)
+
+    def _store_data_(self, CELLEX_FILES: list) -> dict[str, pd.DataFrame]:
+        """
+        Read every uploaded workbook, in parallel worker processes.
+
+        Reading a workbook holds the GIL, so workbooks are read by the processes of
+        the shared ingest executor and come back as Arrow tables. Every sheet with
+        lat-lon rows is then written once to the ingest cache, and workbooks parsed
+        in a previous session are memory-mapped from it instead of being read
+        again (see _read_cached_workbook_). The timings of every read workbook and
+        sheet are stored in self.ingest_stats.
+
+        Every workbook is kept as one typed DataFrame holding the lat-lon rows of
+        all its sheets, where the file and sheet names are categorical columns
+        sharing the same categories across workbooks.
+        """
+
+        with IngestMetrics("cellex") as metrics:
+            cellex_data = self._load_workbooks_(CELLEX_FILES, metrics)
+            self._categorize_sources_(cellex_data)
+        self.ingest_stats = metrics.to_dict()
+        return cellex_data
+
+    def _load_workbooks_(
+        self, CELLEX_FILES: list, metrics: IngestMetrics
+    ) -> dict[str, pd.DataFrame]:
+        """Read the workbooks of _store_data_, recording their timings in metrics."""
 
-    def _store_data_(self, CELLEX_FILES: list) -> dict[str, dict[str, list]]:
         cellex_data = {}
-        with ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(self._process_cellex_data, cellex_file)
-                for cellex_file in CELLEX_FILES
-            ]
-            for future in as_completed(futures):
-                file_name, result = future.result()
-                if isinstance(result, str) and result.startswith("error::"):
-                    st.error(
-                        f"Error reading {file_name.name}: {result.replace('error::', '')}"
+        workbook_timings = metrics.extra.setdefault("workbooks", {})
+        cache_hits = 0
+        loaded = []
+        for cellex_file in CELLEX_FILES:
+            try:
+                start = time.perf_counter()
+                key = self._cache_key_(cellex_file)
+                table = (
+                    self._read_cached_workbook_(key, cellex_file.name) if key else None
+                )
+                if table is not None:
+                    cache_hits += 1
+                    workbook_timings[cellex_file.name] = {
+                        "cached": True,
+                        "seconds": round(time.perf_counter() - start, 4),
+                    }
+            except Exception as e:
+                st.error(f"Error reading {cellex_file.name}: {e}")
+                continue
+            loaded.append([cellex_file, key, table])
+
+        pending = [entry for entry in loaded if entry[2] is None]
+        results = self.executor.map(
+            parse_cellex_upload, [entry[0] for entry in pending]
+        )
+        for entry, result in zip(pending, results):
+            cellex_file, key, _ = entry
+            if isinstance(result, (pa.ArrowInvalid, pa.ArrowTypeError)):
+                # Columns mixing types cannot be stored as Arrow, read the
+                # workbook here and keep it uncached
+                logger.warning("Not caching %s: %s", cellex_file.name, result)
+                try:
+                    entry[2] = self._read_cellex_sheets_(
+                        cellex_file, workbook_timings.setdefault(cellex_file.name, {})
                     )
-                else:
-                    cellex_data[file_name.name] = result
+                except Exception as e:
+                    st.error(f"Error reading {cellex_file.name}: {e}")
+                continue
+            if isinstance(result, Exception):
+                st.error(f"Error reading {cellex_file.name}: {result}")
+                continue
+            table, workbook_timings[cellex_file.name] = result
+            if key:
+                self._write_cached_workbook_(key, table)
+            entry[2] = table
+        metrics.extra["cache_hits"] = cache_hits
+
+        for cellex_file, _, sheets in loaded:
+            if sheets is None:
+                continue
+            cellex_data[cellex_file.name] = self._process_cellex_data(sheets)
+            metrics.add_rows(len(cellex_data[cellex_file.name]))
         return cellex_data
 
+    def _categorize_sources_(self, cellex_data: dict[str, pd.DataFrame]) -> None:
+        """
+        Store the file and sheet name columns as categoricals, with the same
+        categories in every workbook so selections concatenate without casting.
+        """
+
+        frames = [df for df in cellex_data.values() if not df.empty]
+        for column in SOURCE_COLUMNS:
+            categories = pd.unique(
+                np.concatenate([df[column].astype(str).unique() for df in frames])
+                if frames
+                else np.array([], dtype=object)
+            )
+            dtype = pd.CategoricalDtype(categories)
+            for df in frames:
+                df[column] = df[column].astype(str).astype(dtype)
+
+    def _format_time_(self) -> None:
+        """Keep the rows of every device in time order, rows without a time first."""
+
+        for cellex, df in self.data.items():
+            if TIMESTAMP_COLUMN not in df.columns:
+                continue
+            times = df[TIMESTAMP_COLUMN]
+            missing = times.isna().to_numpy()
+            # Rows already in order are kept as they are, without copying them
+            if not missing[missing.argmin() :].any() and (
+                times[~missing].is_monotonic_increasing
+            ):
+                continue
+            self.data[cellex] = df.sort_values(
+                by=TIMESTAMP_COLUMN, kind="stable", na_position="first"
+            ).reset_index(drop=True)
+
+    def _cache_key_(self, cellex_file) -> str | None:
+        """Return the ingest cache key of a workbook, None when the cache is disabled."""
+
+        if not self.ingest_cache.enabled:
+            return None
+        return self.ingest_cache.key_for(cellex_file, CELLEX_CACHE_NAMESPACE)
+
+    @staticmethod
+    def _sheet_cache_key_(key: str, sheet: str) -> str:
+        """Return the ingest cache key of a sheet of the workbook cached under key."""
+
+        digest = hashlib.blake2b(sheet.encode(), digest_size=8).hexdigest()
+        return f"{key}-sheet-{digest}"
+
+    def _write_cached_workbook_(self, key: str, table: pa.Table) -> None:
+        """
+        Write the sheets of a workbook table (see sheets_to_table) to the ingest cache.
+
+        Every sheet is stored uncompressed under its own key, with only its own
+        columns and without the file and sheet name columns, so it can be
+        memory-mapped back. A small manifest listing the sheets is stored under the
+        workbook key, last, so a workbook is only found once all its sheets are.
+        """
+
+        layout = json.loads(table.schema.metadata[b"cellex_sheets"])
+        start = 0
+        for sheet in layout:
+            columns = [col for col in sheet["columns"] if col not in SOURCE_COLUMNS]
+            self.ingest_cache.put(
+                self._sheet_cache_key_(key, sheet["sheet"]),
+                table.slice(start, sheet["rows"]).select(columns),
+                compression="uncompressed",
+            )
+            start += sheet["rows"]
+        manifest = pa.table(
+            {
+                "sheet": pa.array([sheet["sheet"] for sheet in layout], pa.string()),
+                "rows": pa.array([sheet["rows"] for sheet in layout], pa.int64()),
+            }
+        )
+        self.ingest_cache.put(key, manifest)
+
+    def _read_cached_workbook_(self, key: str, file_name: str) -> pa.Table | None:
+        """
+        Memory-map the cached sheets of a workbook and combine them into one table.
+
+        Parameters
+        ----------
+        key : str
+            The ingest cache key of the workbook.
+        file_name : str
+            The name of the uploaded workbook, stored in "CMD file name".
+
+        Returns
+        -------
+        pa.Table or None
+            The lat-lon rows of every sheet, None when the workbook (or one of its
+            sheets, evicted since) is not cached.
+        """
+
+        manifest = self.ingest_cache.get(key)
+        if manifest is None:
+            return None
+        sheets = []
+        for sheet in manifest.column("sheet").to_pylist():
+            table = self.ingest_cache.get(
+                self._sheet_cache_key_(key, sheet), memory_map=True
+            )
+            if table is None:
+                return None
+            # The name columns hold a single value, stored as a one-entry dictionary
+            indices = pa.array(np.zeros(table.num_rows, dtype=np.int32))
+            for column, value in (("CMD sheet name", sheet), ("CMD file name", file_name)):
+                table = table.append_column(
+                    column, pa.DictionaryArray.from_arrays(indices, pa.array([value]))
+                )
+            sheets.append(table)
+        if not sheets:
+            return pa.table({})
+        return pa.concat_tables(sheets, promote_options="default")
+
     def _get_actors_(self):
         return list(set(self.data.keys()))
 
-    def _get_meta_data_(self, cellexs: list = None) -> pd.DataFrame:
-        """Return a subset of the data which matches the selected cellexs in a DataFrame."""
+    def _get_meta_data_(
+        self, cellexs: list = None, start_date=None, end_date=None
+    ) -> pd.DataFrame:
+        """
+        Return a subset of the data which matches the selected cellexs in a DataFrame.
+
+        Rows of a device are kept in time order, so the rows timed within
+        [start_date, end_date] are a slice found by binary search in its time index
+        (rows without a time are left out as soon as a bound is given). A single
+        device is answered with a slice of its stored DataFrame, without copying.
+        The slices of several devices are concatenated once, in upload order, and
+        kept in the query cache so later reruns with the same filters reuse them.
+        Rows keep the index label they have in their device, which with the
+        device name identifies a record whatever the selection (see
+        MapGenerator._cellex_ids_). The returned DataFrame is shared and must not
+        be modified in place.
+
+        Parameters
+        ----------
+        cellexs : list
+            The selected device files.
+        start_date : datetime, optional
+            The earliest time (UTC) of the rows.
+        end_date : datetime, optional
+            The latest time (UTC) of the rows, included.
+        """
 
-        if not self.data:
+        start_date = None if pd.isna(start_date) else start_date
+        end_date = None if pd.isna(end_date) else end_date
+        selected = set(cellexs or [])
+        frames = []
+        for cellex, df in self.data.items():
+            if cellex not in selected or df.empty:
+                continue
+            if start_date is not None or end_date is not None:
+                lo, hi = self.time_indexes[cellex].bounds(start_date, end_date)
+                df = df.iloc[lo:hi]
+            if not df.empty:
+                frames.append(df)
+        if not frames:
             return pd.DataFrame()
-        else:
-            filtered_metadata = []
-            for cellex in cellexs:
-                metadata = self.data[cellex].get("metadata")
-                filtered_metadata.extend(metadata)
-            return pd.DataFrame(filtered_metadata)
+        if len(frames) == 1:
+            return frames[0]
+
+        key = self.query_cache.fingerprint(
+            cellexs=list(selected & self.data.keys()),
+            start_date=start_date,
+            end_date=end_date,
+        )
+        result = self.query_cache.get(key)
+        if result is None:
+            result = pd.concat(frames)
+            self.query_cache.put(key, result)
+        return result
 
     def _filter_cellex_df(self, df: pd.DataFrame) -> pd.DataFrame:
         """Filter DataFrame and return only rows that contain lat-lon data."""
 
-        filters = []
-        if all(col in df.columns for col in self.latlon_columns):
-            filters.append("Latitude")
-            filters.append("Longitude")
-
-        try:
-            if filters:
-                filtered_df = df.copy()
-                filtered_df = filtered_df[filtered_df[filters].notna().all(axis=1)]
-            else:
-                filtered_df = pd.DataFrame([])
-        except Exception as e:
-            print(f"Something wrong with processing Cellex df: {e}")
-            filtered_df = pd.DataFrame([])  # Return empty DataFrame if there is error
-        return filtered_df
-
-    def _process_cellex_data(self, cellex_file: str) -> dict[str, list]:
-        """Process Cellex data (i.e., has lat-lon data)."""
-
-        # Read data
-        excel_file = pd.read_excel(cellex_file, sheet_name=None, header=1)
-
-        # For mapping of filenames to metadata/lat-lon data
-        processed_data = {
-            "metadata": [],
-            "lat_lons": [],
-        }
+        return _filter_latlon_rows(df)
+
+    def _read_cellex_sheets_(
+        self, cellex_file, timings: dict = None
+    ) -> list[pd.DataFrame]:
+        """Read a workbook in this process and return the rows with lat-lon data of every sheet."""
 
-        # Cellex data has sheet to DataFrame key-value mapping
-        for sheet in excel_file.keys():
-            # Get DataFrame
-            df = excel_file[sheet]
-
-            # Process if it has lat-lon data
-            if any(self._is_lat_lon(col) for col in df.columns):
-                # Filter only rows with lat-lon data
-                filtered_df = self._filter_cellex_df(df)
-                if not filtered_df.empty:
-                    # Provide a sheet source key (e.g., "Locations")
-                    filtered_df.loc[:, "CMD sheet name"] = sheet
-                    filtered_df.loc[:, "CMD file name"] = cellex_file.name
-
-                    # Convert to JSON-like/dictionary format
-                    filtered_data_dicts = filtered_df.to_dict(orient="records")
-                    lat_lons = [
-                        (data_dict["Latitude"], data_dict["Longitude"])
-                        for data_dict in filtered_data_dicts
-                    ]
-
-                    # Append metadata/lat-lon data
-                    processed_data["metadata"].extend(filtered_data_dicts)
-                    processed_data["lat_lons"].extend(lat_lons)
-        return cellex_file, processed_data
+        return read_cellex_sheets(cellex_file, cellex_file.name, timings)
+
+    def _process_cellex_data(
+        self, sheets: pa.Table | list[pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        Process Cellex data (i.e., has lat-lon data) into one DataFrame.
+
+        Parameters
+        ----------
+        sheets : pa.Table or list[pd.DataFrame]
+            The workbook table made by sheets_to_table, or the sheets of a
+            workbook read in this process.
+
+        Returns
+        -------
+        pd.DataFrame
+            The rows of every sheet one after the other, with the columns of all
+            the sheets (missing values where a sheet lacks a column).
+        """
+
+        if isinstance(sheets, pa.Table):
+            # One block per column, so the columns are not copied into 2D blocks
+            return sheets.to_pandas(
+                split_blocks=True,
+                types_mapper=lambda arrow_type: (
+                    ARROW_STRING_DTYPE if pa.types.is_string(arrow_type) else None
+                ),
+            )
+        if not sheets:
+            return pd.DataFrame()
+        return pd.concat(sheets, ignore_index=True)
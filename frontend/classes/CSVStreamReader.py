@@ -0,0 +1,97 @@
+# CSVStreamReader.py
+
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Admission limit of the parsed data of a processor, overridable for the docker deployment
+DEFAULT_MEMORY_LIMIT = int(os.environ.get("BYOD_INGEST_MEMORY_LIMIT", 4 * 1024**3))
+
+
+class MemoryLimitExceeded(MemoryError):
+    """Raised when parsed data would grow past the memory limit of the reader"""
+
+
+class CSVStreamReader:
+    """
+    Reads CSV uploads block by block into Arrow tables under a memory limit.
+
+    Only the requested columns are decoded, with their final types, and each
+    block can be transformed (e.g. date parsing) before it is kept, so the raw
+    text of the file is never held in memory at once. The parsed blocks of every
+    file read by the same reader count against the limit: a file that would
+    push them past it is rejected with MemoryLimitExceeded as soon as the block
+    crossing it is decoded, instead of taking the process down.
+
+    The limit is an admission limit on the data kept, not a streaming bound:
+    every accepted file is held in full, as the dashboard queries all the rows
+    in memory. It does not count the copies made after a file is accepted (the
+    Arrow IPC bytes sent back by a worker process, the pandas conversion and
+    the indexes of the processors).
+
+    Parameters:
+    memory_limit (int): The limit in bytes of the kept parsed data plus one block.
+    block_size (int): The bytes of CSV decoded at a time (defaults to 1/64 of the
+                      memory limit, between 1 MB and 16 MB).
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, block_size: int = None):
+        self.memory_limit = memory_limit
+        self.block_size = block_size or int(
+            min(max(memory_limit // 64, 1 << 20), 16 << 20)
+        )
+        self.used_bytes = 0
+
+    def reserve(self, nbytes: int) -> None:
+        """Counts data obtained elsewhere (e.g. from a cache) against the limit"""
+        if self.used_bytes + nbytes + self.block_size > self.memory_limit:
+            raise MemoryLimitExceeded(
+                f"parsed data exceeds the memory limit of {self.memory_limit / 1024**2:.0f} MB"
+            )
+        self.used_bytes += nbytes
+
+    def read(self, file, column_types: dict, transform=None) -> pa.Table:
+        """
+        Streams a CSV file into an Arrow table.
+
+        Parameters:
+        file: The uploaded file (path or file-like object).
+        column_types (dict): Maps the columns to keep, in order, to their Arrow type.
+        transform (callable): Optional, applied to every block (as a pa.Table)
+                              before it is kept, must return a pa.Table.
+
+        Returns:
+        pa.Table: The projected, typed and transformed content of the file.
+        """
+        if hasattr(file, "seek"):
+            file.seek(0)
+        reader = pa_csv.open_csv(
+            file,
+            read_options=pa_csv.ReadOptions(block_size=self.block_size),
+            # Quoted values (e.g. ACLED notes) may span lines, and blocks
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                include_columns=list(column_types.keys()),
+                strings_can_be_null=True,
+            ),
+        )
+        chunks = []
+        read_bytes = 0
+        try:
+            for batch in reader:
+                chunk = pa.Table.from_batches([batch])
+                if transform is not None:
+                    chunk = transform(chunk)
+                # The chunks of a rejected file are released as it is not kept
+                self.reserve(chunk.nbytes)
+                read_bytes += chunk.nbytes
+                chunks.append(chunk)
+        except Exception:
+            self.used_bytes -= read_bytes
+            raise
+        if not chunks:
+            empty = reader.schema.empty_table()
+            return transform(empty) if transform is not None else empty
+        return pa.concat_tables(chunks)
@@ -0,0 +1,93 @@
+# EntityTable.py
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class EntityTable:
+    """
+    Long-format table of the values held in multi-valued text columns.
+
+    A GDELT article lists the persons, organizations, places... it mentions as
+    comma separated strings. Every value of every row becomes one
+    (row_id, field_id, entity_id) entry, where entity_id points into a single
+    interned dictionary of the distinct values of all the fields. The table is
+    built once with vectorized Arrow string kernels, so listing the values of a
+    column or finding the rows mentioning one no longer re-splits every string.
+
+    Entries are ordered by field, then row, then position in the cell.
+
+    Parameters:
+    data (pd.DataFrame): The table holding the columns.
+    fields (dict): Maps each field name to a (column, separator) pair, with a
+                   None separator for single valued columns (kept whole, without
+                   stripping). A column can back several fields.
+    missing (str): The placeholder of an empty cell (e.g. "-"), skipped like nulls.
+    """
+
+    def __init__(self, data: pd.DataFrame, fields: dict, missing: str = "-"):
+        self.fields = list(fields.keys())
+        row_parts, token_parts = [], []
+        for column, separator in fields.values():
+            rows, tokens = self._split_column_(data[column], separator, missing)
+            row_parts.append(rows)
+            token_parts.append(tokens)
+
+        # Field boundaries in the entry arrays
+        self.offsets = np.cumsum([0] + [len(rows) for rows in row_parts])
+        self.row_ids = np.concatenate(row_parts).astype(np.int64, copy=False)
+        self.field_ids = np.repeat(
+            np.arange(len(self.fields), dtype=np.int8), np.diff(self.offsets)
+        )
+
+        # Intern the values of all fields in one dictionary
+        encoded = pc.dictionary_encode(pa.concat_arrays(token_parts))
+        self.entity_ids = encoded.indices.to_numpy(zero_copy_only=False).astype(
+            np.int32, copy=False
+        )
+        self.entities = np.asarray(
+            encoded.dictionary.to_numpy(zero_copy_only=False), dtype=object
+        )
+
+    @staticmethod
+    def _split_column_(column: pd.Series, separator: str, missing: str) -> tuple:
+        """Returns the row positions and the (stripped) values of a column"""
+        values = pa.array(column.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+        present = pc.and_kleene(pc.is_valid(values), pc.not_equal(values, missing))
+        present = pc.fill_null(present, False)
+        if separator is None:
+            rows = pc.indices_nonzero(present).to_numpy()
+            return rows, values.filter(present)
+        lists = pc.split_pattern(
+            pc.if_else(present, values, pa.scalar(None, pa.string())), separator
+        )
+        rows = pc.list_parent_indices(lists).to_numpy()
+        tokens = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+        return rows, tokens
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def _field_slice_(self, field: str) -> slice:
+        field_id = self.fields.index(field)
+        return slice(self.offsets[field_id], self.offsets[field_id + 1])
+
+    def pairs(self, field: str) -> tuple:
+        """Returns the (row_ids, entity_ids) arrays of a field"""
+        entries = self._field_slice_(field)
+        return self.row_ids[entries], self.entity_ids[entries]
+
+    def unique(self, field: str) -> list:
+        """Returns the distinct values of a field, in order of first appearance"""
+        entity_ids = pd.unique(self.entity_ids[self._field_slice_(field)])
+        return self.entities[entity_ids].tolist()
+
+    def fold_case(self) -> tuple:
+        """
+        Returns the case-folded id of every entity and the case-folded values, so
+        entities differing only by case share an id.
+        """
+        codes, folded = pd.factorize(pd.Series(self.entities, dtype=object).str.lower())
+        return codes, np.asarray(folded, dtype=object)
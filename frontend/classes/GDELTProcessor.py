@@ -4,11 +4,153 @@ import pandas as pd
 import streamlit as st
 import itertools
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from classes.CSVStreamReader import CSVStreamReader, DEFAULT_MEMORY_LIMIT
+from classes.EntityTable import EntityTable
+from classes.InvertedIndex import InvertedIndex
+from classes.IngestCache import IngestCache
+from classes.NearDuplicateDetector import NearDuplicateDetector
+from classes.ParallelIngestExecutor import (
+    DEFAULT_INGEST_WORKERS,
+    get_ingest_executor,
+    open_upload,
+    table_to_bytes,
+)
+from classes.QueryCache import QueryCache
+from classes.QueryPlanner import Predicate, QueryPlanner
+from classes.SchemaSniffer import SchemaSniffer
+from classes.SortedTimeIndex import SortedTimeIndex
+from classes.TextIndex import TextIndex, parse_query, tokenize
+
+# Format of V2ExtrasXML.PubTimestamp, e.g. "Feb 7, 2025 @ 13:45:00.000"
+GDELT_DATE_FORMAT = "%b %d, %Y @ %H:%M:%S.%f"
+
+# Names the GDELT parsing logic in the ingest cache, bump it when parsing changes
+GDELT_CACHE_NAMESPACE = "gdelt-v3"
+
+# Fields of the entity table: the columns listing several comma separated values
+# per article (including the themes), the single valued Source column, and its
+# comma separated terms (matched by the source filter)
+ENTITY_FIELDS = {
+    "Mentioned Persons": ("Mentioned Persons", ","),
+    "Mentioned Organizations": ("Mentioned Organizations", ","),
+    "Mentioned Countries/States": ("Mentioned Countries/States", ","),
+    "Other Mentions": ("Other Mentions", ","),
+    "Source": ("Source", None),
+    "Source terms": ("Source", ","),
+    "Categories": ("Categories", ","),
+}
+
+# One point of the location column, e.g. "POINT (36.8219 -1.2921)" (longitude first)
+GDELT_POINT_PATTERN = r"^\s*POINT\s*\(\s*(?P<lon>[^\s()]+)\s+(?P<lat>[^\s()]+)\s*\)\s*$"
+
+# Entity field matched by each filter of _get_events_
+FILTER_FIELDS = {
+    "persons": "Mentioned Persons",
+    "sources": "Source terms",
+    "organizations": "Mentioned Organizations",
+    "countries_states": "Mentioned Countries/States",
+    "other_mentions": "Other Mentions",
+}
+
+
+def _parse_publication_dates(chunk: pa.Table) -> pa.Table:
+    """Converts the V2ExtrasXML.PubTimestamp column of a block of rows to timestamps"""
+    index = chunk.schema.get_field_index("V2ExtrasXML.PubTimestamp")
+    dates = pd.to_datetime(
+        chunk.column(index).to_pandas(), format=GDELT_DATE_FORMAT
+    ).astype("datetime64[ns]")
+    return chunk.set_column(
+        index,
+        "V2ExtrasXML.PubTimestamp",
+        pa.array(dates, type=pa.timestamp("ns")),
+    )
+
+
+def parse_gdelt_points(locations: pd.Series) -> pd.DataFrame:
+    """
+    Parses the "POINT (lon lat), POINT (lon lat)" strings of the location column
+    into a flat point table, with vectorized Arrow string kernels.
+
+    Parameters:
+    locations (pd.Series): The location column.
+
+    Returns:
+    pd.DataFrame: One row per point with its article (row_id, the index label of
+                  the article), lat, lon and valid, which is False when the point
+                  could not be parsed or lies outside valid coordinates.
+    """
+    values = pa.array(locations.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    points = pc.split_pattern(values, ", ")
+    parents = pc.list_parent_indices(points).to_numpy()
+    coordinates = pc.extract_regex(pc.list_flatten(points), GDELT_POINT_PATTERN)
+    lat = pd.to_numeric(
+        coordinates.field("lat").to_pandas(), errors="coerce"
+    ).to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(
+        coordinates.field("lon").to_pandas(), errors="coerce"
+    ).to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    return pd.DataFrame(
+        {
+            "row_id": locations.index.to_numpy()[parents],
+            "lat": lat,
+            "lon": lon,
+            "valid": valid,
+        }
+    )
+
+
+def parse_gdelt_upload(
+    source, file_name: str, columns: list, memory_limit: int = DEFAULT_MEMORY_LIMIT
+) -> tuple:
+    """
+    Streams a single GDELT export into an Arrow table, block by block. Only the
+    used columns are decoded (as text) and the publication dates are parsed in
+    every block, so the other GKG columns are never held in memory. Runs in the
+    ingest worker processes.
+
+    Parameters:
+    source: The bytes or path of the file (see ParallelIngestExecutor.read_upload).
+    file_name (str): The name of the uploaded file.
+    columns (list): The GDELT columns to keep.
+    memory_limit (int): The admission limit of the parsed file (see CSVStreamReader).
+
+    Returns:
+    tuple: The table as Arrow IPC bytes and an empty dict of statistics.
+    """
+    table = CSVStreamReader(memory_limit=memory_limit).read(
+        open_upload(source),
+        {col: pa.string() for col in columns},
+        transform=_parse_publication_dates,
+    )
+    return table_to_bytes(table), {}
 
 
 class GDELTProcessor:
-    def __init__(self, GDELT_FILES):
-        """Initilaizes the GDELTProcessor class"""
+    def __init__(
+        self,
+        GDELT_FILES,
+        cache_max_bytes: int = 256 * 1024**2,
+        ingest_cache: IngestCache = None,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        ingest_workers: int = DEFAULT_INGEST_WORKERS,
+    ):
+        """
+        Initilaizes the GDELTProcessor class
+
+        Parameters:
+        GDELT_FILES (list): The uploaded GDELT files.
+        cache_max_bytes (int): The memory budget of the filter result cache.
+        ingest_cache (IngestCache): The on-disk cache of parsed files (defaults to
+                                    the shared cache directory).
+        memory_limit (int): The admission limit in bytes of the parsed files, files
+                            that would exceed it are skipped (see CSVStreamReader).
+        ingest_workers (int): The number of worker processes parsing the files.
+        """
 
         self.column_mapper = {
             "V2ExtrasXML.Title": "Headline",
@@ -16,8 +158,6 @@ class GDELTProcessor:
             "V2Persons.V1Person": "Mentioned Persons",
             "V2Orgs.V1Org": "Mentioned Organizations",
             "V2Locations.FullName": "Mentioned Countries/States",
-            "V2Locations.LocationLatitude": "latitudes",
-            "V2Locations.LocationLongitude": "longitudes",
             "location": "location",
             "V2ExtrasXML.PubTimestamp": "event_date",
             "V2DocId": "link",
@@ -25,84 +165,198 @@ class GDELTProcessor:
             "V21AllNames.Name": "Other Mentions",
         }
 
+        self.sniffer = SchemaSniffer()
+        self.query_cache = QueryCache(max_bytes=cache_max_bytes)
+        self.planner = QueryPlanner()
+        self.ingest_cache = ingest_cache if ingest_cache is not None else IngestCache()
+        self.stream_reader = CSVStreamReader(memory_limit=memory_limit)
+        self.executor = get_ingest_executor(ingest_workers)
         self.data = self._store_data_(GDELT_FILES)
         self._format_time_()
+        self.time_index = SortedTimeIndex(self.data["event_date"])
+        self.entity_table = EntityTable(self.data, ENTITY_FIELDS)
+        self.entity_filters = self._build_entity_filters_()
+        self._build_statistics_()
+        self._build_text_indexes_()
+        # Syndicated copies of an article share the cluster id of the first copy
+        self.cluster_ids = NearDuplicateDetector().cluster(self.data["Headline"])
+        # Article locations, parsed once for the map
+        self.points = parse_gdelt_points(self.data["location"])
+
+    def _validate_gdelt_file_(self, file) -> dict:
+        """Checks the header and a sample of a file against the GDELT layout before parsing it"""
+        return self.sniffer.sniff(
+            file,
+            required_columns=list(self.column_mapper.keys()),
+            expected_source="GDELT",
+            date_columns={
+                "V2ExtrasXML.PubTimestamp": lambda values: pd.to_datetime(
+                    values, format=GDELT_DATE_FORMAT, errors="coerce"
+                )
+            },
+        )
+
+    def _cache_key_(self, file) -> str | None:
+        """Returns the ingest cache key of a file, None when the cache is disabled"""
+        if not self.ingest_cache.enabled:
+            return None
+        return self.ingest_cache.key_for(file, GDELT_CACHE_NAMESPACE)
 
     def _store_data_(self, GDELT_FILES: list) -> pd.DataFrame:
-        # Initialize empty dataframe to store all data
-        all_GDELT_data = pd.DataFrame()
+        """
+        Reads every uploaded GDELT file and concatenates them once.
+
+        Files already parsed in a previous session are loaded from the ingest cache,
+        the others are validated from their header, then parsed in parallel by the
+        worker processes of the shared ingest executor and counted against the
+        memory limit of the stream reader.
+        """
+        loaded = []
         # Iterated through mutliples files from streamlit file uploader
         for file in GDELT_FILES:
             try:
-                # Read current file
-                current_file_data = pd.read_csv(file)
-
-                # Concatenate data
-                all_GDELT_data = pd.concat([current_file_data, all_GDELT_data])
+                key = self._cache_key_(file)
+                table = self.ingest_cache.get(key) if key else None
+                if table is not None:
+                    self.stream_reader.reserve(table.nbytes)
+                    loaded.append([file, key, table])
+                    continue
+                # Validate file from its header before the full parse
+                report = self._validate_gdelt_file_(file)
+            except Exception as e:
+                st.error(f"Error reading {file}: {e}")
+                continue
+            if not report["accepted"]:
+                st.info(
+                    f"Skipping {file} \nReason: does not conform to GDELT data format ({report['reason']})"
+                )
+                continue
+            loaded.append([file, key, None])
 
+        pending = [entry for entry in loaded if entry[2] is None]
+        results = self.executor.map(
+            parse_gdelt_upload,
+            [entry[0] for entry in pending],
+            list(self.column_mapper.keys()),
+            memory_limit=self.stream_reader.memory_limit - self.stream_reader.used_bytes,
+        )
+        for entry, result in zip(pending, results):
+            file, key, _ = entry
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                table, _ = result
+                self.stream_reader.reserve(table.nbytes)
             except Exception as e:
                 st.error(f"Error reading {file}: {e}")
-        # print(all_GDELT_data.head())
-        # print("END OF STORE DATA FUNCTION")
-        return all_GDELT_data[list(self.column_mapper.keys())]
+                continue
+            if key:
+                self.ingest_cache.put(key, table)
+            entry[2] = table
+
+        tables = [entry[2] for entry in loaded if entry[2] is not None]
+        loaded.clear()
+        if not tables:
+            return pd.DataFrame(columns=list(self.column_mapper.keys()))
+        # Later files first, as the previous file by file concatenation did
+        return pa.concat_tables(tables[::-1]).to_pandas()
 
     def _format_time_(self) -> None:
         self.data = self.data.rename(columns=self.column_mapper)
         self.data["event_date"] = pd.to_datetime(
-            self.data["event_date"], format="%b %d, %Y @ %H:%M:%S.%f"
+            self.data["event_date"], format=GDELT_DATE_FORMAT
+        )
+        # Keep the articles in time order so date windows are contiguous slices
+        self.data = self.data.sort_values(
+            by="event_date", kind="stable", na_position="first"
+        ).reset_index(drop=True)
+
+    def _build_entity_filters_(self) -> dict:
+        """
+        Returns an inverted index per filter, mapping each case-folded value to the
+        sorted positions of the articles mentioning it.
+        """
+        folded_ids, folded_values = self.entity_table.fold_case()
+        entity_filters = {}
+        for name, field in FILTER_FIELDS.items():
+            rows, entity_ids = self.entity_table.pairs(field)
+            entity_filters[name] = InvertedIndex.from_codes(
+                folded_ids[entity_ids], rows, folded_values
+            )
+        return entity_filters
+
+    def _build_text_indexes_(self) -> None:
+        """Builds the case-insensitive theme index and the headline word index"""
+        folded_ids, folded_values = self.entity_table.fold_case()
+        rows, entity_ids = self.entity_table.pairs("Categories")
+        self.theme_index = TextIndex(
+            rows, folded_values[folded_ids[entity_ids]], size=len(self.data)
+        )
+        self.headline_index = TextIndex(
+            *tokenize(self.data["Headline"]), size=len(self.data)
         )
 
+    def _build_statistics_(self) -> None:
+        """
+        Stores what the query planner needs per filter: the number of articles
+        holding each case-folded value, and the positions of the articles holding
+        any value (None when every article does).
+        """
+        self.cardinalities = {}
+        self.present = {}
+        for name, index in self.entity_filters.items():
+            self.cardinalities[name] = {
+                value: len(rows) for value, rows in index.postings.items()
+            }
+            rows = np.unique(self.entity_table.pairs(FILTER_FIELDS[name])[0])
+            self.present[name] = None if len(rows) == len(self.data) else rows
+
+    def _get_points_(self, gdelt_data: pd.DataFrame = None, valid_only: bool = True) -> pd.DataFrame:
+        """
+        Returns the point table (row_id, lat, lon, valid) of the articles.
+
+        Parameters:
+        gdelt_data (pd.DataFrame): Optional, a result of _get_events_, only the points
+                                   of its articles are returned.
+        valid_only (bool): Leave out the points that could not be parsed.
+
+        Returns:
+        pd.DataFrame: The points, ordered by article.
+        """
+        points = self.points
+        if gdelt_data is not None:
+            points = points[points["row_id"].isin(gdelt_data.index)]
+        if valid_only:
+            points = points[points["valid"]]
+        return points
+
     def _get_columns_(self) -> list:
         """Returns a list of all column names"""
         return list(self.column_mapper.values())
 
     def _get_other_mentions_(self) -> list:
-        """Returns a list of all countries available"""
-        unique_other_mentions = []
-        for om in self.data["Other Mentions"].values:
-            if om != "-":
-                for a in om.split(","):
-                    if a.strip() not in unique_other_mentions:
-                        unique_other_mentions.append(a.strip())
-        return unique_other_mentions if not self.data.empty else []
+        """Returns a list of all other mentions available"""
+        return self.entity_table.unique("Other Mentions")
 
     def _get_countries_states_(self) -> list:
         """Returns a list of all countries available"""
-        unique_countries = []
-        for country in self.data["Mentioned Countries/States"].values:
-            if country != "-":
-                for a in country.split(","):
-                    if a.strip() not in unique_countries:
-                        unique_countries.append(a.strip())
-        return unique_countries if not self.data.empty else []
+        return self.entity_table.unique("Mentioned Countries/States")
 
     def _get_organizations_(self) -> list:
         """Returns a list of all organizations available"""
-        unique_orgs = []
-        for org in self.data["Mentioned Organizations"].values:
-            if org != "-":
-                for a in org.split(","):
-                    if a.strip() not in unique_orgs:
-                        unique_orgs.append(a.strip())
-        return unique_orgs if not self.data.empty else []
+        return self.entity_table.unique("Mentioned Organizations")
 
     def _get_persons_(self) -> list:
         """Returns a list of all persons available"""
-        unique_persons = []
-        for person in self.data["Mentioned Persons"].values:
-            if person != "-":
-                for a in person.split(","):
-                    if a.strip() not in unique_persons:
-                        unique_persons.append(a.strip())
-        return unique_persons if not self.data.empty else []
+        return self.entity_table.unique("Mentioned Persons")
 
     def _get_sources_(self) -> list:
         """Returns a list of all sources available"""
-        unique_authors = []
-        for author in self.data["Source"].values:
-            if author not in unique_authors:
-                unique_authors.append(author)
-        return unique_authors if not self.data.empty else []
+        return self.entity_table.unique("Source")
+
+    def _get_themes_(self) -> list:
+        """Returns a list of all themes (categories) available"""
+        return self.entity_table.unique("Categories")
 
     def _get_events_(
         self,
@@ -113,66 +367,172 @@ class GDELTProcessor:
         other_mentions: list = None,
         start_date=None,
         end_date=None,
+        themes: list = None,
+        themes_match_all: bool = False,
+        headline_query: str = None,
+        headline_match_all: bool = True,
+        collapse_duplicates: bool = False,
     ) -> pd.DataFrame:
-        """Return a subset of the original dataframe which matches all the filters"""
+        """
+        Return a subset of the original dataframe which matches all the filters
 
-        if self.data.empty:
-            return pd.DataFrame()
+        themes keeps the articles tagged with any (or all, with themes_match_all) of
+        the themes. headline_query keeps the articles whose headline holds all (or
+        any, without headline_match_all) of its words, a word ending with '*'
+        matches every word starting with it. Both ignore case.
 
-        # Default to class instance methods if no lists are provided
-        start_date = start_date or self.data["event_date"].min()
-        end_date = end_date or self.data["event_date"].max()
-        persons = persons or self._get_persons_()
-        sources = sources or self._get_sources_()
-        organizations = organizations or self._get_organizations_()
-        countries_states = countries_states or self._get_countries_states_()
-        other_mentions = other_mentions or self._get_other_mentions_()
-
-        # Ensure the start_date and end_date are datetime objects
-        # start_date = pd.to_datetime(start_date)
-        # end_date = pd.to_datetime(end_date)
-
-        # Create a mask for all conditions
-        mask = pd.Series(True, index=self.data.index)
-
-        # Helper function to check if any filter term exists in the comma-separated string
-        def contains_any(value, filter_list):
-            if isinstance(value, str) and filter_list:
-                value_list = [v.strip() for v in value.split(",")]
-                return any(
-                    term.lower() in [v.lower() for v in value_list]
-                    for term in filter_list
-                )
-            return False
+        collapse_duplicates keeps a single article (the earliest) of each cluster of
+        near-duplicate headlines, so syndicated stories count once on the map, the
+        charts and the timeline.
 
-        # Apply filters for each category (persons, sources, organizations, countries_states, other_mentions)
-        if persons:
-            mask &= self.data["Mentioned Persons"].apply(
-                lambda x: contains_any(x, persons)
+        Results are memoized in the query cache, keyed by a normalized fingerprint
+        of the filters, so a Streamlit rerun with unchanged filters is a lookup.
+        """
+        key = self.query_cache.fingerprint(
+            persons=persons,
+            sources=sources,
+            organizations=organizations,
+            countries_states=countries_states,
+            other_mentions=other_mentions,
+            start_date=start_date,
+            end_date=end_date,
+            themes=themes,
+            themes_match_all=themes_match_all,
+            headline_query=headline_query,
+            headline_match_all=headline_match_all,
+            collapse_duplicates=collapse_duplicates,
+        )
+        result = self.query_cache.get(key)
+        if result is None:
+            result = self._filter_events_(
+                persons=persons,
+                sources=sources,
+                organizations=organizations,
+                countries_states=countries_states,
+                other_mentions=other_mentions,
+                start_date=start_date,
+                end_date=end_date,
+                themes=themes,
+                themes_match_all=themes_match_all,
+                headline_query=headline_query,
+                headline_match_all=headline_match_all,
+                collapse_duplicates=collapse_duplicates,
             )
+            self.query_cache.put(key, result)
+        return result
 
-        if sources:
-            mask &= self.data["Source"].apply(lambda x: contains_any(x, sources))
+    def _get_cache_stats_(self) -> dict:
+        """Returns the hit/miss counters and memory use of the query cache"""
+        return self.query_cache.stats()
 
-        if organizations:
-            mask &= self.data["Mentioned Organizations"].apply(
-                lambda x: contains_any(x, organizations)
-            )
+    def _filter_events_(
+        self,
+        persons: list = None,
+        sources: list = None,
+        organizations: list = None,
+        countries_states: list = None,
+        other_mentions: list = None,
+        start_date=None,
+        end_date=None,
+        themes: list = None,
+        themes_match_all: bool = False,
+        headline_query: str = None,
+        headline_match_all: bool = True,
+        collapse_duplicates: bool = False,
+    ) -> pd.DataFrame:
+        """Evaluates the filters of _get_events_ without going through the query cache"""
 
-        if countries_states:
-            mask &= self.data["Mentioned Countries/States"].apply(
-                lambda x: contains_any(x, countries_states)
-            )
+        if self.data.empty:
+            return pd.DataFrame()
 
-        if other_mentions:
-            mask &= self.data["Other Mentions"].apply(
-                lambda x: contains_any(x, other_mentions)
+        # Resolve the date window by binary search
+        lo, hi = self.time_index.bounds(start_date or None, end_date or None)
+        # Articles without a publication date never match, as before
+        lo = max(lo, self.time_index.missing)
+
+        # An article matches a filter when one of its comma separated values equals
+        # one of the terms, ignoring case. An empty filter selects every value. The
+        # whole Source values are matched against the comma separated terms of
+        # Source, so the full source list is not always a full selection.
+        filters = {
+            "persons": persons,
+            "sources": sources or self._get_sources_(),
+            "organizations": organizations,
+            "countries_states": countries_states,
+            "other_mentions": other_mentions,
+        }
+        predicates = [
+            self.planner.value_filter(
+                name,
+                [term.lower() for term in terms if isinstance(term, str)]
+                if terms
+                else None,
+                self.cardinalities[name],
+                lambda selected, positions, name=name: self._entity_rows_(
+                    name, selected, positions
+                ),
+                self.present[name],
             )
+            for name, terms in filters.items()
+        ]
+        if themes:
+            predicates.append(
+                self._text_filter_("themes", self.theme_index, themes, themes_match_all)
+            )
+        headline_terms = parse_query(headline_query) if headline_query else []
+        if headline_terms:
+            predicates.append(
+                self._text_filter_(
+                    "headline", self.headline_index, headline_terms, headline_match_all
+                )
+            )
+        if lo > 0 or hi < len(self.data):
+            predicates.append(
+                Predicate(
+                    "event_date",
+                    hi - lo,
+                    lambda positions: np.arange(lo, hi, dtype=np.int64)
+                    if positions is None
+                    else positions[(positions >= lo) & (positions < hi)],
+                )
+            )
+
+        positions = self.planner.execute(predicates)
+        if collapse_duplicates:
+            if positions is None:
+                positions = np.arange(lo, hi, dtype=np.int64)
+            positions = self._collapse_(positions)
+        if positions is None:
+            return self.data.iloc[lo:hi]
+        # Return the filtered data
+        return self.data.iloc[positions]
+
+    def _collapse_(self, positions: np.ndarray) -> np.ndarray:
+        """Keeps the first of the positions of every near-duplicate cluster"""
+        _, first = np.unique(self.cluster_ids[positions], return_index=True)
+        return positions[np.sort(first)]
 
-        # Apply date range filter
-        mask &= (self.data["event_date"] >= start_date) & (
-            self.data["event_date"] <= end_date
+    def _text_filter_(
+        self, name: str, index: TextIndex, terms: list, match_all: bool
+    ) -> Predicate:
+        """Returns the predicate keeping the articles matched by a theme or headline search"""
+        return Predicate(
+            name,
+            index.search_estimate(terms, match_all),
+            lambda positions: self._restrict_(index.search(terms, match_all), positions),
         )
 
-        # Return the filtered data
-        return self.data[mask]
+    def _restrict_(self, rows: np.ndarray, positions: np.ndarray = None) -> np.ndarray:
+        """Keeps the rows among positions (all rows when positions is None)"""
+        if positions is None:
+            return rows
+        return np.intersect1d(positions, rows, assume_unique=True)
+
+    def _entity_rows_(
+        self, name: str, terms: list, positions: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Keeps the article positions holding one of the case-folded terms in the
+        field of a filter (all articles when positions is None).
+        """
+        return self._restrict_(self.entity_filters[name].lookup(terms), positions)
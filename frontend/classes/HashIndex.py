@@ -0,0 +1,81 @@
+# HashIndex.py
+
+import numpy as np
+import pandas as pd
+
+
+class HashIndex:
+    """
+    Maps unique keys (e.g. event_id_cnty) to row positions.
+
+    Keys are held in a pandas Index, whose hash table answers a single key in
+    O(1) and a batch of keys in one vectorized get_indexer call. Keys appended
+    later go to a small dictionary which is folded into the Index once it grows
+    past a fraction of it, so appends do not rebuild the hash table every time.
+
+    Parameters:
+    keys (array-like): The key of every row, missing keys are not indexed.
+    positions (array-like): The row position of each key (defaults to 0..n-1).
+    """
+
+    def __init__(self, keys=None, positions=None, rebuild_ratio: float = 0.25):
+        keys = pd.Series(keys if keys is not None else [], dtype=object)
+        if positions is None:
+            positions = np.arange(len(keys), dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        valid = keys.notna().to_numpy()
+        self.rebuild_ratio = rebuild_ratio
+        self.keys = pd.Index(keys.to_numpy()[valid], dtype=object)
+        self.positions = positions[valid]
+        self.pending = {}
+        if not self.keys.is_unique:
+            # Keep the last position of a repeated key
+            last = ~self.keys.duplicated(keep="last")
+            self.keys, self.positions = self.keys[last], self.positions[last]
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) >= 0
+
+    def get(self, key) -> int:
+        """Returns the row position of a key, -1 when the key is unknown"""
+        if key in self.pending:
+            return self.pending[key]
+        try:
+            return int(self.positions[self.keys.get_loc(key)])
+        except (KeyError, TypeError):
+            return -1
+
+    def lookup(self, keys) -> np.ndarray:
+        """Returns the row position of every key in keys, -1 for unknown keys"""
+        keys = np.asarray(keys, dtype=object)
+        indexer = self.keys.get_indexer(keys)
+        found = indexer >= 0
+        positions = np.full(len(keys), -1, dtype=np.int64)
+        positions[found] = self.positions[indexer[found]]
+        if self.pending:
+            for i in np.flatnonzero(~found):
+                positions[i] = self.pending.get(keys[i], -1)
+        return positions
+
+    def add(self, keys, positions) -> None:
+        """Indexes new keys (missing keys are ignored)"""
+        for key, position in zip(keys, np.asarray(positions, dtype=np.int64).tolist()):
+            if not pd.isna(key):
+                self.pending[key] = position
+        if len(self.pending) > self.rebuild_ratio * max(len(self.keys), 1):
+            self._rebuild_()
+
+    def _rebuild_(self) -> None:
+        """Folds the pending keys into the hashed Index"""
+        pending_keys = pd.Index(list(self.pending.keys()), dtype=object)
+        pending_positions = np.fromiter(
+            self.pending.values(), dtype=np.int64, count=len(self.pending)
+        )
+        # Pending keys replace the hashed ones they repeat
+        keep = ~self.keys.isin(pending_keys)
+        self.keys = self.keys[keep].append(pending_keys)
+        self.positions = np.concatenate((self.positions[keep], pending_positions))
+        self.pending = {}
@@ -0,0 +1,181 @@
+# IngestCache.py
+
+import hashlib
+import logging
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Where parsed uploads are cached, overridable for the docker deployment
+DEFAULT_CACHE_DIR = os.environ.get(
+    "BYOD_CACHE_DIR", os.path.join(os.getcwd(), ".byod_cache")
+)
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("BYOD_CACHE_MAX_BYTES", 2 * 1024**3))
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(file, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the BLAKE2 digest of the bytes of an uploaded file or path.
+
+    File-like objects are read in chunks and rewound afterwards.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as handle:
+            for chunk in iter(lambda: handle.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    if hasattr(file, "getbuffer"):
+        digest.update(file.getbuffer())
+        return digest.hexdigest()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class IngestCache:
+    """
+    Content-addressed on-disk cache of parsed uploads.
+
+    Entries are Arrow IPC (Feather v2) files named after a namespace and the hash
+    of the uploaded bytes, so re-uploading an identical file loads the parsed and
+    typed table instead of parsing it again. Entries written uncompressed can be
+    memory-mapped when read back. When the cache grows over its size cap the
+    least recently used entries are deleted.
+
+    Parameters:
+    cache_dir (str): The cache directory, None disables the cache.
+    max_bytes (int): The size cap of the cache directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning("Ingest cache disabled, cannot create %s: %s", self.cache_dir, e)
+                self.cache_dir = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_dir is not None
+
+    def key_for(self, file, namespace: str) -> str:
+        """
+        Returns the cache key of a file. The namespace names the parser (and its
+        version) so a change in parsing logic does not reuse stale entries.
+        """
+        return f"{namespace}-{hash_file(file)}"
+
+    def _path_(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+
+    def get(self, key: str, memory_map: bool = False) -> pa.Table | None:
+        """
+        Returns the cached table of a key, or None on a miss. With memory_map, an
+        uncompressed entry is mapped instead of read, its pages are loaded from
+        the file when the table is used.
+        """
+        if not self.enabled:
+            return None
+        path = self._path_(key)
+        try:
+            table = feather.read_table(path, memory_map=memory_map)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # A corrupt entry is dropped and treated as a miss
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            self._remove_(path)
+            self.misses += 1
+            return None
+        # Record the access for the LRU cleanup
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return table
+
+    def put(self, key: str, table: pa.Table, compression: str = "lz4") -> None:
+        """
+        Writes a table to the cache, then trims the cache to its size cap. Use
+        "uncompressed" for entries read back with memory_map.
+        """
+        if not self.enabled:
+            return
+        path = self._path_(key)
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            feather.write_feather(table, tmp_path, compression=compression)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Could not write cache entry %s: %s", path, e)
+            self._remove_(tmp_path)
+            return
+        self._cleanup_()
+
+    def _remove_(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries_(self) -> list:
+        """Returns (mtime, size, path) of every cache entry"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".arrow"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _cleanup_(self) -> None:
+        """Deletes the least recently used entries until the cache fits its size cap"""
+        try:
+            entries = sorted(self._entries_())
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove_(path)
+            total -= size
+
+    def size(self) -> int:
+        """Returns the bytes used by the cache"""
+        if not self.enabled:
+            return 0
+        return sum(size for _, size, _ in self._entries_())
+
+    def clear(self) -> None:
+        """Deletes every cache entry"""
+        if not self.enabled:
+            return
+        for _, _, path in self._entries_():
+            self._remove_(path)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes": self.size(),
+            "max_bytes": self.max_bytes,
+        }
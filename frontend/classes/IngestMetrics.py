@@ -0,0 +1,99 @@
+# IngestMetrics.py
+
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # resource is only available on POSIX platforms
+    resource = None
+
+
+def _max_rss_mb() -> float:
+    """Returns the process high-water resident set size in MB (0.0 when unavailable)"""
+    if resource is None:
+        return 0.0
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class IngestMetrics:
+    """
+    Measures the throughput and memory footprint of a data ingestion run.
+
+    Usage:
+        with IngestMetrics("acled") as metrics:
+            for file in files:
+                ...
+                metrics.add_rows(len(df))
+        print(metrics.to_dict())
+
+    Parameters:
+    label (str): The name of the ingestion run (e.g. the data source).
+    trace_memory (bool): Also track the peak of Python/NumPy allocations with
+                         tracemalloc. More precise than the RSS high-water mark but
+                         noticeably slower, so it is meant for benchmarks.
+    """
+
+    def __init__(self, label: str, trace_memory: bool = False):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.files = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.peak_traced_mb = None
+        self.rss_growth_mb = 0.0
+        self.max_rss_mb = 0.0
+        self.extra = {}
+        self._start = None
+        self._start_rss = 0.0
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        self._start_rss = _max_rss_mb()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds += time.perf_counter() - self._start
+        self.max_rss_mb = _max_rss_mb()
+        self.rss_growth_mb = max(self.max_rss_mb - self._start_rss, 0.0)
+        if self.trace_memory:
+            self.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return False
+
+    def add_rows(self, rows: int, files: int = 1) -> None:
+        """Records rows (and files) processed by the run"""
+        self.rows += int(rows)
+        self.files += files
+
+    def rows_per_sec(self) -> float:
+        """Returns the ingestion throughput"""
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        """Returns the measurements as a dictionary"""
+        stats = {
+            "label": self.label,
+            "files": self.files,
+            "rows": self.rows,
+            "seconds": round(self.seconds, 4),
+            "rows_per_sec": round(self.rows_per_sec(), 1),
+            "rss_growth_mb": round(self.rss_growth_mb, 1),
+            "max_rss_mb": round(self.max_rss_mb, 1),
+        }
+        if self.peak_traced_mb is not None:
+            stats["peak_traced_mb"] = round(self.peak_traced_mb, 1)
+        stats.update(self.extra)
+        return stats
+
+    def __str__(self) -> str:
+        return ", ".join(f"{key}={value}" for key, value in self.to_dict().items())
@@ -0,0 +1,109 @@
+# InvertedIndex.py
+
+import numpy as np
+import pandas as pd
+
+
+class InvertedIndex:
+    """
+    Maps keys (e.g. actor names) to the sorted row positions they appear in.
+
+    Each key holds a posting list: a sorted numpy array of unique row positions.
+    A query for several keys is answered by the union of their posting lists, so
+    its cost depends on the number of matching rows and not on the table size.
+    """
+
+    def __init__(self, postings: dict = None):
+        self.postings = postings if postings is not None else {}
+
+    @classmethod
+    def from_pairs(cls, keys, rows) -> "InvertedIndex":
+        """
+        Builds an index from parallel arrays of keys and row positions.
+
+        Parameters:
+        keys (array-like): The key of each pair. Missing keys are ignored.
+        rows (array-like): The row position of each pair.
+
+        Returns:
+        InvertedIndex: The index holding one posting list per distinct key.
+        """
+        codes, uniques = pd.factorize(pd.Series(keys, dtype=object))
+        return cls.from_codes(codes, rows, uniques)
+
+    @classmethod
+    def from_codes(cls, codes, rows, labels) -> "InvertedIndex":
+        """
+        Builds an index from integer key codes, avoiding any hashing of the keys.
+
+        Parameters:
+        codes (array-like): The key code of each pair, an index into labels (-1 is ignored).
+        rows (array-like): The row position of each pair.
+        labels (array-like): The key of each code.
+
+        Returns:
+        InvertedIndex: The index holding one posting list per distinct key.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = np.asarray(labels, dtype=object)
+        valid = codes >= 0
+        codes, rows = codes[valid], rows[valid]
+        if len(codes) == 0:
+            return cls()
+
+        # Sort the pairs by key then row, and drop repeated (key, row) pairs
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows = codes[keep], rows[keep]
+
+        # Split the sorted rows at every key boundary
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        posting_lists = np.split(rows, boundaries)
+        key_codes = codes[np.concatenate(([0], boundaries))]
+        return cls(dict(zip(labels[key_codes].tolist(), posting_lists)))
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def __contains__(self, key) -> bool:
+        return key in self.postings
+
+    def keys(self) -> list:
+        """Returns all the indexed keys"""
+        return list(self.postings.keys())
+
+    def posting(self, key) -> np.ndarray:
+        """Returns the row positions of a single key"""
+        return self.postings.get(key, np.empty(0, dtype=np.int64))
+
+    def lookup(self, keys) -> np.ndarray:
+        """Returns the sorted union of the row positions of every key in keys"""
+        lists = [self.postings[key] for key in keys if key in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    def add(self, keys, rows) -> None:
+        """Adds (key, row) pairs, only the posting lists of the given keys are rebuilt"""
+        for key, new_rows in InvertedIndex.from_pairs(keys, rows).postings.items():
+            current = self.postings.get(key)
+            self.postings[key] = (
+                new_rows if current is None else np.union1d(current, new_rows)
+            )
+
+    def remove(self, keys, rows) -> None:
+        """Removes (key, row) pairs, keys left without rows are dropped"""
+        for key, old_rows in InvertedIndex.from_pairs(keys, rows).postings.items():
+            current = self.postings.get(key)
+            if current is None:
+                continue
+            remaining = np.setdiff1d(current, old_rows, assume_unique=True)
+            if len(remaining):
+                self.postings[key] = remaining
+            else:
+                del self.postings[key]
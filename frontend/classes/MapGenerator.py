@@ -1,17 +1,482 @@
 import folium
+import numpy as np
 import pandas as pd
 import branca
 from folium.plugins import GroupedLayerControl
+from folium.utilities import get_obj_in_upper_tree, image_to_url
+from jinja2.utils import htmlsafe_json_dumps
 import os
 import streamlit as st
 
-# Get the absolute path for your images directory
-images_dir = os.path.join(os.getcwd(), "frontend", "images")
+from classes.GDELTProcessor import parse_gdelt_points
+from classes.PointClusterer import PointClusterer
+from classes.PopupClient import PopupClient
+
+# The images directory next to this package, whatever the working directory
+images_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "images"
+)
+
+# Render modes: one GeoJSON layer per map layer, clusters of the points per zoom
+# level, or one folium.Marker per row
+RENDER_MODES = ("geojson", "clusters", "markers")
+
+# Properties shown in the popups of the GeoJSON layers, as (column, label)
+ACLED_POPUP_FIELDS = [
+    ("event_date", "Date of Event"),
+    ("disorder_type", "Disorder Type"),
+    ("event_type", "Event Type"),
+    ("sub_event_type", "Sub Event Type"),
+    ("lat_lon", "Location"),
+    ("notes", "Event Notes"),
+    ("references", "References"),
+]
+GDELT_POPUP_FIELDS = [
+    ("event_date", "Date of News"),
+    ("Headline", "Headline"),
+    ("Mentioned Persons", "Mentioned People"),
+    ("Mentioned Organizations", "Mentioned Organizations"),
+    ("Categories", "Tagged Categories"),
+    ("references", "References"),
+]
+
+POPUP_STYLE = "font-family: Arial, sans-serif; max-height: 200px; overflow-y: auto;"
+
+
+# Loads the tooltip and popup of a point from the backend when they are shown,
+# the points only carry their id (defined once per page)
+LAZY_DETAILS_SCRIPT = """
+var byodLazyDetails = (function () {
+    var requests = {};
+    function escape(text) {
+        var div = document.createElement("div");
+        div.textContent = text === undefined || text === null ? "" : String(text);
+        return div.innerHTML;
+    }
+    function load(config, id) {
+        var url = config.url + "/popups/" + encodeURIComponent(config.dataset) +
+            "/" + encodeURIComponent(id);
+        if (!requests[url]) {
+            requests[url] = fetch(url).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            });
+            requests[url].catch(function () {
+                delete requests[url];
+            });
+        }
+        return requests[url];
+    }
+    function table(config, record) {
+        var rows = config.fields.map(function (field) {
+            return "<tr><th>" + escape(field[1]) + "</th><td>" +
+                escape(record[field[0]]) + "</td></tr>";
+        }).join("");
+        return "<div style='" + config.style + "'><table>" + rows + "</table></div>";
+    }
+    function pointOf(event) {
+        var layer = event.layer;
+        return layer && layer.feature && layer.feature.id !== undefined ? layer : null;
+    }
+    return function (group, map, config) {
+        var hovered = null;
+        group.on("mouseover", function (event) {
+            var layer = pointOf(event);
+            hovered = layer;
+            if (!layer || layer.getTooltip()) {
+                return;
+            }
+            load(config, layer.feature.id).then(function (record) {
+                layer.bindTooltip(escape(record[config.tooltip]), {sticky: true});
+                if (hovered === layer) {
+                    layer.openTooltip();
+                }
+            }, function () {});
+        });
+        group.on("mouseout", function () {
+            hovered = null;
+        });
+        group.on("click", function (event) {
+            var layer = pointOf(event);
+            if (!layer) {
+                return;
+            }
+            var popup = L.popup({maxWidth: 300})
+                .setLatLng(layer.getLatLng())
+                .setContent("Loading...")
+                .openOn(map);
+            load(config, layer.feature.id).then(function (record) {
+                popup.setContent(table(config, record));
+            }, function () {
+                popup.setContent("The details of this point are no longer available.");
+            });
+        });
+    };
+})();
+"""
+
+# Adds points given as id, lon and lat columns to a GeoJSON layer
+POINT_FEATURES_SCRIPT = """
+(function (data) {
+    var features = data.id.map(function (id, i) {
+        return {
+            type: "Feature",
+            id: id,
+            geometry: {type: "Point", coordinates: [data.lon[i], data.lat[i]]},
+            properties: {},
+        };
+    });
+    %(layer)s_add({type: "FeatureCollection", features: features});
+})(%(data)s);
+"""
+
+# Draws the clusters of the zoom level shown and the points alone in their cell,
+# markers are only created for the levels the map has been zoomed to
+CLUSTER_SCRIPT = """
+(function () {
+    var group = %(group)s;
+    var map = %(map)s;
+    var data = %(data)s;
+    var icons = data.icons.map(function (url) {
+        return url ? L.icon({iconUrl: url, iconSize: [20, 20], iconAnchor: [10, 10]}) : null;
+    });
+    function escape(text) {
+        var div = document.createElement("div");
+        div.textContent = text;
+        return div.innerHTML;
+    }
+    function clusterMarker(level, i) {
+        var count = level.count[i];
+        var size = 26 + 8 * Math.floor(Math.log10(count));
+        var columns = data.categories.length;
+        var counts = level.breakdown.slice(i * columns, (i + 1) * columns);
+        var rows = counts.map(function (categoryCount, i) {
+            return categoryCount && data.categories[i]
+                ? "<tr><th>" + escape(data.categories[i]) + ":</th><td>" + categoryCount + "</td></tr>"
+                : "";
+        }).join("");
+        var marker = L.marker([level.lat[i], level.lon[i]], {
+            icon: L.divIcon({
+                html: "<div style='width: 100%%; height: 100%%; border-radius: 50%%; " +
+                    "background: " + data.color + "; opacity: 0.85; color: white; " +
+                    "font: bold 12px Arial, sans-serif; display: flex; " +
+                    "align-items: center; justify-content: center;'>" + count + "</div>",
+                className: "",
+                iconSize: [size, size],
+            }),
+        });
+        marker.bindTooltip(
+            "<strong>" + escape(data.name) + ": " + count + "</strong><table>" + rows + "</table>"
+        );
+        marker.on("click", function () {
+            map.setView(marker.getLatLng(), Math.min(map.getZoom() + 2, map.getMaxZoom()));
+        });
+        return marker;
+    }
+    function pointMarker(level, i) {
+        var category = level.category[i];
+        var marker = L.marker([level.lat[i], level.lon[i]], {
+            icon: icons[category] || new L.Icon.Default(),
+        });
+        marker.feature = {id: level.id[i]};
+        if (!data.details) {
+            marker.bindTooltip(escape(data.categories[category] || data.name));
+        }
+        return marker;
+    }
+    var clusterLayers = {};
+    var pointLayers = {};
+    function layer(layers, zoom, levels, build) {
+        if (!layers[zoom]) {
+            var level = levels[zoom];
+            var markers = [];
+            for (var i = 0; level && i < level.lat.length; i++) {
+                markers.push(build(level, i));
+            }
+            layers[zoom] = L.featureGroup(markers);
+        }
+        return layers[zoom];
+    }
+    function show() {
+        var zoom = Math.max(data.min_zoom, Math.min(data.max_zoom, Math.floor(map.getZoom())));
+        for (var z = data.min_zoom; z <= data.max_zoom; z++) {
+            if (z === zoom) {
+                group.addLayer(layer(clusterLayers, z, data.clusters, clusterMarker));
+            } else if (clusterLayers[z]) {
+                group.removeLayer(clusterLayers[z]);
+            }
+            if (z <= zoom) {
+                group.addLayer(layer(pointLayers, z, data.points, pointMarker));
+            } else if (pointLayers[z]) {
+                group.removeLayer(pointLayers[z]);
+            }
+        }
+    }
+    if (data.details) {
+        byodLazyDetails(group, map, data.details);
+    }
+    map.on("zoomend", show);
+    show();
+})();
+"""
+
+
+def _property_values(values: pd.Series) -> list:
+    """Returns the values of a column as strings, empty for missing values"""
+    text = values.astype(str)
+    return text.where(values.notna().to_numpy(), "").tolist()
+
+
+def to_feature_collection(
+    lat: np.ndarray, lon: np.ndarray, properties: dict, ids: np.ndarray = None
+) -> dict:
+    """
+    Builds a GeoJSON FeatureCollection of points from columns.
+
+    Parameters:
+    lat (np.ndarray): The latitude of every point.
+    lon (np.ndarray): The longitude of every point.
+    properties (dict): The property name and the values (pd.Series) of every point,
+                       shown as text.
+    ids (np.ndarray): Optional, the id of every feature.
+
+    Returns:
+    dict: The FeatureCollection.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    coordinates = np.column_stack([lon, lat]).tolist()
+    names = list(properties)
+    columns = [_property_values(values) for values in properties.values()]
+    rows = zip(*columns) if columns else ((),) * len(coordinates)
+    if ids is None:
+        ids = range(len(coordinates))
+    else:
+        ids = np.asarray(ids).tolist()
+    features = [
+        {
+            "type": "Feature",
+            "id": feature_id,
+            "geometry": {"type": "Point", "coordinates": point},
+            "properties": dict(zip(names, row)),
+        }
+        for feature_id, point, row in zip(ids, coordinates, rows)
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+class _ScriptElement(branca.element.Element):
+    """A script added to the page as it is, without being compiled as a template"""
+
+    def __init__(self, script: str):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs) -> str:
+        return self.script
+
+
+def _add_lazy_details_script(element: branca.element.Element) -> None:
+    """Adds the script loading tooltips and popups from the backend to the page"""
+    element.get_root().script.add_child(
+        _ScriptElement(LAZY_DETAILS_SCRIPT), name="byod_lazy_details"
+    )
+
+
+class _GeoJsonLayer(folium.GeoJson):
+    """
+    A folium.GeoJson whose features are written to the page by a script of their
+    own. folium compiles the rendered script of an element as a template again,
+    which takes seconds for a FeatureCollection of many points (and would read a
+    "{{" in a property as template code).
+
+    With lazy_details (see MapGenerator._publish_details_), the tooltip and popup
+    of a point are loaded from the backend when shown.
+    """
+
+    def __init__(self, data: dict, lazy_details: dict = None, **kwargs):
+        super().__init__(data, **kwargs)
+        self.lazy_details = lazy_details
+
+    def render(self, **kwargs):
+        data = self.data
+        # The layer itself is rendered with a single feature without geometry, which
+        # Leaflet skips, holding the property names the tooltip and popup check
+        names = data["features"][0]["properties"] if data["features"] else {}
+        self.data = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": dict.fromkeys(names, ""),
+                }
+            ],
+        }
+        try:
+            super().render(**kwargs)
+        finally:
+            self.data = data
+        if self.lazy_details is None:
+            script = f"{self.get_name()}_add({htmlsafe_json_dumps(data)});"
+        else:
+            # The points have no properties, they are sent as columns and turned
+            # into features by the browser
+            features = data["features"]
+            columns = {
+                "id": [feature["id"] for feature in features],
+                "lon": [round(f["geometry"]["coordinates"][0], 6) for f in features],
+                "lat": [round(f["geometry"]["coordinates"][1], 6) for f in features],
+            }
+            script = POINT_FEATURES_SCRIPT % {
+                "layer": self.get_name(),
+                "data": htmlsafe_json_dumps(columns),
+            }
+            _add_lazy_details_script(self)
+            map_name = get_obj_in_upper_tree(self, folium.Map).get_name()
+            script += (
+                f"byodLazyDetails({self.get_name()}, {map_name}, "
+                f"{htmlsafe_json_dumps(self.lazy_details)});"
+            )
+        self.get_root().script.add_child(
+            _ScriptElement(script), name=f"{self.get_name()}_data"
+        )
+
+
+class _ClusterLayer(branca.element.MacroElement):
+    """
+    The clusters of a PointClusterer drawn in the layer holding this element.
+
+    Only clusters of two points or more are sent per zoom level. A point alone in
+    its cell is sent once, with the coarsest zoom it is alone on, as it stays
+    alone on every finer zoom.
+
+    Parameters:
+    clusterer (PointClusterer): The clustered points.
+    name (str): The name of the points, shown in the tooltips.
+    icons (dict): The icon image of the points of every category.
+    color (str): The color of the cluster circles.
+    lazy_details (dict): Optional, where the tooltips and popups of the points are
+                         loaded from (see MapGenerator._publish_details_).
+    """
+
+    def __init__(
+        self,
+        clusterer: PointClusterer,
+        name: str,
+        icons: dict,
+        color: str,
+        lazy_details: dict = None,
+    ):
+        super().__init__()
+        self._name = "ClusterLayer"
+        self.clusterer = clusterer
+        self.name = name
+        self.icons = icons
+        self.color = color
+        self.lazy_details = lazy_details
+
+    def _data_(self) -> dict:
+        """Returns the clusters and points of every zoom level, as flat columns"""
+        clusterer = self.clusterer
+        categories = [str(category) for category in clusterer.categories]
+        clusters = {}
+        for zoom in clusterer.zooms():
+            level = clusterer.clusters(zoom, min_count=2)
+            if level.empty:
+                continue
+            clusters[zoom] = {
+                "lat": level["lat"].round(5).tolist(),
+                "lon": level["lon"].round(5).tolist(),
+                "count": level["count"].tolist(),
+                # The count of every category, cluster after cluster
+                "breakdown": level[clusterer.categories].to_numpy().ravel().tolist(),
+            }
+
+        points = clusterer.points().sort_values("zoom", kind="stable")
+        codes = clusterer.categories.get_indexer(points["category"])
+        zooms, starts = np.unique(points["zoom"].to_numpy(), return_index=True)
+        ends = np.append(starts[1:], len(points))
+        columns = {
+            "lat": points["lat"].round(5).to_numpy(),
+            "lon": points["lon"].round(5).to_numpy(),
+            "category": codes,
+            "id": points["id"].astype(str).to_numpy(),
+        }
+        by_zoom = {
+            int(zoom): {name: values[lo:hi].tolist() for name, values in columns.items()}
+            for zoom, lo, hi in zip(zooms, starts, ends)
+        }
+        icon_urls = {
+            category: image_to_url(icon) for category, icon in self.icons.items()
+        }
+        return {
+            "name": self.name,
+            "color": self.color,
+            "min_zoom": clusterer.min_zoom,
+            "max_zoom": clusterer.max_zoom,
+            "categories": categories,
+            "icons": [icon_urls.get(category) for category in categories],
+            "clusters": clusters,
+            "points": by_zoom,
+            "details": self.lazy_details,
+        }
+
+    def render(self, **kwargs):
+        if self.lazy_details is not None:
+            _add_lazy_details_script(self)
+        script = CLUSTER_SCRIPT % {
+            "group": self._parent.get_name(),
+            "map": get_obj_in_upper_tree(self, folium.Map).get_name(),
+            "data": htmlsafe_json_dumps(self._data_()),
+        }
+        self.get_root().script.add_child(_ScriptElement(script), name=self.get_name())
 
 
 class MapGenerator:
+    """
+    Builds the folium map of the ACLED, GDELT and CELLEX events.
+
+    In the "geojson" render mode every layer holds a single GeoJSON
+    FeatureCollection: the properties of the points are taken from the columns,
+    and the icon, tooltip and popup are defined once per layer and drawn by the
+    browser, so the page grows by the properties of a point only. The "markers"
+    mode creates a folium.Marker with its own icon and popup iframe per row.
+
+    The "clusters" mode draws the clusters of the points on every zoom level (see
+    PointClusterer), with their count per event type, instead of the points. The
+    clusterers are kept in the dictionary passed by the caller, so across reruns a
+    filter change only updates the clusters with the points it added or removed.
 
-    def __init__(self, tiles: str, attr: str, zoom_start: int = 6):
+    Parameters:
+    tiles (str): The tile URL template.
+    attr (str): The tile attribution.
+    zoom_start (int): The initial zoom level.
+    render_mode (str): "geojson", "clusters" or "markers".
+    clusterers (dict): The PointClusterer of every source, kept between maps.
+    popup_client (PopupClient): Optional, uploads the tooltips and popups of the
+                                points to the backend, so the map only carries
+                                the point ids and the browser loads them on
+                                demand. They are embedded when it is not given or
+                                the backend is unavailable.
+    """
+
+    def __init__(
+        self,
+        tiles: str,
+        attr: str,
+        zoom_start: int = 6,
+        render_mode: str = "geojson",
+        clusterers: dict = None,
+        popup_client: PopupClient = None,
+    ):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"render_mode must be one of {RENDER_MODES}")
+        self.render_mode = render_mode
+        self.clusterers = {} if clusterers is None else clusterers
+        self.popup_client = popup_client
         self.ACLED_BATTLE_layer = folium.FeatureGroup(name="ACLED BATTLES", show=True)
         self.ACLED_PROTEST_layer = folium.FeatureGroup(name="ACLED PROTESTS", show=True)
         self.ACLED_RIOT_layer = folium.FeatureGroup(
@@ -26,6 +491,10 @@ class MapGenerator:
         self.ACLED_STRATEGIC_layer = folium.FeatureGroup(
             name="ACLED STRATEGIC DEVELOPMENTS", show=True, control=True
         )
+        # All ACLED events, their clusters are broken down per event type
+        self.ACLED_EVENTS_layer = folium.FeatureGroup(
+            name="ACLED EVENTS", show=True, control=True
+        )
         self.GDELT_LAYER = folium.FeatureGroup(name="GDELT", show=True, control=True)
 
         # self.GDELT_layer = folium.FeatureGroup(name="GDELT")
@@ -61,9 +530,29 @@ class MapGenerator:
 
         marker.add_to(layer)
 
-    def _generate_gdelt_markers_(self, gdelt_data: pd.DataFrame):
-        """Generate the markers for gdelt data and add it to the gdelt map layer"""
-        for index, row in gdelt_data.iterrows():
+    def _generate_gdelt_markers_(
+        self, gdelt_data: pd.DataFrame, gdelt_points: pd.DataFrame = None
+    ):
+        """
+        Generate the markers for gdelt data and add it to the gdelt map layer, one
+        marker per valid point of an article.
+
+        Parameters:
+        gdelt_data (pd.DataFrame): The articles to display.
+        gdelt_points (pd.DataFrame): The point table of the articles (see
+                                     GDELTProcessor._get_points_), parsed from the
+                                     location column when not given.
+        """
+        if gdelt_points is None:
+            gdelt_points = parse_gdelt_points(gdelt_data["location"])
+        gdelt_points = gdelt_points[
+            gdelt_points["valid"] & gdelt_points["row_id"].isin(gdelt_data.index)
+        ]
+        articles = gdelt_data.loc[gdelt_points["row_id"].unique()]
+
+        # Popups are built once per article, not once per point
+        popups = {}
+        for row_id, row in zip(articles.index, articles.to_dict("records")):
             event_date = row["event_date"]
             notes = row["Headline"]
             mp = row["Mentioned Persons"]
@@ -83,22 +572,24 @@ class MapGenerator:
                 <p><strong>References:</strong> {source_and_link}</p>
             </div>
             """
-            print(row)
-            for point in row["location"].split(", "):
-                location = (
-                    float(point.replace("(", "").replace(")", "").split(" ")[2]),
-                    float(point.replace("(", "").replace(")", "").split(" ")[1]),
-                )
-                marker = self._create_marker_(
-                    tooltip=notes,
-                    location=location,
-                    icon=self.icon_map["GDELT"],
-                    icon_color="red",
-                    color="red",
-                    popup=popup,
-                )
-
-                self._insert_marker_to_layer(marker=marker, layer=self.GDELT_LAYER)
+            popups[row_id] = (notes, popup)
+
+        for row_id, lat, lon in zip(
+            gdelt_points["row_id"].to_numpy(),
+            gdelt_points["lat"].to_numpy(),
+            gdelt_points["lon"].to_numpy(),
+        ):
+            notes, popup = popups[row_id]
+            marker = self._create_marker_(
+                tooltip=notes,
+                location=(float(lat), float(lon)),
+                icon=self.icon_map["GDELT"],
+                icon_color="red",
+                color="red",
+                popup=popup,
+            )
+
+            self._insert_marker_to_layer(marker=marker, layer=self.GDELT_LAYER)
 
     def _generate_acled_markers_(self, acled_data: pd.DataFrame):
         for index, row in acled_data.iterrows():
@@ -163,6 +654,373 @@ class MapGenerator:
             )
             self._insert_marker_to_layer(marker=marker, layer=self.CELLEX_LAYER)
 
+    def _acled_details_(self, events: pd.DataFrame) -> dict:
+        """Returns the tooltip and popup fields of acled events"""
+        # Fields combining columns, the other popup fields are columns
+        derived = {
+            "lat_lon": "("
+            + pd.to_numeric(events["latitude"], errors="coerce").astype(str)
+            + ", "
+            + pd.to_numeric(events["longitude"], errors="coerce").astype(str)
+            + ")",
+            "references": events["source"].astype(str)
+            + "; "
+            + events["source_scale"].astype(str),
+        }
+        details = {
+            "tooltip": events["actor1"].astype(str)
+            + ";  "
+            + events["actor2"].astype(str)
+            + "  |  "
+            + events["event_type"].astype(str)
+        }
+        for field, _ in ACLED_POPUP_FIELDS:
+            details[field] = derived[field] if field in derived else events[field]
+        return details
+
+    def _gdelt_details_(self, articles: pd.DataFrame) -> dict:
+        """Returns the tooltip and popup fields of gdelt articles"""
+        # Fields combining columns, the other popup fields are columns
+        derived = {
+            "references": articles["Source"].astype(str)
+            + " | "
+            + articles["link"].astype(str),
+        }
+        details = {"tooltip": articles["Headline"]}
+        for field, _ in GDELT_POPUP_FIELDS:
+            details[field] = derived[field] if field in derived else articles[field]
+        return details
+
+    def _cellex_details_(self, records: pd.DataFrame) -> tuple:
+        """
+        Returns the tooltip and popup fields of cellex records, the popup lists
+        every column a record has a value in.
+
+        Returns:
+        tuple: The fields, and the (field, label) pairs shown in the popup.
+        """
+        columns = [col for col in records.columns if col != "CMD file name"]
+        # Field names are positional, column names may not be valid identifiers
+        details = {"tooltip": records["CMD file name"]}
+        details.update({f"c{i}": records[col] for i, col in enumerate(columns)})
+        return details, [(f"c{i}", str(col)) for i, col in enumerate(columns)]
+
+    @staticmethod
+    def _cellex_ids_(records: pd.DataFrame) -> np.ndarray:
+        """Returns a stable id of every cellex record"""
+        # Row labels restart for every device, the device name makes them unique
+        devices = records["CMD file name"].astype(str)
+        return pd.util.hash_pandas_object(devices, index=True).to_numpy()
+
+    def _publish_details_(
+        self, source: str, ids, details: dict, popup_fields: list
+    ) -> dict | None:
+        """
+        Uploads the tooltip and popup fields of points to the backend.
+
+        Parameters:
+        source (str): The name of the points.
+        ids (array-like): The id of every point, as carried by the map.
+        details (dict): The field name and the values (pd.Series) of every point.
+        popup_fields (list): The (field, label) pairs shown in the popup.
+
+        Returns:
+        dict: Where the browser loads the fields of a point from, None when they
+              have to be embedded in the map.
+        """
+        if self.popup_client is None:
+            return None
+        dataset = self.popup_client.publish(
+            source,
+            np.asarray(ids).astype(str).tolist(),
+            {name: _property_values(values) for name, values in details.items()},
+        )
+        if dataset is None:
+            return None
+        return {
+            "url": self.popup_client.public_url,
+            "dataset": dataset,
+            "tooltip": "tooltip",
+            "fields": [[name, f"{label}:"] for name, label in popup_fields],
+            "style": POPUP_STYLE,
+        }
+
+    def _add_geojson_(
+        self,
+        layer: folium.FeatureGroup,
+        collection: dict,
+        icon: str,
+        tooltip_field: str,
+        popup_fields: list,
+        lazy_details: dict = None,
+    ) -> None:
+        """
+        Adds a FeatureCollection to a layer, with one icon, tooltip and popup
+        template for all its points.
+
+        Parameters:
+        layer (folium.FeatureGroup): The map layer.
+        collection (dict): The FeatureCollection of the points.
+        icon (str): The icon image of the points.
+        tooltip_field (str): The property shown as tooltip.
+        popup_fields (list): The (property, label) pairs shown in the popup.
+        lazy_details (dict): Optional, where the tooltip and popup of the points
+                             are loaded from instead of their properties.
+        """
+        if not collection["features"]:
+            return
+        marker = folium.Marker(
+            icon=folium.CustomIcon(
+                icon_image=icon, icon_size=(20, 20), icon_anchor=(10, 10)
+            )
+        )
+        if lazy_details is not None:
+            _GeoJsonLayer(collection, lazy_details=lazy_details, marker=marker).add_to(
+                layer
+            )
+            return
+        fields, aliases = zip(*popup_fields) if popup_fields else ((), ())
+        _GeoJsonLayer(
+            collection,
+            marker=marker,
+            tooltip=folium.GeoJsonTooltip(fields=[tooltip_field], labels=False),
+            popup=folium.GeoJsonPopup(
+                fields=list(fields),
+                aliases=[f"{alias}:" for alias in aliases],
+                localize=False,
+                style=POPUP_STYLE,
+                max_width=300,
+            ),
+        ).add_to(layer)
+
+    def _generate_acled_geojson_(self, acled_data: pd.DataFrame):
+        """
+        Generate one GeoJSON layer of acled events per event type.
+
+        Parameters:
+        acled_data (pd.DataFrame): The events to display.
+        """
+        lat = pd.to_numeric(acled_data["latitude"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(acled_data["longitude"], errors="coerce").to_numpy(float)
+        located = np.isfinite(lat) & np.isfinite(lon)
+        events, lat, lon = acled_data[located], lat[located], lon[located]
+        ids = events.index.to_numpy().astype(str)
+        details = self._acled_details_(events)
+        # The event type layers share a single dataset on the backend
+        lazy_details = self._publish_details_("ACLED", ids, details, ACLED_POPUP_FIELDS)
+        properties = {} if lazy_details is not None else details
+        event_types = events["event_type"].astype(str).to_numpy()
+        for event_type, layer in self.acled_event_layer_map.items():
+            selected = np.flatnonzero(event_types == event_type)
+            if len(selected) == 0:
+                continue
+            collection = to_feature_collection(
+                lat[selected],
+                lon[selected],
+                {name: values.iloc[selected] for name, values in properties.items()},
+                ids=ids[selected],
+            )
+            self._add_geojson_(
+                layer,
+                collection,
+                icon=self.icon_map[event_type],
+                tooltip_field="tooltip",
+                popup_fields=ACLED_POPUP_FIELDS,
+                lazy_details=lazy_details,
+            )
+
+    def _generate_gdelt_geojson_(
+        self, gdelt_data: pd.DataFrame, gdelt_points: pd.DataFrame = None
+    ):
+        """
+        Generate the GeoJSON layer of gdelt data, one point per valid point of an
+        article.
+
+        Parameters:
+        gdelt_data (pd.DataFrame): The articles to display.
+        gdelt_points (pd.DataFrame): The point table of the articles (see
+                                     GDELTProcessor._get_points_), parsed from the
+                                     location column when not given.
+        """
+        if gdelt_points is None:
+            gdelt_points = parse_gdelt_points(gdelt_data["location"])
+        gdelt_points = gdelt_points[
+            gdelt_points["valid"] & gdelt_points["row_id"].isin(gdelt_data.index)
+        ]
+        # The article columns of every point
+        articles = gdelt_data.loc[gdelt_points["row_id"].to_numpy()]
+        ids = gdelt_points.index.to_numpy().astype(str)
+        details = self._gdelt_details_(articles)
+        lazy_details = self._publish_details_("GDELT", ids, details, GDELT_POPUP_FIELDS)
+        collection = to_feature_collection(
+            gdelt_points["lat"].to_numpy(),
+            gdelt_points["lon"].to_numpy(),
+            {} if lazy_details is not None else details,
+            ids=ids,
+        )
+        self._add_geojson_(
+            self.GDELT_LAYER,
+            collection,
+            icon=self.icon_map["GDELT"],
+            tooltip_field="tooltip",
+            popup_fields=GDELT_POPUP_FIELDS,
+            lazy_details=lazy_details,
+        )
+
+    def _generate_cellex_geojson_(self, cellex_data: pd.DataFrame):
+        """
+        Generate the GeoJSON layer of cellex records.
+
+        Parameters:
+        cellex_data (pd.DataFrame): The records to display.
+        """
+        lat = pd.to_numeric(cellex_data["Latitude"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(cellex_data["Longitude"], errors="coerce").to_numpy(float)
+        located = np.isfinite(lat) & np.isfinite(lon)
+        records = cellex_data[located]
+        ids = self._cellex_ids_(records).astype(str)
+        details, popup_fields = self._cellex_details_(records)
+        lazy_details = self._publish_details_("CELLEX", ids, details, popup_fields)
+        collection = to_feature_collection(
+            lat[located],
+            lon[located],
+            {} if lazy_details is not None else details,
+            ids=ids,
+        )
+        self._add_geojson_(
+            self.CELLEX_LAYER,
+            collection,
+            icon=self.icon_map["CELLEX"],
+            tooltip_field="tooltip",
+            popup_fields=popup_fields,
+            lazy_details=lazy_details,
+        )
+
+    def _add_clusters_(
+        self,
+        layer: folium.FeatureGroup,
+        source: str,
+        ids,
+        lat,
+        lon,
+        categories=None,
+        icons: dict = None,
+        color: str = "red",
+        lazy_details: dict = None,
+    ) -> None:
+        """
+        Updates the clusters of a source with the selected points and draws them in
+        a layer.
+
+        Parameters:
+        layer (folium.FeatureGroup): The map layer.
+        source (str): The name of the points, which also keys their clusterer.
+        ids (array-like): A unique and stable id of every point.
+        lat (array-like): The latitude of every point.
+        lon (array-like): The longitude of every point.
+        categories (array-like): Optional, the category of every point.
+        icons (dict): The icon image of the points of every category.
+        color (str): The color of the cluster circles.
+        lazy_details (dict): Optional, where the tooltip and popup of the points
+                             are loaded from.
+        """
+        if source not in self.clusterers:
+            self.clusterers[source] = PointClusterer()
+        clusterer = self.clusterers[source]
+        clusterer.update(ids, lat, lon, categories)
+        if len(clusterer.state["ids"]) == 0:
+            return
+        _ClusterLayer(clusterer, source, icons or {}, color, lazy_details).add_to(layer)
+
+    def _generate_acled_clusters_(self, acled_data: pd.DataFrame):
+        """
+        Cluster the acled events, with the number of events of every event type.
+
+        Parameters:
+        acled_data (pd.DataFrame): The events to display.
+        """
+        ids = acled_data.index.to_numpy()
+        lazy_details = None
+        if self.popup_client is not None:
+            lazy_details = self._publish_details_(
+                "ACLED", ids, self._acled_details_(acled_data), ACLED_POPUP_FIELDS
+            )
+        self._add_clusters_(
+            self.ACLED_EVENTS_layer,
+            "ACLED",
+            ids=ids,
+            lat=pd.to_numeric(acled_data["latitude"], errors="coerce"),
+            lon=pd.to_numeric(acled_data["longitude"], errors="coerce"),
+            categories=acled_data["event_type"].astype(str),
+            icons={
+                event_type: self.icon_map[event_type]
+                for event_type in self.acled_event_layer_map
+            },
+            color="#c0392b",
+            lazy_details=lazy_details,
+        )
+
+    def _generate_gdelt_clusters_(
+        self, gdelt_data: pd.DataFrame, gdelt_points: pd.DataFrame = None
+    ):
+        """
+        Cluster the valid points of the gdelt articles.
+
+        Parameters:
+        gdelt_data (pd.DataFrame): The articles to display.
+        gdelt_points (pd.DataFrame): The point table of the articles (see
+                                     GDELTProcessor._get_points_), parsed from the
+                                     location column when not given.
+        """
+        if gdelt_points is None:
+            gdelt_points = parse_gdelt_points(gdelt_data["location"])
+        gdelt_points = gdelt_points[
+            gdelt_points["valid"] & gdelt_points["row_id"].isin(gdelt_data.index)
+        ]
+        ids = gdelt_points.index.to_numpy()
+        lazy_details = None
+        if self.popup_client is not None:
+            articles = gdelt_data.loc[gdelt_points["row_id"].to_numpy()]
+            lazy_details = self._publish_details_(
+                "GDELT", ids, self._gdelt_details_(articles), GDELT_POPUP_FIELDS
+            )
+        self._add_clusters_(
+            self.GDELT_LAYER,
+            "GDELT",
+            ids=ids,
+            lat=gdelt_points["lat"].to_numpy(),
+            lon=gdelt_points["lon"].to_numpy(),
+            categories=pd.Series("GDELT", index=gdelt_points.index),
+            icons={"GDELT": self.icon_map["GDELT"]},
+            color="#e67e22",
+            lazy_details=lazy_details,
+        )
+
+    def _generate_cellex_clusters_(self, cellex_data: pd.DataFrame):
+        """
+        Cluster the cellex records, with the number of records of every device.
+
+        Parameters:
+        cellex_data (pd.DataFrame): The records to display.
+        """
+        devices = cellex_data["CMD file name"].astype(str)
+        ids = self._cellex_ids_(cellex_data)
+        lazy_details = None
+        if self.popup_client is not None:
+            details, popup_fields = self._cellex_details_(cellex_data)
+            lazy_details = self._publish_details_("CELLEX", ids, details, popup_fields)
+        self._add_clusters_(
+            self.CELLEX_LAYER,
+            "CELLEX",
+            ids=ids,
+            lat=pd.to_numeric(cellex_data["Latitude"], errors="coerce"),
+            lon=pd.to_numeric(cellex_data["Longitude"], errors="coerce"),
+            categories=devices,
+            icons={device: self.icon_map["CELLEX"] for device in devices.unique()},
+            color="#2471a3",
+            lazy_details=lazy_details,
+        )
+
     def _create_marker_(
         self,
         tooltip: str,
@@ -193,16 +1051,34 @@ class MapGenerator:
         acled_data: pd.DataFrame = None,
         gdelt_data: pd.DataFrame = None,
         cellex_data: pd.DataFrame = None,
+        gdelt_points: pd.DataFrame = None,
     ):
+        generators = {
+            "geojson": (
+                self._generate_acled_geojson_,
+                self._generate_gdelt_geojson_,
+                self._generate_cellex_geojson_,
+            ),
+            "clusters": (
+                self._generate_acled_clusters_,
+                self._generate_gdelt_clusters_,
+                self._generate_cellex_clusters_,
+            ),
+            "markers": (
+                self._generate_acled_markers_,
+                self._generate_gdelt_markers_,
+                self._generate_cellex_markers_,
+            ),
+        }
+        generate_acled, generate_gdelt, generate_cellex = generators[self.render_mode]
         if acled_data is not None and not acled_data.empty:
-            self._generate_acled_markers_(acled_data)
+            generate_acled(acled_data)
 
         if gdelt_data is not None and not gdelt_data.empty:
-            self._generate_gdelt_markers_(gdelt_data=gdelt_data)
-            pass
+            generate_gdelt(gdelt_data=gdelt_data, gdelt_points=gdelt_points)
 
         if cellex_data is not None and not cellex_data.empty:
-            self._generate_cellex_markers_(cellex_data=cellex_data)
+            generate_cellex(cellex_data=cellex_data)
 
         # Create a template group to fill in
         groups = {"ACLED EVENT TYPE": [], "GDELT": [], "CELLEX": []}
@@ -214,6 +1090,7 @@ class MapGenerator:
             self.ACLED_RIOT_layer,
             self.ACLED_VIOLENCE_layer,
             self.ACLED_STRATEGIC_layer,
+            self.ACLED_EVENTS_layer,
             self.GDELT_LAYER,
             self.CELLEX_LAYER,
         ]
@@ -0,0 +1,163 @@
+# NearDuplicateDetector.py
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from classes.TextIndex import WORD_SEPARATOR_PATTERN, tokenize
+
+# Multiply-shift hashing works on 64 bit words and keeps the high 32 bits
+HASH_SHIFT = np.uint64(32)
+
+# States of a headline while the clusters are formed
+UNDECIDED, CENTER, MEMBER = 0, 1, 2
+
+
+def normalize_headlines(values: pd.Series) -> np.ndarray:
+    """
+    Returns the headlines lower-cased, with punctuation and repeated spaces
+    collapsed to a single space, so "Protests erupt in Nairobi!" and
+    "protests  erupt in nairobi" are the same string (None for empty headlines).
+    """
+    text = pa.array(values.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    text = pc.replace_substring_regex(pc.utf8_lower(text), WORD_SEPARATOR_PATTERN, " ")
+    text = pc.utf8_trim_whitespace(text)
+    text = pc.if_else(pc.equal(text, ""), pa.scalar(None, pa.string()), text)
+    return text.to_numpy(zero_copy_only=False)
+
+
+class NearDuplicateDetector:
+    """
+    Groups articles carrying the same or nearly the same headline, as syndicated
+    stories published by many sources do.
+
+    Headlines are normalized and hashed first, so exact copies share a single
+    signature. Every distinct headline then gets a MinHash signature of its
+    shingles (its words and pairs of consecutive words, so word order matters),
+    and locality sensitive hashing splits the signatures into bands: two
+    headlines sharing a whole band become candidates, and are grouped when the
+    share of equal signature values (an estimate of the Jaccard similarity of
+    their shingles) reaches the threshold. Each headline joins the earliest similar
+    headline that starts a group, so groups do not chain dissimilar headlines.
+
+    Parameters:
+    num_perm (int): The number of hash functions of a signature.
+    bands (int): The number of LSH bands, num_perm must be a multiple of it.
+    threshold (float): The estimated Jaccard similarity grouping two headlines.
+    seed (int): The seed of the hash functions, fixed so clusters are stable.
+    """
+
+    def __init__(
+        self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6, seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Odd multipliers and offsets of the multiply-shift hash functions
+        self.multipliers = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * 2 + 1
+        self.offsets = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.band_weights = (
+            rng.integers(0, 2**63, num_perm // bands, dtype=np.uint64) * 2 + 1
+        )
+
+    def cluster(self, headlines: pd.Series) -> np.ndarray:
+        """
+        Returns the cluster id of every row: the position of the first row of its
+        group, so a row without duplicates is its own cluster.
+
+        Parameters:
+        headlines (pd.Series): The headline of every row.
+
+        Returns:
+        np.ndarray: The cluster id of every row.
+        """
+        positions = np.arange(len(headlines), dtype=np.int64)
+        # Exact copies are hashed away first, only distinct raw headlines are normalized
+        raw_codes, raw_headlines = pd.factorize(pd.Series(headlines, dtype=object))
+        normalized = normalize_headlines(pd.Series(raw_headlines, dtype=object))
+        normalized_codes, distinct = pd.factorize(pd.Series(normalized, dtype=object))
+        codes = np.where(raw_codes >= 0, normalized_codes[raw_codes], -1)
+        if len(distinct) < 2:
+            labels = np.zeros(len(distinct), dtype=np.int64)
+        else:
+            labels = self._group_(self._signatures_(pd.Series(distinct, dtype=object)))
+
+        # Rows of a group point to its first row, rows without a headline to themselves
+        cluster_ids = positions.copy()
+        grouped = codes >= 0
+        first = np.full(len(distinct), len(positions), dtype=np.int64)
+        np.minimum.at(first, labels[codes[grouped]], positions[grouped])
+        cluster_ids[grouped] = first[labels[codes[grouped]]]
+        return cluster_ids
+
+    def _signatures_(self, headlines: pd.Series) -> np.ndarray:
+        """Returns the (headlines, num_perm) MinHash signatures of the shingle sets"""
+        rows, words = tokenize(headlines)
+        # Hash every distinct word once, through its factorized code
+        word_codes, _ = pd.factorize(pd.Series(words, dtype=object))
+        word_hashes = pd.util.hash_array(word_codes.astype(np.int64))
+        # Shingles: the words, and the pairs of consecutive words of a headline
+        pairs = np.flatnonzero(rows[1:] == rows[:-1])
+        pair_hashes = pd.util.hash_array(
+            word_hashes[pairs] * self.band_weights[0] + word_hashes[pairs + 1]
+        )
+        rows = np.concatenate([rows, rows[pairs]])
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+        word_hashes = np.concatenate([word_hashes, pair_hashes])[order]
+
+        signatures = np.full(
+            (len(headlines), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32
+        )
+        if len(rows) == 0:
+            return signatures
+        # Shingles are grouped by headline, reduce each group to its minimum
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        present = rows[starts]
+        for k in range(self.num_perm):
+            hashed = (word_hashes * self.multipliers[k] + self.offsets[k]) >> HASH_SHIFT
+            signatures[present, k] = np.minimum.reduceat(hashed, starts)
+        return signatures
+
+    def _group_(self, signatures: np.ndarray) -> np.ndarray:
+        """Returns the group label of every signature, grouping the similar ones"""
+        count = len(signatures)
+        rows_per_band = self.num_perm // self.bands
+        left_parts, right_parts = [], []
+        for band in range(self.bands):
+            values = signatures[:, band * rows_per_band : (band + 1) * rows_per_band]
+            keys = (values.astype(np.uint64) * self.band_weights).sum(axis=1)
+            # Candidate pairs: every member of a bucket with the first member
+            bucket_codes, _ = pd.factorize(keys)
+            _, leaders = np.unique(bucket_codes, return_index=True)
+            leader = leaders[bucket_codes]
+            candidate = leader != np.arange(count)
+            left_parts.append(leader[candidate])
+            right_parts.append(np.flatnonzero(candidate))
+
+        labels = np.arange(count, dtype=np.int64)
+        if not any(len(part) for part in left_parts):
+            return labels
+        left, right = np.concatenate(left_parts), np.concatenate(right_parts)
+        pairs = np.unique(left * count + right)
+        left, right = pairs // count, pairs % count
+        similarity = (signatures[left] == signatures[right]).mean(axis=1)
+        similar = similarity >= self.threshold
+        left, right = left[similar], right[similar]
+
+        # Star clusters, in headline order: a headline joins the first earlier center
+        # it is similar to, or becomes a center. Unlike a transitive closure, this
+        # never chains headlines that are not similar to their center.
+        state = np.zeros(count, dtype=np.int8)
+        state[np.setdiff1d(labels, right)] = CENTER
+        while (state == UNDECIDED).any():
+            state[right[(state[left] == CENTER) & (state[right] == UNDECIDED)]] = MEMBER
+            blocking = np.bincount(right[state[left] != MEMBER], minlength=count)
+            state[(state == UNDECIDED) & (blocking == 0)] = CENTER
+        joined = state[left] == CENTER
+        np.minimum.at(labels, right[joined], left[joined])
+        return labels
@@ -0,0 +1,210 @@
+# ParallelIngestExecutor.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pyarrow as pa
+
+from classes.CSVStreamReader import MemoryLimitExceeded
+
+# Number of worker processes parsing uploads, overridable for the docker deployment
+DEFAULT_INGEST_WORKERS = int(os.environ.get("BYOD_INGEST_WORKERS", os.cpu_count() or 1))
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_ingest_executor(max_workers: int = None) -> "ParallelIngestExecutor":
+    """Returns the executor shared by every processor (and session) for a worker count"""
+    max_workers = max(1, max_workers or DEFAULT_INGEST_WORKERS)
+    with _executors_lock:
+        if max_workers not in _executors:
+            _executors[max_workers] = ParallelIngestExecutor(max_workers)
+        return _executors[max_workers]
+
+
+def read_upload(file):
+    """Returns what a worker process needs to read an upload: its path or its bytes"""
+    if isinstance(file, (str, os.PathLike)):
+        return file
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+def source_size(source) -> int:
+    """Returns the bytes held in memory by what read_upload returned (0 for a path)"""
+    return len(source) if isinstance(source, (bytes, bytearray)) else 0
+
+
+def upload_name(file) -> str:
+    """Returns the name of an upload (its path for files on disk)"""
+    return getattr(file, "name", str(file))
+
+
+def open_upload(source):
+    """Opens what read_upload returned as a readable file for the parsers"""
+    if isinstance(source, (bytes, bytearray)):
+        return pa.BufferReader(source)
+    return source
+
+
+def table_to_bytes(table: pa.Table) -> bytes:
+    """Serializes a table into the Arrow IPC stream format"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def bytes_to_table(data: bytes) -> pa.Table:
+    """Reads a table serialized by table_to_bytes"""
+    return pa.ipc.open_stream(pa.BufferReader(data)).read_all()
+
+
+class ParallelIngestExecutor:
+    """
+    Parses uploaded files in worker processes, across CPU cores.
+
+    A worker is a module level function taking the bytes (or path) of a file, its
+    name and extra arguments, and returning a (table_bytes, extra) tuple, where table_bytes
+    is an Arrow IPC stream made with table_to_bytes. Results come back as Arrow
+    buffers instead of pickled dataframes. Workers are started with "spawn" so
+    they never inherit the threads of the Streamlit server, and the pool is kept
+    alive between uploads.
+
+    Parameters:
+    max_workers (int): The number of worker processes. With 1 worker, or a single
+                       file, files are parsed in the calling process.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_INGEST_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool_(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _reset_pool_(self) -> None:
+        """Drops a pool whose worker died, the next call starts a new one"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def map(self, worker, files: list, *args, memory_limit: int = None) -> list:
+        """
+        Runs worker(source, name, *args) for every file.
+
+        With memory_limit, the worker takes a memory limit as its last argument.
+        What the parsed files left of the limit is split across the files parsed
+        at once, each file getting its share minus the bytes of its upload, and
+        uploads are only read into memory when their parse starts. A file
+        rejected for its share is parsed again alone once the others are done.
+
+        Parameters:
+        worker (callable): A module level function (it must be importable by the
+                           worker processes).
+        files (list): The uploaded files (file-like objects or paths).
+        *args: Extra arguments passed to every call.
+        memory_limit (int): Optional, the memory limit of all the parsed files.
+
+        Returns:
+        list: For each file, in order, a (pa.Table, extra) tuple or the exception
+              raised while parsing it.
+        """
+        parallel = min(self.max_workers, len(files))
+        if parallel <= 1:
+            results = []
+            for file in files:
+                budget = None
+                if memory_limit is not None:
+                    budget = memory_limit - self._parsed_bytes_(results)
+                results.append(self._run_(worker, file, args, budget))
+            return results
+
+        results = self._map_pool_(worker, files, args, parallel, memory_limit)
+        if memory_limit is not None:
+            for i, result in enumerate(results):
+                if isinstance(result, MemoryLimitExceeded):
+                    budget = memory_limit - self._parsed_bytes_(results)
+                    results[i] = self._run_(worker, files[i], args, budget)
+        return results
+
+    @staticmethod
+    def _parsed_bytes_(results: list) -> int:
+        return sum(result[0].nbytes for result in results if isinstance(result, tuple))
+
+    @staticmethod
+    def _run_(worker, file, args: tuple, memory_limit: int = None):
+        """Parses a file in the calling process"""
+        try:
+            source = read_upload(file)
+            if memory_limit is not None:
+                args = (*args, memory_limit - source_size(source))
+            data, extra = worker(source, upload_name(file), *args)
+            return bytes_to_table(data), extra
+        except Exception as e:
+            return e
+
+    def _map_pool_(
+        self, worker, files: list, args: tuple, parallel: int, memory_limit: int
+    ) -> list:
+        """Parses the files in the worker processes, `parallel` files at a time"""
+        results = [None] * len(files)
+        # Future -> (file position, memory share)
+        running = {}
+        queue = iter(enumerate(files))
+        while True:
+            for i, file in queue:
+                try:
+                    source = read_upload(file)
+                    call_args = args
+                    share = 0
+                    if memory_limit is not None:
+                        available = (
+                            memory_limit
+                            - self._parsed_bytes_(results)
+                            - sum(share for _, share in running.values())
+                        )
+                        share = available // (parallel - len(running))
+                        call_args = (*args, share - source_size(source))
+                    future = self._get_pool_().submit(
+                        worker, source, upload_name(file), *call_args
+                    )
+                    running[future] = (i, share)
+                except Exception as e:
+                    results[i] = e
+                    continue
+                if len(running) >= parallel:
+                    break
+            if not running:
+                return results
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, _ = running.pop(future)
+                try:
+                    data, extra = future.result()
+                    results[i] = (bytes_to_table(data), extra)
+                except BrokenProcessPool as e:
+                    self._reset_pool_()
+                    results[i] = e
+                except Exception as e:
+                    results[i] = e
+
+    def shutdown(self) -> None:
+        """Stops the worker processes"""
+        self._reset_pool_()
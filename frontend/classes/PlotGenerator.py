@@ -49,7 +49,7 @@ class PlotGenerator:
         column_name (str): The name of the column for which the pie chart should be generated.
         """
         # Group the data by the specified column and count occurrences
-        column_counts = df.groupby(column_name).size().reset_index(name="counts")
+        column_counts = df.groupby(column_name, observed=True).size().reset_index(name="counts")
         title = column_name.replace("_", " ").capitalize()
         # Create the pie chart using Plotly
         fig = px.pie(
@@ -77,24 +77,25 @@ class PlotGenerator:
         Returns:
         None: Displays the plot.
         """
-        # Ensure the datetime column is in datetime format
-        df[datetime_column] = pd.to_datetime(df[datetime_column], errors="coerce")
+        # Ensure the datetime column is in datetime format (without modifying df,
+        # which may be shared with the processors' query cache)
+        dates = pd.to_datetime(df[datetime_column], errors="coerce")
 
         # Group the data by the selected frequency (daily, monthly, or yearly)
         if freq == "daily":
-            df["period"] = df[datetime_column].dt.date
+            period = dates.dt.date
         elif freq == "monthly":
-            df["period"] = df[datetime_column].dt.to_period("M")  # Monthly period
+            period = dates.dt.to_period("M")  # Monthly period
         elif freq == "yearly":
-            df["period"] = df[datetime_column].dt.to_period("Y")  # Yearly period
+            period = dates.dt.to_period("Y")  # Yearly period
         else:
             raise ValueError("Frequency must be 'daily', 'monthly', or 'yearly'.")
 
         # Convert Period objects to string for compatibility with Plotly
-        df["period"] = df["period"].astype(str)
+        period = period.astype(str).rename("period")
 
         # Group by the new period and count the number of rows in each period
-        count_by_period = df.groupby("period").size().reset_index(name="row_count")
+        count_by_period = period.groupby(period).size().reset_index(name="row_count")
         # Plot the result using Plotly
         fig = px.line(
             count_by_period,
@@ -116,8 +117,11 @@ class PlotGenerator:
         df (pd.DataFrame): The input DataFrame.
         datetime_column (str): The name of the datetime column in the DataFrame.
         """
-        # Ensure the datetime column is in datetime format
-        df[datetime_column] = pd.to_datetime(df[datetime_column], errors="coerce")
+        # Ensure the datetime column is in datetime format, on a copy of the
+        # frame so the caller's (possibly cached) data is left untouched
+        df = df.assign(
+            **{datetime_column: pd.to_datetime(df[datetime_column], errors="coerce")}
+        )
 
         # Placeholder for the final structure
         final_timeline = {
@@ -186,8 +190,11 @@ class PlotGenerator:
         Returns:
         dict: A Plotly timeline object (can be displayed with plotly.express).
         """
-        # Ensure the datetime column is in datetime format
-        df[datetime_column] = pd.to_datetime(df[datetime_column], errors="coerce")
+        # Ensure the datetime column is in datetime format, on a copy of the
+        # frame so the caller's (possibly cached) data is left untouched
+        df = df.assign(
+            **{datetime_column: pd.to_datetime(df[datetime_column], errors="coerce")}
+        )
 
         # Placeholder for the final structure
         final_timeline = {
@@ -0,0 +1,300 @@
+# PointClusterer.py
+
+import time
+
+import numpy as np
+import pandas as pd
+
+# Multipliers mixing the id, cell and category of a point into its signature
+SIGNATURE_MULTIPLIERS = (
+    np.uint64(0x9E3779B97F4A7C15),
+    np.uint64(0xC2B2AE3D27D4EB4F),
+)
+
+
+def project(lat: np.ndarray, lon: np.ndarray) -> tuple:
+    """Returns the Web Mercator position of coordinates, in [0, 1] on both axes"""
+    x = lon / 360 + 0.5
+    sin = np.sin(np.radians(np.clip(lat, -85.0511, 85.0511)))
+    y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+    return np.clip(x, 0, 1), np.clip(y, 0, 1)
+
+
+def unproject(x: np.ndarray, y: np.ndarray) -> tuple:
+    """Returns the (lat, lon) of Web Mercator positions"""
+    lon = (x - 0.5) * 360
+    lat = np.degrees(2 * np.arctan(np.exp(np.pi * (1 - 2 * y)))) - 90
+    return lat, lon
+
+
+class PointClusterer:
+    """
+    Clusters map points per zoom level on a grid, the way supercluster does, with
+    one cluster per grid cell of about `radius` pixels.
+
+    The grid cells of a zoom level split into four cells at the next level, so the
+    cell of a point at every zoom only depends on its own position and the levels
+    form a hierarchy: each level is aggregated from the level below it. A cluster
+    keeps its point count, the sums of the point positions (its centroid is their
+    mean) and its count per category. These are sums, so when the selection of
+    points changes only the points that entered or left it are added to or
+    subtracted from the clusters of every level, instead of clustering all points
+    again.
+
+    Parameters:
+    min_zoom (int): The coarsest zoom level.
+    max_zoom (int): The finest zoom level, points closer than a cell at this
+                    zoom stay together on every zoom.
+    radius (int): The cell size in pixels of 256 pixel tiles, a power of two.
+    """
+
+    def __init__(self, min_zoom: int = 0, max_zoom: int = 16, radius: int = 64):
+        cells_per_tile = 256 // radius
+        if radius <= 0 or radius * cells_per_tile != 256 or cells_per_tile & (
+            cells_per_tile - 1
+        ):
+            raise ValueError("radius must be a power of two up to 256")
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.radius = radius
+        # Bits of a cell coordinate at the finest zoom
+        self.bits = max_zoom + cells_per_tile.bit_length() - 1
+        self.categories = pd.Index([], dtype=object)
+        self.levels = {zoom: self._empty_level_() for zoom in self.zooms()}
+        self.state = self._empty_state_()
+        self.last_update = {}
+
+    def zooms(self) -> range:
+        return range(self.min_zoom, self.max_zoom + 1)
+
+    def _empty_level_(self) -> dict:
+        return {
+            "keys": np.empty(0, dtype=np.int64),
+            "count": np.empty(0, dtype=np.int64),
+            "sum_x": np.empty(0, dtype=np.float64),
+            "sum_y": np.empty(0, dtype=np.float64),
+            "breakdown": np.empty((0, len(self.categories)), dtype=np.int64),
+        }
+
+    def _empty_state_(self) -> dict:
+        return {
+            "ids": np.empty(0, dtype=object),
+            "signatures": np.empty(0, dtype=np.uint64),
+            "keys": np.empty(0, dtype=np.int64),
+            "x": np.empty(0, dtype=np.float64),
+            "y": np.empty(0, dtype=np.float64),
+            "categories": np.empty(0, dtype=np.int64),
+        }
+
+    def _category_codes_(self, categories) -> np.ndarray:
+        """Returns the codes of categories, new categories get a new breakdown column"""
+        codes, values = pd.factorize(pd.Series(categories, dtype=object).fillna(""))
+        values = pd.Index(values.astype(str))
+        unseen = values.unique().difference(self.categories)
+        if len(unseen):
+            self.categories = self.categories.append(unseen)
+            for level in self.levels.values():
+                level["breakdown"] = np.pad(
+                    level["breakdown"], ((0, 0), (0, len(unseen)))
+                )
+        return self.categories.get_indexer(values).astype(np.int64)[codes]
+
+    def _parent_keys_(self, keys: np.ndarray) -> np.ndarray:
+        """Returns the key of the cell holding a cell at the next coarser zoom"""
+        mask = (1 << self.bits) - 1
+        return ((keys >> self.bits) >> 1 << self.bits) | ((keys & mask) >> 1)
+
+    def update(self, ids, lat, lon, categories=None) -> dict:
+        """
+        Sets the selected points, updating the clusters with the points that were
+        added or removed since the previous call. A point that moved or changed
+        category counts as removed and added again.
+
+        Parameters:
+        ids (array-like): A unique id of every point, stable across selections.
+        lat (array-like): The latitude of every point.
+        lon (array-like): The longitude of every point.
+        categories (array-like): Optional, the category of every point (such as
+                                 its event type), counted per cluster.
+
+        Returns:
+        dict: The number of points added and removed, and the seconds taken.
+        """
+        start = time.perf_counter()
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        ids = np.asarray(ids)
+        if categories is None:
+            categories = np.full(len(ids), "", dtype=object)
+        codes = self._category_codes_(categories)
+        with np.errstate(invalid="ignore"):
+            valid = (
+                np.isfinite(lat)
+                & np.isfinite(lon)
+                & (np.abs(lat) <= 90)
+                & (np.abs(lon) <= 180)
+            )
+        ids, lat, lon, codes = ids[valid], lat[valid], lon[valid], codes[valid]
+
+        x, y = project(lat, lon)
+        size = 1 << self.bits
+        cell_x = np.minimum((x * size).astype(np.int64), size - 1)
+        cell_y = np.minimum((y * size).astype(np.int64), size - 1)
+        keys = cell_x << self.bits | cell_y
+        signatures = (
+            pd.util.hash_array(ids) * SIGNATURE_MULTIPLIERS[0]
+            + keys.astype(np.uint64) * SIGNATURE_MULTIPLIERS[1]
+            + codes.astype(np.uint64)
+        )
+        current = {
+            "ids": ids,
+            "signatures": signatures,
+            "keys": keys,
+            "x": x,
+            "y": y,
+            "categories": codes,
+        }
+
+        previous = self.state
+        removed = ~pd.Index(previous["signatures"]).isin(signatures)
+        added = ~pd.Index(signatures).isin(previous["signatures"])
+        delta = {
+            name: np.concatenate([previous[name][removed], current[name][added]])
+            for name in ("keys", "x", "y", "categories")
+        }
+        signs = np.concatenate(
+            [
+                np.full(removed.sum(), -1, dtype=np.int64),
+                np.ones(added.sum(), dtype=np.int64),
+            ]
+        )
+        if len(signs):
+            self._apply_delta_(delta, signs)
+        self.state = current
+
+        self.last_update = {
+            "points": len(ids),
+            "added": int(added.sum()),
+            "removed": int(removed.sum()),
+            "seconds": time.perf_counter() - start,
+        }
+        return self.last_update
+
+    def _apply_delta_(self, delta: dict, signs: np.ndarray) -> None:
+        """Adds the points of a delta (sign -1 for removed points) to every level"""
+        categories = len(self.categories)
+        breakdown = np.zeros((len(signs), categories), dtype=np.int64)
+        breakdown[np.arange(len(signs)), delta["categories"]] = signs
+        changes = {
+            "keys": delta["keys"],
+            "count": signs,
+            "sum_x": signs * delta["x"],
+            "sum_y": signs * delta["y"],
+            "breakdown": breakdown,
+        }
+        # The finest level takes the points, every coarser level the change of the
+        # level below it, which has at most as many cells
+        for zoom in reversed(self.zooms()):
+            changes = self._aggregate_(changes)
+            self._merge_(self.levels[zoom], changes)
+            changes = dict(changes, keys=self._parent_keys_(changes["keys"]))
+
+    @staticmethod
+    def _aggregate_(changes: dict) -> dict:
+        """Sums the changes falling in the same cell"""
+        keys, inverse = np.unique(changes["keys"], return_inverse=True)
+        cells = len(keys)
+        breakdown = changes["breakdown"]
+        columns = breakdown.shape[1]
+        flat = (inverse[:, None] * columns + np.arange(columns)).ravel()
+        return {
+            "keys": keys,
+            "count": np.bincount(inverse, weights=changes["count"], minlength=cells)
+            .round()
+            .astype(np.int64),
+            "sum_x": np.bincount(inverse, weights=changes["sum_x"], minlength=cells),
+            "sum_y": np.bincount(inverse, weights=changes["sum_y"], minlength=cells),
+            "breakdown": np.bincount(
+                flat, weights=breakdown.ravel(), minlength=cells * columns
+            )
+            .round()
+            .astype(np.int64)
+            .reshape(cells, columns),
+        }
+
+    @staticmethod
+    def _merge_(level: dict, changes: dict) -> None:
+        """Adds aggregated changes to the sorted cells of a level"""
+        positions = np.searchsorted(level["keys"], changes["keys"])
+        exists = positions < len(level["keys"])
+        exists[exists] = level["keys"][positions[exists]] == changes["keys"][exists]
+        for name in ("count", "sum_x", "sum_y", "breakdown"):
+            level[name][positions[exists]] += changes[name][exists]
+        new = ~exists
+        if new.any():
+            for name in ("keys", "count", "sum_x", "sum_y", "breakdown"):
+                level[name] = np.insert(
+                    level[name], positions[new], changes[name][new], axis=0
+                )
+        empty = level["count"] <= 0
+        if empty.any():
+            for name in ("keys", "count", "sum_x", "sum_y", "breakdown"):
+                level[name] = level[name][~empty]
+
+    def clusters(self, zoom: int, min_count: int = 1) -> pd.DataFrame:
+        """
+        Returns the clusters of a zoom level (clamped to the levels kept).
+
+        Parameters:
+        zoom (int): The zoom level.
+        min_count (int): The smallest number of points of a returned cluster.
+
+        Returns:
+        pd.DataFrame: The lat and lon of the centroid, the point count and one
+                      count column per category of every cluster.
+        """
+        level = self.levels[min(max(zoom, self.min_zoom), self.max_zoom)]
+        selected = level["count"] >= min_count
+        count = level["count"][selected]
+        lat, lon = unproject(
+            level["sum_x"][selected] / count, level["sum_y"][selected] / count
+        )
+        frame = pd.DataFrame({"lat": lat, "lon": lon, "count": count})
+        breakdown = pd.DataFrame(
+            level["breakdown"][selected], columns=self.categories, index=frame.index
+        )
+        return pd.concat([frame, breakdown], axis=1)
+
+    def points(self) -> pd.DataFrame:
+        """
+        Returns the points that are alone in their cell on some zoom level, with
+        the coarsest such zoom: the point is then alone on every finer zoom.
+
+        Returns:
+        pd.DataFrame: The id, lat, lon, category and zoom of the points.
+        """
+        state = self.state
+        zoom = np.full(len(state["keys"]), -1, dtype=np.int64)
+        candidates = np.arange(len(state["keys"]))
+        keys = state["keys"][candidates]
+        for level_zoom in reversed(self.zooms()):
+            level = self.levels[level_zoom]
+            positions = np.searchsorted(level["keys"], keys)
+            alone = level["count"][np.minimum(positions, len(level["keys"]) - 1)] == 1
+            candidates, keys = candidates[alone], keys[alone]
+            zoom[candidates] = level_zoom
+            if len(candidates) == 0:
+                break
+            keys = self._parent_keys_(keys)
+
+        alone = zoom >= 0
+        lat, lon = unproject(state["x"][alone], state["y"][alone])
+        return pd.DataFrame(
+            {
+                "id": state["ids"][alone],
+                "lat": lat,
+                "lon": lon,
+                "category": self.categories[state["categories"][alone]],
+                "zoom": zoom[alone],
+            }
+        )
@@ -0,0 +1,92 @@
+# PopupClient.py
+
+import hashlib
+import logging
+import os
+
+import pyarrow as pa
+import requests
+
+# Where the frontend reaches the backend, and where the browser showing the map
+# does (they differ in the docker deployment)
+DEFAULT_POPUP_API_URL = os.environ.get("BYOD_POPUP_API_URL", "http://localhost:8002")
+DEFAULT_POPUP_PUBLIC_URL = os.environ.get("BYOD_POPUP_PUBLIC_URL", DEFAULT_POPUP_API_URL)
+# The token the backend expects with popup uploads (the same variable is set on both)
+DEFAULT_POPUP_API_TOKEN = os.environ.get("BYOD_POPUP_API_TOKEN") or None
+
+logger = logging.getLogger(__name__)
+
+
+class PopupClient:
+    """
+    Uploads the popup content of the map points to the backend, so the map only
+    carries the id of every point and the browser fetches the popup of a point
+    when it is opened (see backend/classes/PopupIndex.py).
+
+    Parameters:
+    api_url (str): The backend URL used by the frontend, None disables uploads.
+    public_url (str): The backend URL used by the browser.
+    token (str): The upload token of the backend, None disables uploads.
+    timeout (float): The seconds to wait for the backend.
+    """
+
+    def __init__(
+        self,
+        api_url: str = DEFAULT_POPUP_API_URL,
+        public_url: str = DEFAULT_POPUP_PUBLIC_URL,
+        token: str = DEFAULT_POPUP_API_TOKEN,
+        timeout: float = 10,
+    ):
+        self.api_url = api_url.rstrip("/") if api_url else None
+        self.public_url = public_url.rstrip("/") if public_url else self.api_url
+        self.token = token
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def publish(self, source: str, ids: list, fields: dict) -> str | None:
+        """
+        Uploads the popup fields of points as a dataset named after a hash of its
+        content. Rebuilding a map with the same points reuses the dataset already
+        stored by the backend instead of uploading it again.
+
+        Parameters:
+        source (str): The name of the points, prefixing the dataset name.
+        ids (list): The id of every point, as used by the map.
+        fields (dict): The field name and the text values of every point.
+
+        Returns:
+        str: The dataset name, None when the backend could not be reached or
+             refused the upload.
+        """
+        if self.api_url is None or self.token is None:
+            return None
+        columns = {"id": pa.array(ids, type=pa.string())}
+        for name, values in fields.items():
+            columns[name] = pa.array(values, type=pa.string())
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        data = sink.getvalue().to_pybytes()
+        dataset = f"{source}-{hashlib.blake2b(data, digest_size=20).hexdigest()}"
+        try:
+            response = self.session.get(
+                f"{self.api_url}/popups/{dataset}", timeout=self.timeout
+            )
+            if response.status_code == 200:
+                return dataset
+            response = self.session.put(
+                f"{self.api_url}/popups/{dataset}",
+                data=data,
+                headers={
+                    "Content-Type": "application/vnd.apache.arrow.stream",
+                    "Authorization": f"Bearer {self.token}",
+                },
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning("Embedding popups, the upload to the popup backend failed: %s", e)
+            return None
+        return dataset
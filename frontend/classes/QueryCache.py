@@ -0,0 +1,109 @@
+# QueryCache.py
+
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _result_size(value) -> int:
+    """Returns the number of bytes held by a cached result"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # Object columns only hold pointers to strings shared with the source data
+        memory = value.memory_usage(index=True, deep=False)
+        return int(memory.sum()) if isinstance(memory, pd.Series) else int(memory)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return 0
+
+
+class QueryCache:
+    """
+    Memoizes filter results keyed by a normalized fingerprint of the filter
+    arguments, with least-recently-used eviction under a memory budget.
+
+    Streamlit reruns the whole script on every widget interaction, so the same
+    filters are evaluated over and over; a repeated query then costs a
+    dictionary lookup.
+
+    Parameters:
+    max_bytes (int): The memory budget of the cached results. Results larger
+                     than the budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize_(value):
+        """Turns a filter argument into a hashable, order independent value"""
+        if value is None:
+            return None
+        if isinstance(value, (list, tuple, set, pd.Index, pd.Series)):
+            if len(value) == 0:
+                return None
+            # Long selections (e.g. every actor) are folded into a digest
+            joined = "\x1f".join(sorted({str(item) for item in value}))
+            return hashlib.blake2b(joined.encode(), digest_size=16).hexdigest()
+        try:
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            pass
+        if hasattr(value, "isoformat"):
+            return pd.Timestamp(value).as_unit("ns").value
+        return value
+
+    def fingerprint(self, **filters) -> tuple:
+        """Returns the cache key of a set of filter arguments"""
+        return tuple(
+            (name, self._normalize_(value)) for name, value in sorted(filters.items())
+        )
+
+    def get(self, key):
+        """Returns the cached result of a key (None on a miss)"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value) -> None:
+        """Caches a result, evicting the least recently used ones to stay in budget"""
+        size = _result_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.current_bytes -= self.sizes.pop(key)
+            del self.entries[key]
+        while self.entries and self.current_bytes + size > self.max_bytes:
+            evicted, _ = self.entries.popitem(last=False)
+            self.current_bytes -= self.sizes.pop(evicted)
+            self.evictions += 1
+        self.entries[key] = value
+        self.sizes[key] = size
+        self.current_bytes += size
+
+    def clear(self) -> None:
+        """Drops every cached result, e.g. after the underlying data changed"""
+        self.entries.clear()
+        self.sizes.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the memory used"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
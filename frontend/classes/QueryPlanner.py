@@ -0,0 +1,110 @@
+# QueryPlanner.py
+
+import numpy as np
+
+
+class Predicate:
+    """
+    One filter of a query.
+
+    Parameters:
+    name (str): The filtered column, for the query plan.
+    estimate (int): The estimated number of matching rows (an upper bound).
+    evaluate (callable): Takes the ascending row positions matching the previous
+                         filters (None for every row) and returns those this
+                         filter keeps, in ascending order.
+    """
+
+    def __init__(self, name: str, estimate: int, evaluate):
+        self.name = name
+        self.estimate = int(estimate)
+        self.evaluate = evaluate
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.name!r}, estimate={self.estimate})"
+
+
+class QueryPlanner:
+    """
+    Plans the filters of an ACLED or GDELT query.
+
+    The "Select all" boxes of the app fill the filters with every value of a
+    column, which used to make the default view the most expensive one. The
+    planner recognizes such full selections from the stored cardinalities of the
+    column (rows per distinct value) and drops them, or only keeps the rows that
+    have a value when some rows have none. The remaining filters run from the
+    most to the least selective, each one only testing the rows kept so far, and
+    the query stops as soon as no row is left. The last plan run is kept in
+    last_plan as (name, estimate) pairs.
+    """
+
+    def __init__(self):
+        self.last_plan = []
+
+    def value_filter(
+        self, name: str, values, counts: dict, evaluate, present: np.ndarray = None
+    ) -> Predicate | None:
+        """
+        Returns the predicate keeping the rows holding one of values.
+
+        Parameters:
+        name (str): The filtered column.
+        values (list): The selected values, None to select all of them.
+        counts (dict): The number of rows holding each distinct value of the column.
+        evaluate (callable): evaluate(values, positions) returns the ascending row
+                             positions among positions (None for every row)
+                             holding one of values.
+        present (np.ndarray): The ascending positions of the rows holding any value,
+                              None when every row holds one.
+
+        Returns:
+        Predicate: The predicate, None when it selects every row.
+        """
+        if values is None and not counts:
+            # Selecting all the values of an empty column filters nothing
+            return None
+        selected = None if values is None else [v for v in set(values) if v in counts]
+        if selected is None or (counts and len(selected) == len(counts)):
+            # Every value is selected: only rows without any value are filtered out
+            if present is None:
+                return None
+            return Predicate(
+                f"{name} (any)",
+                len(present),
+                lambda positions: present
+                if positions is None
+                else np.intersect1d(positions, present, assume_unique=True),
+            )
+        return Predicate(
+            name,
+            sum(counts[v] for v in selected),
+            lambda positions: evaluate(selected, positions),
+        )
+
+    def execute(self, predicates: list) -> np.ndarray | None:
+        """
+        Runs the predicates (None entries are skipped) from the lowest estimate up.
+
+        Returns:
+        np.ndarray: The ascending positions of the matching rows, None when no
+                    predicate filters anything (every row matches).
+        """
+        plan = sorted(
+            (predicate for predicate in predicates if predicate is not None),
+            key=lambda predicate: predicate.estimate,
+        )
+        self.last_plan = [(predicate.name, predicate.estimate) for predicate in plan]
+        positions = None
+        for predicate in plan:
+            if predicate.estimate == 0:
+                # Estimates are upper bounds, nothing can match
+                return np.empty(0, dtype=np.int64)
+            positions = predicate.evaluate(positions)
+            if len(positions) == 0:
+                break
+        return positions
+
+    @staticmethod
+    def cardinalities(keys, counts) -> dict:
+        """Returns the {value: rows} mapping of parallel arrays, without the empty values"""
+        return {key: int(count) for key, count in zip(keys, counts) if count > 0}
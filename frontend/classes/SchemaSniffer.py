@@ -0,0 +1,132 @@
+# SchemaSniffer.py
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Columns that identify an export of each supported source. Used to tell the
+# user where a rejected file should have been uploaded.
+SOURCE_SIGNATURES = {
+    "ACLED": {"event_id_cnty", "sub_event_type", "assoc_actor_1"},
+    "GDELT": {"V2DocId", "V2ExtrasXML.Title", "V2Persons.V1Person"},
+}
+
+
+class SchemaSniffer:
+    """
+    Validates uploaded CSV files from their header row and a small sample before
+    any full parse, so a file with the wrong layout is rejected in milliseconds
+    instead of after loading the whole file.
+
+    Parameters:
+    sample_bytes (int): The number of bytes read from the start of the file to get
+                        the header and the sample rows.
+    sample_rows (int): The maximum number of rows kept in the sample.
+    """
+
+    def __init__(self, sample_bytes: int = 1 << 16, sample_rows: int = 200):
+        self.sample_bytes = sample_bytes
+        self.sample_rows = sample_rows
+
+    def _read_head_(self, file) -> tuple:
+        """Returns the column names and a sample dataframe read from the start of the file"""
+        if isinstance(file, (str, bytes)) or not hasattr(file, "read"):
+            with open(file, "rb") as handle:
+                head = handle.read(self.sample_bytes)
+        else:
+            file.seek(0)
+            head = file.read(self.sample_bytes)
+            # Leave the file ready for the full parse
+            file.seek(0)
+        if isinstance(head, str):
+            head = head.encode()
+
+        # Only parse complete lines of the prefix. A quoted value may span lines,
+        # so the last record can still be cut: it is skipped when it has too few
+        # columns and dropped from the sample otherwise.
+        truncated = len(head) == self.sample_bytes and b"\n" in head
+        if truncated:
+            head = head[: head.rindex(b"\n") + 1]
+        tail = head.rstrip(b"\r\n")
+
+        def skip_last_record(row) -> str:
+            return "skip" if tail.endswith(row.text.encode()) else "error"
+
+        sample = pa_csv.read_csv(
+            pa.BufferReader(head),
+            read_options=pa_csv.ReadOptions(use_threads=False),
+            parse_options=pa_csv.ParseOptions(
+                newlines_in_values=True,
+                invalid_row_handler=skip_last_record if truncated else None,
+            ),
+        ).to_pandas()
+        if truncated:
+            sample = sample.iloc[:-1]
+        return list(sample.columns), sample.head(self.sample_rows)
+
+    def _identify_source_(self, columns: list) -> str | None:
+        """Returns the name of the source whose signature matches the columns"""
+        for source, signature in SOURCE_SIGNATURES.items():
+            if signature.issubset(columns):
+                return source
+        return None
+
+    def sniff(
+        self,
+        file,
+        required_columns: list,
+        expected_source: str = None,
+        numeric_columns: list = None,
+        date_columns: dict = None,
+    ) -> dict:
+        """
+        Checks the header and a sample of a file against an expected layout.
+
+        Parameters:
+        file: The uploaded file (path or file-like object).
+        required_columns (list): Columns that must all be present in the header.
+        expected_source (str): The source the file was uploaded for, used to route
+                               files that belong to another source.
+        numeric_columns (list): Columns whose sample values must all be numeric.
+        date_columns (dict): Maps a column name to a function converting a Series
+                             of strings into datetimes (NaT when unparseable).
+
+        Returns:
+        dict: {"accepted": bool, "reason": str, "columns": list, "sample": pd.DataFrame}
+        """
+        report = {"accepted": False, "reason": "", "columns": [], "sample": None}
+        try:
+            columns, sample = self._read_head_(file)
+        except Exception as e:
+            report["reason"] = f"unreadable header ({e})"
+            return report
+        report["columns"] = columns
+        report["sample"] = sample
+
+        missing = [col for col in required_columns if col not in columns]
+        if missing:
+            source = self._identify_source_(columns)
+            if source is not None and source != expected_source:
+                report["reason"] = (
+                    f"looks like {source} data, upload it in the {source} section"
+                )
+            else:
+                report["reason"] = f"missing columns {missing[:5]}" + (
+                    f" and {len(missing) - 5} more" if len(missing) > 5 else ""
+                )
+            return report
+
+        for col in numeric_columns or []:
+            values = sample[col].dropna()
+            if pd.to_numeric(values, errors="coerce").isna().any():
+                report["reason"] = f"column '{col}' contains non-numeric values"
+                return report
+
+        for col, parser in (date_columns or {}).items():
+            values = sample[col].dropna().astype(str)
+            if not values.empty and parser(values).isna().all():
+                report["reason"] = f"column '{col}' does not contain recognizable dates"
+                return report
+
+        report["accepted"] = True
+        return report
@@ -0,0 +1,143 @@
+# SortedTimeIndex.py
+
+import numpy as np
+import pandas as pd
+
+# Integer value of NaT in a datetime64[ns] array viewed as int64
+NAT_VALUE = np.iinfo(np.int64).min
+
+
+def _to_nanoseconds(value) -> int:
+    """Converts a date/datetime/Timestamp into nanoseconds since the epoch"""
+    return pd.Timestamp(value).as_unit("ns").value
+
+
+def _to_int64(timestamps) -> np.ndarray:
+    """Converts datetimes into int64 nanoseconds (NaT becomes NAT_VALUE)"""
+    values = pd.to_datetime(pd.Series(timestamps)).astype("datetime64[ns]")
+    return values.to_numpy().view(np.int64)
+
+
+class SortedTimeIndex:
+    """
+    Keeps the timestamps of a table in sorted order so date windows are resolved
+    by binary search instead of comparing every row.
+
+    When the table itself is sorted by time (as ACLED and GDELT data are after
+    loading) a window is a contiguous slice of rows. Otherwise the index keeps the
+    permutation that sorts the rows and a window maps to a slice of it.
+
+    Parameters:
+    timestamps (array-like): The datetime value of every row, in row order.
+    """
+
+    def __init__(self, timestamps):
+        values = _to_int64(timestamps)
+        self.values = values
+        # Missing dates sort first since NaT is the smallest int64
+        if len(values) < 2 or np.all(values[1:] >= values[:-1]):
+            self.order = None
+            self.sorted_values = values
+        else:
+            self.order = np.argsort(values, kind="stable")
+            self.sorted_values = values[self.order]
+        self.missing = int(np.searchsorted(self.sorted_values, NAT_VALUE, side="right"))
+
+    def update(self, positions, timestamps) -> None:
+        """
+        Sets the timestamps of some rows, positions past the end append new rows.
+
+        Only the changed rows are sorted, they are then merged into the existing
+        sorted order with a binary search.
+
+        Parameters:
+        positions (array-like): The row positions that changed. Appended rows must
+                                follow the existing rows without gaps.
+        timestamps (array-like): The new datetime value of each position.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        new_values = _to_int64(timestamps)
+        size = len(self.values)
+        total = max(size, int(positions.max()) + 1) if len(positions) else size
+
+        values = np.concatenate(
+            (self.values, np.full(total - size, NAT_VALUE, dtype=np.int64))
+        )
+        values[positions] = new_values
+
+        # Drop the changed rows from the current order, the rest stays sorted
+        order = np.arange(size, dtype=np.int64) if self.order is None else self.order
+        changed = np.zeros(total, dtype=bool)
+        changed[positions] = True
+        kept = order[~changed[order]]
+
+        # Merge the changed rows back in
+        inserted = positions[np.lexsort((positions, new_values))]
+        where = np.searchsorted(values[kept], values[inserted], side="right")
+        order = np.insert(kept, where, inserted)
+
+        self.values = values
+        self.sorted_values = values[order]
+        self.order = None if np.array_equal(order, np.arange(total)) else order
+        self.missing = int(np.searchsorted(self.sorted_values, NAT_VALUE, side="right"))
+
+    def __len__(self) -> int:
+        return len(self.sorted_values)
+
+    @property
+    def is_contiguous(self) -> bool:
+        """True when windows map to contiguous slices of rows"""
+        return self.order is None
+
+    def bounds(self, start_date=None, end_date=None) -> tuple:
+        """
+        Returns the (lo, hi) bounds of the window in sorted order. Rows without a
+        date are excluded as soon as either bound is given.
+        """
+        lo, hi = 0, len(self.sorted_values)
+        if start_date is None and end_date is None:
+            return lo, hi
+        lo = self.missing
+        if start_date is not None:
+            lo = max(
+                lo,
+                int(np.searchsorted(self.sorted_values, _to_nanoseconds(start_date), side="left")),
+            )
+        if end_date is not None:
+            hi = int(np.searchsorted(self.sorted_values, _to_nanoseconds(end_date), side="right"))
+        return lo, max(lo, hi)
+
+    def window(self, start_date=None, end_date=None) -> np.ndarray:
+        """Returns the ascending row positions whose date falls within [start_date, end_date]"""
+        lo, hi = self.bounds(start_date, end_date)
+        if self.order is None:
+            return np.arange(lo, hi, dtype=np.int64)
+        return np.sort(self.order[lo:hi])
+
+    def in_time_order(self, positions: np.ndarray = None) -> np.ndarray | None:
+        """
+        Orders row positions (every row when None) by date, rows without a date
+        first. Returns positions as given when the rows are already in time order.
+        """
+        if self.order is None:
+            return positions
+        if positions is None:
+            return self.order
+        return positions[np.lexsort((positions, self.values[positions]))]
+
+    def restrict(self, positions: np.ndarray, start_date=None, end_date=None) -> np.ndarray:
+        """Keeps the ascending row positions whose date falls within [start_date, end_date]"""
+        lo, hi = self.bounds(start_date, end_date)
+        if self.order is None:
+            # Positions are sorted and rows are in time order: two binary searches
+            return positions[
+                np.searchsorted(positions, lo, side="left") : np.searchsorted(
+                    positions, hi, side="left"
+                )
+            ]
+        if lo == hi:
+            return positions[:0]
+        selected = self.values[positions]
+        return positions[
+            (selected >= self.sorted_values[lo]) & (selected <= self.sorted_values[hi - 1])
+        ]
@@ -0,0 +1,159 @@
+# TextIndex.py
+
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Words are runs of letters and digits, in any script
+WORD_SEPARATOR_PATTERN = r"[^\p{L}\p{N}]+"
+QUERY_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(values: pd.Series) -> tuple:
+    """
+    Splits text into lower-cased words with vectorized Arrow string kernels.
+
+    Parameters:
+    values (pd.Series): The text of every row (nulls are skipped).
+
+    Returns:
+    tuple: The row position and the word of every (row, word) pair.
+    """
+    text = pa.array(values.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    words = pc.split_pattern_regex(pc.utf8_lower(text), WORD_SEPARATOR_PATTERN)
+    rows = pc.list_parent_indices(words).to_numpy()
+    words = pc.list_flatten(words)
+    kept = pc.not_equal(words, "")
+    return rows[kept.to_numpy(zero_copy_only=False)], words.filter(kept).to_numpy(
+        zero_copy_only=False
+    )
+
+
+def parse_query(query: str) -> list:
+    """
+    Splits a search box query into index terms: lower-cased words, a trailing "*"
+    asks for every word starting with it (e.g. "elect*").
+    """
+    terms = []
+    for part in query.split():
+        words = QUERY_WORD_PATTERN.findall(part.lower())
+        if words and part.endswith("*"):
+            words[-1] += "*"
+        terms.extend(words)
+    return terms
+
+
+class TextIndex:
+    """
+    Inverted index of terms (e.g. headline words or themes) to the sorted row
+    positions holding them, answering AND/OR queries and prefix matches.
+
+    The vocabulary is kept sorted, so the terms starting with a prefix are one
+    contiguous range of it found by binary search. Posting lists are stored back
+    to back in vocabulary order (compressed sparse rows), so the rows of a whole
+    prefix range are a single slice.
+
+    Parameters:
+    rows (array-like): The row position of every (row, term) pair.
+    terms (array-like): The term of every pair, already case-folded.
+    size (int): The number of indexed rows (defaults to the highest row + 1).
+    """
+
+    def __init__(self, rows, terms, size: int = None):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.size = int(rows.max()) + 1 if size is None and len(rows) else size or 0
+        codes, vocabulary = pd.factorize(pd.Series(terms, dtype=object))
+        vocabulary = np.asarray(vocabulary, dtype=object)
+
+        # Renumber the terms in sorted order
+        order = pc.sort_indices(pa.array(vocabulary, type=pa.string())).to_numpy()
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        self.vocabulary = vocabulary[order]
+        codes = ranks[codes] if len(codes) else codes.astype(np.int64)
+
+        # Sort the pairs by term then row, and drop repeated (term, row) pairs
+        pair_order = np.lexsort((rows, codes))
+        codes, rows = codes[pair_order], rows[pair_order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        self.rows = rows[keep]
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(codes[keep], minlength=len(self.vocabulary)), out=self.offsets[1:]
+        )
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    def _term_range_(self, term: str) -> tuple:
+        """Returns the vocabulary range of a term, or of every term starting with it when it ends with '*'"""
+        if term.endswith("*"):
+            prefix = term[:-1].lower()
+            lo = int(np.searchsorted(self.vocabulary, prefix, side="left"))
+            hi = int(np.searchsorted(self.vocabulary, prefix + "\U0010ffff", side="left"))
+            return lo, hi
+        term = term.lower()
+        lo = int(np.searchsorted(self.vocabulary, term, side="left"))
+        found = lo < len(self.vocabulary) and self.vocabulary[lo] == term
+        return lo, lo + 1 if found else lo
+
+    def estimate(self, term: str) -> int:
+        """Returns the number of postings of a term (an upper bound of its rows for a prefix)"""
+        lo, hi = self._term_range_(term)
+        return int(self.offsets[hi] - self.offsets[lo])
+
+    def postings(self, term: str) -> np.ndarray:
+        """Returns the sorted row positions holding a term (or a prefix, ending with '*')"""
+        lo, hi = self._term_range_(term)
+        rows = self.rows[self.offsets[lo] : self.offsets[hi]]
+        return rows if hi - lo <= 1 else self._union_([rows])
+
+    def _union_(self, parts: list) -> np.ndarray:
+        """Returns the sorted distinct rows of several arrays"""
+        total = sum(len(part) for part in parts)
+        if total * 16 < self.size:
+            return np.unique(np.concatenate(parts))
+        # Large unions: mark the rows in a mask instead of sorting them
+        mask = np.zeros(self.size, dtype=bool)
+        for part in parts:
+            mask[part] = True
+        return np.flatnonzero(mask)
+
+    def search(self, terms: list, match_all: bool = True) -> np.ndarray:
+        """
+        Returns the sorted row positions holding all (AND) or any (OR) of the terms.
+
+        Parameters:
+        terms (list): The terms, a trailing '*' matches every term with that prefix.
+        match_all (bool): Require every term (AND) instead of any of them (OR).
+        """
+        if not terms:
+            return np.empty(0, dtype=np.int64)
+        if not match_all:
+            ranges = [self._term_range_(term) for term in terms]
+            return self._union_(
+                [self.rows[self.offsets[lo] : self.offsets[hi]] for lo, hi in ranges]
+            )
+        # Intersect from the rarest term, stop once nothing is left
+        rows = None
+        for term in sorted(terms, key=self.estimate):
+            postings = self.postings(term)
+            rows = (
+                postings
+                if rows is None
+                else np.intersect1d(rows, postings, assume_unique=True)
+            )
+            if len(rows) == 0:
+                break
+        return rows
+
+    def search_estimate(self, terms: list, match_all: bool = True) -> int:
+        """Returns an upper bound of the rows matched by search"""
+        estimates = [self.estimate(term) for term in terms]
+        if not estimates:
+            return 0
+        return min(estimates) if match_all else sum(estimates)
@@ -5,6 +5,7 @@ import streamlit as st
 import plotly.express as px
 import datetime
 from classes.MapGenerator import MapGenerator
+from classes.PopupClient import PopupClient
 from classes.ACLEDProcessor import ACLEDProcessor
 from classes.PlotGenerator import PlotGenerator
 from classes.CELLEXProcessor import CELLEXProcessor
@@ -20,9 +21,19 @@ def initialize_variables() -> None:
 
         st.session_state.plot_generator = PlotGenerator()
 
+    # Clusters are kept between reruns so a filter change only updates them
+    if "point_clusterers" not in st.session_state:
+        st.session_state.point_clusterers = {}
+
+    # Popups are served by the backend, the map only carries the point ids
+    if "popup_client" not in st.session_state:
+        st.session_state.popup_client = PopupClient()
+
     st.session_state.map_generator = MapGenerator(
         tiles=tiles,
         attr=attr,
+        clusterers=st.session_state.point_clusterers,
+        popup_client=st.session_state.popup_client,
     )
 
 
@@ -38,12 +49,16 @@ def initialize_cellex_variables() -> None:
         )
 
 
-def update_cellex_data(actors: list) -> None:
+def update_cellex_data(
+    actors: list, start_date: datetime = None, end_date: datetime = None
+) -> None:
     """Use the values stored in the selected cellex filter session state to update the cellex_data session state variable"""
 
     if "cellex_processor" in st.session_state:
         st.session_state.cellex_data = (
-            st.session_state.cellex_processor._get_meta_data_(cellexs=actors)
+            st.session_state.cellex_processor._get_meta_data_(
+                cellexs=actors, start_date=start_date, end_date=end_date
+            )
         )
 
 
@@ -66,6 +81,7 @@ def initialize_gdelt_variables() -> None:
         st.session_state.gdelt_other_mentions = (
             st.session_state.gdelt_processor._get_other_mentions_()
         )
+        st.session_state.gdelt_themes = st.session_state.gdelt_processor._get_themes_()
 
 
 def update_gdelt_data(
@@ -76,8 +92,13 @@ def update_gdelt_data(
     other_mentions: list,
     start_date: datetime,
     end_date: datetime,
+    themes: list = None,
+    themes_match_all: bool = False,
+    headline_query: str = None,
+    headline_match_all: bool = True,
+    collapse_duplicates: bool = False,
 ) -> None:
-    """Use the values stored in the selected gdelt session state to update the gdelt_data session state"""
+    """Use the values stored in the selected gdelt session state to update the gdelt_data and gdelt_points session states"""
     if "gdelt_processor" in st.session_state:
         st.session_state.gdelt_data = st.session_state.gdelt_processor._get_events_(
             persons=persons,
@@ -87,23 +108,51 @@ def update_gdelt_data(
             other_mentions=other_mentions,
             start_date=start_date,
             end_date=end_date,
+            themes=themes,
+            themes_match_all=themes_match_all,
+            headline_query=headline_query,
+            headline_match_all=headline_match_all,
+            collapse_duplicates=collapse_duplicates,
         )
+        st.session_state.gdelt_points = (
+            st.session_state.gdelt_processor._get_points_(st.session_state.gdelt_data)
+        )
+
+
+def _upload_id(file) -> str:
+    """Returns the identifier of an uploaded file"""
+    return getattr(file, "file_id", None) or file.name
 
 
 def initialize_acled_variables() -> None:
     """Initialize the acled processor class and assign the unique values to the session state variables"""
     if "acled_processor" not in st.session_state:
         st.session_state.acled_processor = ACLEDProcessor(st.session_state.ACLED_FILES)
-        st.session_state.acled_actors = st.session_state.acled_processor._get_actors_()
-        st.session_state.acled_event_types = (
-            st.session_state.acled_processor._get_event_types_()
-        )
-        st.session_state.acled_sub_event_types = (
-            st.session_state.acled_processor._get_sub_event_types_()
-        )
-        st.session_state.acled_disorder_types = (
-            st.session_state.acled_processor._get_disorder_types_()
-        )
+        st.session_state.acled_file_ids = {
+            _upload_id(file) for file in st.session_state.ACLED_FILES
+        }
+    else:
+        # Merge files uploaded since the processor was built instead of rebuilding it
+        new_files = [
+            file
+            for file in st.session_state.ACLED_FILES
+            if _upload_id(file) not in st.session_state.acled_file_ids
+        ]
+        if not new_files:
+            return
+        st.session_state.acled_processor._upsert_files_(new_files)
+        st.session_state.acled_file_ids.update(_upload_id(file) for file in new_files)
+
+    st.session_state.acled_actors = st.session_state.acled_processor._get_actors_()
+    st.session_state.acled_event_types = (
+        st.session_state.acled_processor._get_event_types_()
+    )
+    st.session_state.acled_sub_event_types = (
+        st.session_state.acled_processor._get_sub_event_types_()
+    )
+    st.session_state.acled_disorder_types = (
+        st.session_state.acled_processor._get_disorder_types_()
+    )
 
 
 def update_acled_data(